@@ -0,0 +1,61 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L3.parse import parse_program
+from L3.pipeline import BACKENDS, build_pass_manager, compile_to_callable
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+LEVEL = 2
+REPEAT = 5
+
+# Example programs with the arguments they run on, plus a tail-recursive loop that does not come from a file.
+WORKLOADS = {
+    "fib": ((EXAMPLES / "fib.l3").read_text(), (12,)),
+    "fact": ((EXAMPLES / "fact.l3").read_text(), (20,)),
+    "add_simple": ((EXAMPLES / "add_simple.l3").read_text(), (3, 4)),
+    "add_complex": ((EXAMPLES / "add_complex.l3").read_text(), (3, 4)),
+    "loop": ("(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))", (20_000,)),
+}
+
+
+def best(entry: Callable[..., int], arguments: tuple[int, ...]) -> float | None:
+    times: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        try:
+            entry(*arguments)
+        except RecursionError:
+            return None
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def show(seconds: float | None) -> str:
+    return "overflow" if seconds is None else f"{seconds * 1e6:.1f}us"
+
+
+def main() -> None:
+    print(f"{'program':>12} {'mode':>10} " + " ".join(f"{backend:>12}" for backend in BACKENDS) + f" {'faster':>10}")
+    for name, (source, arguments) in WORKLOADS.items():
+        for trampoline in (False, True):
+            times: dict[str, float | None] = {}
+            for backend in BACKENDS:
+                manager = build_pass_manager(backend)
+                options = {"backend": backend, "trampoline": trampoline}
+                entry = compile_to_callable(parse_program(source), manager, manager.schedule(level=LEVEL), options)
+                times[backend] = best(entry, arguments)
+
+            finished = {backend: seconds for backend, seconds in times.items() if seconds is not None}
+            faster = min(finished, key=finished.__getitem__) if finished else "-"
+            mode = "trampoline" if trampoline else "nested"
+            print(
+                f"{name:>12} {mode:>10} "
+                + " ".join(f"{show(times[backend]):>12}" for backend in BACKENDS)
+                + f" {faster:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
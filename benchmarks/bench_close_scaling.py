@@ -0,0 +1,88 @@
+import math
+import sys
+import time
+from collections.abc import Callable
+
+from L1 import syntax as L1
+from L1.close import close_program
+
+# The walks recurse once per nesting level or binding, through C-level calls, which bounds the depth on the stack.
+SIZES = (250, 500, 1000, 2000)
+REPEAT = 3
+# Allowed growth exponent; anything near 2 means every closure re-walks the closures nested inside it, or every node
+# copies the variables live across it.
+LIMIT = 1.3
+
+
+def nested(depth: int) -> L1.Program:
+    # f0(x0) defines f1(x1), which defines f2(x2), and so on; each function calls the next on its own parameter, and
+    # the innermost adds the two innermost parameters. Every closure captures one variable, so the output is linear.
+    body: L1.Statement = L1.Primitive(
+        destination="s",
+        operator="+",
+        left=f"x{depth - 1}",
+        right=f"x{depth}",
+        then=L1.Halt(value="s"),
+    )
+    for i in reversed(range(1, depth + 1)):
+        body = L1.Abstract(
+            destination=f"f{i}",
+            parameters=[f"x{i}"],
+            body=body,
+            then=L1.Apply(target=f"f{i}", arguments=[f"x{i - 1}"]),
+        )
+    return L1.Program(parameters=["x0"], body=body)
+
+
+def chain(length: int) -> L1.Program:
+    # A closure whose body binds v0 ... vn in a straight line and passes them all to a final call, so every binding
+    # stays live to the end; n is also the number of variables the closure captures from its caller.
+    body: L1.Statement = L1.Apply(
+        target="k", arguments=[f"v{i}" for i in range(length)] + [f"u{i}" for i in range(length)]
+    )
+    for i in reversed(range(length)):
+        body = L1.Immediate(destination=f"v{i}", value=i, then=body)
+    closure = L1.Abstract(destination="g", parameters=["k"], body=body, then=L1.Apply(target="g", arguments=["h"]))
+    return L1.Program(parameters=["h", *[f"u{i}" for i in range(length)]], body=closure)
+
+
+SHAPES = {"nested": nested, "chain": chain}
+
+
+def measure(run: Callable[[L1.Program], object], program: L1.Program) -> float:
+    best = math.inf
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run(program)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def exponent(sizes: tuple[int, ...], times: list[float]) -> float:
+    # Least-squares slope of log(time) against log(size).
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys, strict=True)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main() -> None:
+    # Every nesting level or binding is a few Python frames deep in each recursive walk.
+    sys.setrecursionlimit(10 * max(SIZES) + 1000)
+
+    print(f"{'':>8} " + " ".join(f"{size:>9}" for size in SIZES) + f" {'exponent':>9}")
+    worst = 0.0
+    for name, shape in SHAPES.items():
+        times = [measure(close_program, shape(size)) for size in SIZES]
+        slope = exponent(SIZES, times)
+        worst = max(worst, slope)
+        print(f"{name:>8} " + " ".join(f"{seconds:>8.3f}s" for seconds in times) + f" {slope:>9.2f}")
+
+    if worst > LIMIT:
+        print(f"growth exponent above {LIMIT}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import dis
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L0 import syntax as L0
+from L0.coalesce import coalesce_program
+from L0.to_python import compile_to_callable
+from L1.close import close_program
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+REPEAT = 5
+
+
+def close(source: str) -> L0.Program:
+    manager = build_pass_manager()
+    passes = [pass_ for pass_ in manager.schedule(level=2) if pass_.name != "to_python"]
+    return close_program(manager.run(parse_program(source), passes))
+
+
+def frame_stats(program: L0.Program) -> tuple[int, int]:
+    # Locals summed over every generated procedure, and the LOAD_FAST/STORE_FAST family executed once per procedure.
+    entry = compile_to_callable(program)
+    functions = [value for value in entry.__globals__.values() if hasattr(value, "__code__")]
+    locals_ = sum(function.__code__.co_nlocals for function in functions)
+    fast = sum(
+        1
+        for function in functions
+        for instruction in dis.get_instructions(function)
+        if instruction.opname.startswith(("LOAD_FAST", "STORE_FAST"))
+    )
+    return locals_, fast
+
+
+def best(entry: Callable[..., int], n: int) -> float:
+    times: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        entry(n)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    print(f"{'program':>8} {'':>10} {'locals':>8} {'fast ops':>9} {'run':>10}")
+    for name, n in (("fib", 20), ("fact", 20)):
+        program = close((EXAMPLES / f"{name}.l3").read_text())
+        for label, variant in (("plain", program), ("coalesced", coalesce_program(program))):
+            locals_, fast = frame_stats(variant)
+            # Trampolined, so that deep CPS recursion does not hit the recursion limit.
+            run = best(compile_to_callable(variant, trampoline=True), n)
+            print(f"{name:>8} {label:>10} {locals_:>8} {fast:>9} {run * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
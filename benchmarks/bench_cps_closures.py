@@ -0,0 +1,56 @@
+import ast
+import sys
+from pathlib import Path
+
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+
+class CountClosures(ast.NodeTransformer):
+    def __init__(self) -> None:
+        self.depth = 0
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST | list[ast.stmt]:
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+        if self.depth == 0:
+            return node
+        count = ast.parse("_closures[0] += 1").body[0]
+        return [count, node]
+
+
+def compile_counting(source: str, level: int) -> tuple[dict[str, object], list[int]]:
+    manager = build_pass_manager()
+    module = ast.parse(manager.run(parse_program(source), manager.schedule(level=level)))
+    module = ast.fix_missing_locations(CountClosures().visit(module))
+
+    closures = [0]
+    namespace: dict[str, object] = {"_closures": closures, "__name__": "bench"}
+    exec(compile(module, "<bench>", "exec"), namespace)
+    return namespace, closures
+
+
+def fib_calls(n: int) -> int:
+    return 1 if n < 2 else 1 + fib_calls(n - 1) + fib_calls(n - 2)
+
+
+def main() -> None:
+    # Generated CPS code does not return until the program halts, so the Python stack grows with every call.
+    sys.setrecursionlimit(100_000)
+    source = (EXAMPLES / "fib.l3").read_text()
+    print(f"{'level':>5} {'n':>4} {'fib calls':>10} {'closures':>10} {'per call':>9}")
+    for level in (0, 1):
+        namespace, closures = compile_counting(source, level)
+        entry = namespace["l1"]
+        for n in (5, 10, 15):
+            closures[0] = 0
+            entry(n)  # type: ignore[operator]
+            calls = fib_calls(n)
+            print(f"{level:>5} {n:>4} {calls:>10} {closures[0]:>10} {closures[0] / calls:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import math
+import sys
+import time
+from collections.abc import Callable
+
+from L1 import syntax as L1
+from L2 import syntax as L2
+from L2.cps_convert import cps_convert_term
+from util.sequential_name_generator import SequentialNameGenerator
+
+SIZES = (1250, 2500, 5000, 10000, 20000)
+REPEAT = 3
+# Allowed growth exponent; anything near 2 means a sequence is being copied at every step.
+LIMIT = 1.3
+
+
+def long_begin(n: int) -> L2.Term:
+    # The shape of a list literal: one store per element, then the list itself.
+    return L2.Begin(
+        effects=[L2.Store(base=L2.Reference(name="x"), index=i, value=L2.Immediate(value=i)) for i in range(n)],
+        value=L2.Reference(name="x"),
+    )
+
+
+def long_let(n: int) -> L2.Term:
+    return L2.Let(
+        bindings=[(f"x{i}", L2.Immediate(value=i)) for i in range(n)],
+        body=L2.Reference(name=f"x{n - 1}"),
+    )
+
+
+def long_apply(n: int) -> L2.Term:
+    return L2.Apply(
+        target=L2.Reference(name="f"),
+        arguments=[L2.Immediate(value=i) for i in range(n)],
+    )
+
+
+SHAPES: dict[str, Callable[[int], L2.Term]] = {
+    "begin": long_begin,
+    "let": long_let,
+    "apply": long_apply,
+}
+
+
+def measure(term: L2.Term) -> float:
+    best = math.inf
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        cps_convert_term(term, lambda value: L1.Halt(value=value), SequentialNameGenerator())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def exponent(sizes: tuple[int, ...], times: list[float]) -> float:
+    # Least-squares slope of log(time) against log(size).
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys, strict=True)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main() -> None:
+    print(f"{'shape':>6} " + " ".join(f"{size:>9}" for size in SIZES) + f" {'exponent':>9}")
+    failed = False
+    for name, build in SHAPES.items():
+        times = [measure(build(size)) for size in SIZES]
+        slope = exponent(SIZES, times)
+        failed = failed or slope > LIMIT
+        print(f"{name:>6} " + " ".join(f"{seconds:>8.3f}s" for seconds in times) + f" {slope:>9.2f}")
+
+    if failed:
+        print(f"growth exponent above {LIMIT}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import ast
+import re
+import tracemalloc
+from collections.abc import Callable
+
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager, run_passes
+
+# Builds a linked list of n two-slot cells, (value, next).
+LIST = """
+(l3 (n)
+  (letrec ((build (\\ (i acc)
+                    (if (< i n)
+                        (let ((cell (allocate 2)))
+                          (begin (store cell 0 i) (store cell 1 acc) (build (+ i 1) cell)))
+                        acc))))
+    (build 0 0)))
+"""
+
+# Keeps n one-slot letrec boxes alive: every element of the list is a recursive closure.
+BOXES = """
+(l3 (n)
+  (letrec ((build (\\ (i acc)
+                    (if (< i n)
+                        (letrec ((f (\\ (x) (if (< x 1) x (f (- x 1))))))
+                          (let ((cell (allocate 2)))
+                            (begin (store cell 0 f) (store cell 1 acc) (build (+ i 1) cell))))
+                        acc))))
+    (build 0 0)))
+"""
+
+N = 100_000
+
+
+class ToLists(ast.NodeTransformer):
+    # The representation the backends used before records: `[None] * n` and subscripts.
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        return None
+
+    def visit_Call(self, node: ast.Call) -> ast.expr:
+        self.generic_visit(node)
+        match node.func:
+            case ast.Name(id=name) if (match := re.fullmatch(r"_Record(\d+)", name)) is not None:
+                return ast.List(elts=[ast.Constant(None) for _ in range(int(match[1]))], ctx=ast.Load())
+            case _:
+                return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.expr:
+        self.generic_visit(node)
+        if (match := re.fullmatch(r"f(\d+)", node.attr)) is not None:
+            return ast.Subscript(value=node.value, slice=ast.Constant(int(match[1])), ctx=node.ctx)
+        return node
+
+
+def entry(module: ast.Module) -> Callable[[int], object]:
+    namespace: dict[str, object] = {"__name__": "bench"}
+    exec(compile(ast.fix_missing_locations(module), "<bench>", "exec"), namespace)
+    return namespace["l1"]  # type: ignore[return-value]
+
+
+def retained(run: Callable[[int], object]) -> float:
+    tracemalloc.start()
+    result = run(N)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size / N
+
+
+def main() -> None:
+    manager = build_pass_manager()
+    print(f"{'program':>8} {'lists':>12} {'records':>12}")
+    for name, source in (("list", LIST), ("boxes", BOXES)):
+        # The trampoline keeps deep recursion off the Python stack, so only the heap is measured.
+        code = run_passes(manager, parse_program(source), manager.schedule(level=2), {"trampoline": True})
+        records = retained(entry(ast.parse(code)))
+        lists = retained(entry(ToLists().visit(ast.parse(code))))
+        print(f"{name:>8} {lists:>10.1f}B {records:>10.1f}B   bytes retained per element")
+
+
+if __name__ == "__main__":
+    main()
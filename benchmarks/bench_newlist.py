@@ -0,0 +1,55 @@
+import sys
+import time
+from collections.abc import Callable
+
+from L3.pipeline import build_pass_manager, compile_to_callable
+from L4.convert import convert_to_l3
+from L4.parse import parse_program
+
+SIZES = (10_000, 100_000)
+REPEAT = 20
+# Allowed cost of one list allocation in generated code relative to `[0] * n`.
+LIMIT = 3.0
+
+# Allocates a list of n zeros, writes its last element and reads both ends.
+SOURCE = """
+(l4 ((l (mutable (list int)) (heapallocate (newlist {n} int))))
+  (bunch (set l {last} 5) (+ (get l 0) (get l {last}))))
+"""
+
+
+def best(run: Callable[[], object]) -> float:
+    times: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    print(f"{'size':>8} {'backend':>10} {'compile':>9} {'run':>10} {'[0] * n':>10} {'ratio':>6}")
+    worst = 0.0
+    for size in SIZES:
+        l3 = convert_to_l3(parse_program(SOURCE.format(n=size, last=size - 1)))
+        baseline = best(lambda: [0] * size)  # noqa: B023
+        for backend in ("l1-nested", "l0-flat"):
+            manager = build_pass_manager(backend)
+            start = time.perf_counter()
+            entry = compile_to_callable(l3, manager, manager.schedule(level=2), {"backend": backend})
+            compiled = time.perf_counter() - start
+            assert entry() == 5
+            seconds = best(entry)
+            worst = max(worst, seconds / baseline)
+            print(
+                f"{size:>8} {backend:>10} {compiled:>8.3f}s {seconds * 1000:>8.3f}ms {baseline * 1000:>8.3f}ms "
+                f"{seconds / baseline:>5.1f}x"
+            )
+
+    if worst > LIMIT:
+        print(f"a list allocation costs more than {LIMIT}x [0] * n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
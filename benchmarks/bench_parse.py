@@ -0,0 +1,72 @@
+import math
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L3.generate import Shape
+from L4 import parse
+from L4.generate import generate_program
+from L4.parse import AstTransformer, parse_program, unparse_program
+from lark import Lark
+
+SIZES = (2500, 5000, 10000, 20000, 40000)
+REPEAT = 3
+# Allowed growth exponent of the LALR parser; Earley is reported for comparison only.
+LIMIT = 1.3
+
+
+def earley() -> Callable[[str], object]:
+    # The same grammar as L3 parses its own: Earley builds a tree, which is transformed afterwards.
+    parser = Lark(Path(parse.__file__).with_name("L4.lark").read_text(), start="program")
+    return lambda source: AstTransformer().transform(parser.parse(source))  # pyright: ignore[reportUnknownMemberType]
+
+
+def measure(run: Callable[[str], object], source: str) -> float:
+    best = math.inf
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def exponent(sizes: list[int], times: list[float]) -> float:
+    # Least-squares slope of log(time) against log(size).
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys, strict=True)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main() -> None:
+    start = time.perf_counter()
+    parse_program("(l4 () 0)")
+    print(f"first parse, building the tables: {time.perf_counter() - start:.3f}s")
+
+    sources = [unparse_program(generate_program(0, Shape(size=size))) for size in SIZES]
+    slow = earley()
+
+    print(f"{'size':>6} {'bytes':>9} {'lalr':>9} {'MB/s':>6} {'earley':>9} {'speedup':>8}")
+    lengths: list[int] = []
+    times: list[float] = []
+    for size, source in zip(SIZES, sources, strict=True):
+        fast = measure(parse_program, source)
+        baseline = measure(slow, source)
+        lengths.append(len(source))
+        times.append(fast)
+        print(
+            f"{size:>6} {len(source):>9} {fast:>8.3f}s {len(source) / fast / 1e6:>6.2f} {baseline:>8.3f}s "
+            f"{baseline / fast:>7.1f}x"
+        )
+
+    slope = exponent(lengths, times)
+    print(f"growth exponent {slope:.2f}")
+    if slope > LIMIT:
+        print(f"growth exponent above {LIMIT}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
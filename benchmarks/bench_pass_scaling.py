@@ -0,0 +1,151 @@
+import gc
+import math
+import sys
+import time
+from collections.abc import Callable
+
+from pydantic import BaseModel
+
+from L3 import syntax as L3
+from L3.generate import Shape
+from L3.generate import generate_program as generate_l3
+from L3.pipeline import BACKENDS
+from L3.pipeline import build_pass_manager as build_l3
+from L4 import syntax as L4
+from L4.generate import generate_program as generate_l4
+from L4.main import build_pass_manager as build_l4
+from util.pass_manager import Cost, Pass, PassManager, Session
+
+# Every pass of both backends, on L3 and on L4 input, at thousands of nodes. A size is measured on several seeded
+# programs and their times are summed, so that one program's shape does not decide the slope. The generators only
+# approximate the size they are asked for, so the slope is taken against the number of nodes actually generated.
+SIZES = (1000, 2000, 4000, 8000)
+SEEDS = range(3)
+REPEAT = 3
+# Allowed growth exponent for each declared cost, with some slack for noise and allocator effects.
+LIMITS: dict[Cost, float] = {"linear": 1.3, "quadratic": 2.3}
+
+
+def captures(n: int, seed: int) -> L3.Program:
+    # One closure capturing n variables, whose body is a chain that uses one of them per step:
+    # let x1 = x0 + 1 in ... let f = fun y -> (let v1 = y + x1 in let v2 = v1 + x2 in ... vn) in f x0. Closure
+    # conversion once copied the captured set at every node of the body. Generated programs seldom capture much, so
+    # this shape stands in for that case. It nests as deep as it is long, and comparing deep terms recurses in C,
+    # which Python caps independently of the recursion limit, so it is measured at a tenth of each size.
+    n //= 10
+    body: L3.Term = L3.Reference(name=f"v{n}")
+    for i in reversed(range(1, n + 1)):
+        value = L3.Primitive(operator="+", left=L3.Reference(name=f"v{i - 1}"), right=L3.Reference(name=f"x{i}"))
+        body = L3.Let(bindings=[(f"v{i}", value)], body=body)
+    function = L3.Abstract(parameters=["v0"], body=body)
+    program: L3.Term = L3.Let(
+        bindings=[("f", function)], body=L3.Apply(target=L3.Reference(name="f"), arguments=[L3.Reference(name="x0")])
+    )
+    for i in reversed(range(1, n + 1)):
+        value = L3.Primitive(operator="+", left=L3.Reference(name=f"x{i - 1}"), right=L3.Immediate(value=i))
+        program = L3.Let(bindings=[(f"x{i}", value)], body=program)
+    return L3.Program(parameters=["x0"], body=program)
+
+
+def generated_l3(n: int, seed: int) -> L3.Program:
+    return generate_l3(seed, Shape(size=n))
+
+
+def generated_l4(n: int, seed: int) -> L4.Program:
+    return generate_l4(seed, Shape(size=n))
+
+
+# Each input with the pass manager that compiles it.
+INPUTS: dict[str, tuple[Callable[[int, int], object], Callable[[str], PassManager]]] = {
+    "l3": (generated_l3, build_l3),
+    "l4": (generated_l4, build_l4),
+    "captures": (captures, build_l3),
+}
+
+
+def label(pass_: Pass) -> str:
+    return f"{pass_.name} {pass_.source}->{pass_.target}"
+
+
+def measure(program: object, build: Callable[[str], PassManager]) -> dict[str, tuple[Pass, float]]:
+    # Runs the pipeline of every backend at its highest level, timing each pass on the output of the ones before it.
+    # Passes the backends share are timed once.
+    times: dict[str, tuple[Pass, float]] = {}
+    for backend in BACKENDS:
+        manager = build(backend)
+        schedule = manager.schedule(level=manager.max_level)
+        best = [math.inf] * len(schedule)
+        for _ in range(REPEAT):
+            current, session = program, Session()
+            for i, pass_ in enumerate(schedule):
+                # A collection landing inside one pass would dwarf it at the small sizes.
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                current = pass_.run(current, session)
+                best[i] = min(best[i], time.perf_counter() - start)
+                gc.enable()
+        for pass_, seconds in zip(schedule, best, strict=True):
+            times.setdefault(label(pass_), (pass_, seconds))
+    return times
+
+
+def nodes(term: object) -> int:
+    match term:
+        case BaseModel():
+            return 1 + sum(nodes(value) for value in term.__dict__.values())
+        case list() | tuple():
+            return sum(nodes(value) for value in term)
+        case _:
+            return 0
+
+
+def total(
+    generate: Callable[[int, int], object], build: Callable[[str], PassManager], size: int
+) -> tuple[int, dict[str, tuple[Pass, float]]]:
+    # Input nodes and per-pass times, summed over the seeds.
+    count, times = 0, dict[str, tuple[Pass, float]]()
+    for seed in SEEDS:
+        program = generate(size, seed)
+        count += nodes(program)
+        for key, (pass_, seconds) in measure(program, build).items():
+            times[key] = (pass_, times.get(key, (pass_, 0.0))[1] + seconds)
+    return count, times
+
+
+def exponent(sizes: list[int], times: list[float]) -> float:
+    # Least-squares slope of log(time) against log(size).
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys, strict=True)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main() -> None:
+    # Every nesting level is a few Python frames deep in each recursive walk.
+    sys.setrecursionlimit(100_000)
+
+    failures: list[str] = []
+    for name, (generate, build) in INPUTS.items():
+        counts, runs = zip(*(total(generate, build, size) for size in SIZES), strict=True)
+        print(
+            f"{name + ' (nodes)':<28} " + " ".join(f"{count:>9}" for count in counts) + f" {'exponent':>9} {'cost':>9}"
+        )
+        for key, (pass_, _) in runs[0].items():
+            times = [run[key][1] for run in runs]
+            slope = exponent(list(counts), times)
+            print(
+                f"  {key:<26} " + " ".join(f"{seconds:>8.4f}s" for seconds in times) + f" {slope:>9.2f} {pass_.cost:>9}"
+            )
+            if slope > LIMITS[pass_.cost]:
+                failures.append(f"{name}: {key} grows as n^{slope:.2f}, declared {pass_.cost}")
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L3.evaluate import compile_program
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager, compile_to_callable, run_passes
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+REPEAT = 5
+
+
+def through_file(source: str, arguments: list[int], directory: Path) -> None:
+    # What running a program took before `l3 run`: unparse, write, then a fresh interpreter re-reads and compiles.
+    manager = build_pass_manager()
+    output = directory / "program.py"
+    output.write_text(run_passes(manager, parse_program(source), manager.schedule(level=2), {}))
+    subprocess.run([sys.executable, str(output), *map(str, arguments)], check=True, capture_output=True)
+
+
+def in_memory(source: str, arguments: list[int]) -> None:
+    manager = build_pass_manager()
+    compile_to_callable(parse_program(source), manager, manager.schedule(level=2))(*arguments)
+
+
+def evaluated(source: str, arguments: list[int]) -> None:
+    compile_program(parse_program(source))(*arguments)
+
+
+def best(run: Callable[[], None]) -> float:
+    times: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    print(f"{'program':>12} {'file + python':>15} {'in memory':>15} {'evaluator':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, n in (("add_simple", 0), ("fact", 10), ("fib", 10)):
+            source = (EXAMPLES / f"{name}.l3").read_text()
+            arguments = [n] * len(parse_program(source).parameters)
+            slow = best(lambda: through_file(source, arguments, Path(directory)))
+            fast = best(lambda: in_memory(source, arguments))
+            direct = best(lambda: evaluated(source, arguments))
+            print(f"{name:>12} {slow * 1000:>13.2f}ms {fast * 1000:>13.2f}ms {direct * 1000:>13.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
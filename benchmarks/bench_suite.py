@@ -0,0 +1,153 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from L3.evaluate import compile_program
+from L3.pipeline import BACKENDS, VM_BACKEND, build_pass_manager, compile_to_callable
+from L3.syntax import Program
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+# Each example with the inputs it runs on: small ones first, then scaled-up ones deep enough to stress recursion.
+# Every parameter of a program gets the same input.
+WORKLOADS = {
+    "fib": (5, 10, 15),
+    "fact": (5, 20, 200),
+    "sum": (10, 100, 2000),
+    "add_simple": (1, 1000),
+    "add_complex": (1, 1000),
+}
+
+REPEAT = 3
+# Every measurement repeats a call until one batch takes at least this long, so tiny programs time reliably.
+BATCH = 0.005
+THRESHOLD = 0.25
+
+
+def configurations() -> Iterator[tuple[str, int | None, bool]]:
+    # Backend, optimization level and trampoline. The VM runs the l0-flat pipeline's L0 output; the evaluator
+    # runs the L3 program itself.
+    for backend in BACKENDS:
+        for level in range(build_pass_manager(backend).max_level + 1):
+            for trampoline in (False, True):
+                yield backend, level, trampoline
+    for level in range(build_pass_manager(VM_BACKEND).max_level + 1):
+        yield VM_BACKEND, level, False
+    yield "evaluator", None, False
+
+
+def build(program: Program, backend: str, level: int | None, trampoline: bool) -> Callable[..., int]:
+    if level is None:
+        return compile_program(program)
+
+    manager = build_pass_manager(backend)
+    options = {"backend": backend, "trampoline": trampoline}
+    return compile_to_callable(program, manager, manager.schedule(level=level), options)
+
+
+def measure(entry: Callable[..., int], arguments: list[int], repeat: int) -> tuple[float, int]:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            result = entry(*arguments)
+        if time.perf_counter() - start >= BATCH:
+            break
+        number *= 2
+
+    batches: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            entry(*arguments)
+        batches.append(time.perf_counter() - start)
+    return min(batches) / number, result
+
+
+def key(record: dict[str, Any]) -> str:
+    level = "-" if record["level"] is None else f"O{record['level']}"
+    mode = "trampoline" if record["trampoline"] else "nested"
+    return f"{record['program']}/{record['backend']}/{level}/{mode}/{record['input']}"
+
+
+def run(repeat: int) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    for name, inputs in WORKLOADS.items():
+        program = Program.model_validate_json((EXAMPLES / f"{name}.json").read_text())
+        for backend, level, trampoline in configurations():
+            entry = build(program, backend, level, trampoline)
+            for n in inputs:
+                record: dict[str, Any] = {
+                    "program": name,
+                    "backend": backend,
+                    "level": level,
+                    "trampoline": trampoline,
+                    "input": n,
+                }
+                try:
+                    seconds, result = measure(entry, [n] * len(program.parameters), repeat)
+                    record |= {"seconds": seconds, "result": result}
+                except RecursionError:
+                    record |= {"seconds": None, "result": None}
+                records.append(record)
+                shown = "overflow" if record["seconds"] is None else f"{record['seconds'] * 1e6:.1f}us"
+                print(f"{key(record):<48} {shown:>14}", file=sys.stderr)
+    return records
+
+
+def compare(records: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold: float) -> list[str]:
+    # A measurement regresses when it got slower than the baseline by more than `threshold`, or stopped finishing.
+    before = {key(record): record["seconds"] for record in baseline}
+    regressions: list[str] = []
+    for record in records:
+        old, new = before.get(key(record)), record["seconds"]
+        if old is None:
+            continue
+        if new is None:
+            regressions.append(f"{key(record)}: overflows, was {old * 1e6:.1f}us")
+        elif new > old * (1 + threshold):
+            regressions.append(f"{key(record)}: {new * 1e6:.1f}us, was {old * 1e6:.1f}us ({new / old - 1:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time generated code across examples, backends and levels.")
+    parser.add_argument("-o", "--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against results written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown (default: 0.25)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed batches per measurement (default: 3)")
+    arguments = parser.parse_args()
+
+    records = run(arguments.repeat)
+    results = {"python": platform.python_version(), "repeat": arguments.repeat, "results": records}
+    if arguments.output is not None:
+        arguments.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    # Each configuration must compute the same result for the same program and input.
+    answers: dict[tuple[str, int], set[int]] = {}
+    for record in records:
+        if record["result"] is not None:
+            answers.setdefault((record["program"], record["input"]), set()).add(record["result"])
+    disagreements = [f"{program}({n}): {sorted(values)}" for (program, n), values in answers.items() if len(values) > 1]
+    for disagreement in disagreements:
+        print(f"results differ: {disagreement}")
+
+    regressions: list[str] = []
+    if arguments.baseline is not None:
+        baseline = json.loads(arguments.baseline.read_text())["results"]
+        regressions = compare(records, baseline, arguments.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        print(f"{len(regressions)} regressions beyond {arguments.threshold:.0%} against {arguments.baseline}")
+
+    if disagreements or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
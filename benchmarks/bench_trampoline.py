@@ -0,0 +1,51 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager, run_passes
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+LOOP = "(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))"
+
+REPEAT = 5
+
+
+def compile_entry(source: str, trampoline: bool) -> Callable[..., int]:
+    manager = build_pass_manager()
+    module = run_passes(manager, parse_program(source), manager.schedule(level=2), {"trampoline": trampoline})
+    namespace: dict[str, object] = {"__name__": "bench"}
+    exec(module, namespace)
+    return namespace["l1"]  # type: ignore[return-value]
+
+
+def measure(entry: Callable[..., int], n: int) -> str:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        try:
+            entry(n)
+        except RecursionError:
+            return "RecursionError"
+        best = min(best, time.perf_counter() - start)
+    return f"{best * 1000:.2f}ms"
+
+
+def main() -> None:
+    # Runs with the default recursion limit: that limit is what the trampoline is meant to escape.
+    programs = {
+        "fib": ((EXAMPLES / "fib.l3").read_text(), (10, 15, 20)),
+        "loop": (LOOP, (100, 1_000, 100_000)),
+    }
+
+    print(f"{'program':>8} {'n':>8} {'nested':>15} {'trampoline':>15}")
+    for name, (source, sizes) in programs.items():
+        nested = compile_entry(source, trampoline=False)
+        trampolined = compile_entry(source, trampoline=True)
+        for n in sizes:
+            print(f"{name:>8} {n:>8} {measure(nested, n):>15} {measure(trampolined, n):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from L0 import syntax as L0
+from L0 import vm
+from L0.to_python import compile_to_callable
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager
+
+EXAMPLES = Path(__file__).parents[1] / "packages" / "L3" / "examples"
+
+LEVEL = 2
+REPEAT = 5
+
+WORKLOADS = {
+    "fib": ((EXAMPLES / "fib.l3").read_text(), (18,)),
+    "fact": ((EXAMPLES / "fact.l3").read_text(), (20,)),
+    "loop": ("(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))", (50_000,)),
+}
+
+
+def lower(source: str) -> L0.Program:
+    # The l0-flat pipeline up to, but not including, code generation.
+    manager = build_pass_manager("l0-flat")
+    passes = [pass_ for pass_ in manager.schedule(level=LEVEL) if pass_.name != "to_python"]
+    return manager.run(parse_program(source), passes)
+
+
+def best(entry: Callable[..., int], arguments: tuple[int, ...]) -> tuple[float | None, int | None]:
+    times: list[float] = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        try:
+            result = entry(*arguments)
+        except RecursionError:
+            return None, None
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main() -> None:
+    print(f"{'program':>8} {'python':>12} {'trampoline':>12} {'vm':>12} {'vm words':>9}")
+    for name, (source, arguments) in WORKLOADS.items():
+        program = lower(source)
+        runs = {
+            "python": best(compile_to_callable(program), arguments),
+            "trampoline": best(compile_to_callable(program, trampoline=True), arguments),
+            "vm": best(vm.compile_to_callable(program), arguments),
+        }
+        results = {result for _, result in runs.values() if result is not None}
+        assert len(results) == 1, f"{name}: backends disagree: {results}"
+
+        cells = ["overflow" if seconds is None else f"{seconds * 1000:.2f}ms" for seconds, _ in runs.values()]
+        print(f"{name:>8} " + " ".join(f"{cell:>12}" for cell in cells) + f" {len(vm.assemble(program).code):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from L0 import syntax as L0
+
+# Liveness-based local coalescing. A procedure body is a tree: branches fork but never join, and there are no loops,
+# so each variable's live range ends at its last use on every path. Walking the tree forward, a variable takes over
+# the slot (Python local) of a variable that died earlier on the same path. A copy whose source dies at the copy
+# hands the source's slot to its destination and disappears, as does a copy whose destination is never used.
+# Binders are assumed unique within a procedure, as closure conversion of uniqified code guarantees.
+#
+# Parameter slots are never reassigned. The trampolined entry procedure reads its parameters from an enclosing
+# Python function, where writing one would turn it into an unbound local of the inner function.
+
+
+def _uses(statement: L0.Statement) -> list[L0.Identifier]:
+    match statement:
+        case L0.Copy(source=source):
+            return [source]
+
+        case L0.Primitive(left=left, right=right) | L0.Branch(left=left, right=right):
+            return [left, right]
+
+        case L0.Load(base=base):
+            return [base]
+
+        case L0.Store(base=base, value=value):
+            return [base, value]
+
+        case L0.Call(target=target, arguments=arguments):
+            return [target, *arguments]
+
+        case L0.Halt(value=value):
+            return [value]
+
+        case _:
+            return []
+
+
+@dataclass
+class _Liveness:
+    # A variable is live on entry to a statement when it is used in the subtree the statement starts: binders are
+    # unique, so no redefinition on the way can hide the use. Statements are numbered in preorder, which makes every
+    # subtree a range of positions, and a variable's uses are kept as a sorted list of positions, so a query is one
+    # bisection rather than a set of live variables per statement.
+    ranges: dict[int, tuple[int, int]] = field(default_factory=dict[int, tuple[int, int]])
+    uses: dict[L0.Identifier, list[int]] = field(default_factory=dict[L0.Identifier, list[int]])
+
+    def collect(self, statement: L0.Statement) -> None:
+        start = len(self.ranges)
+        self.ranges[id(statement)] = (start, start)
+        for name in _uses(statement):
+            self.uses.setdefault(name, []).append(start)
+        match statement:
+            case L0.Branch(then=then, otherwise=otherwise):
+                self.collect(then)
+                self.collect(otherwise)
+
+            case L0.Call() | L0.Halt():
+                pass
+
+            case (  # pragma: no branch
+                L0.Copy(then=then)
+                | L0.Immediate(then=then)
+                | L0.Primitive(then=then)
+                | L0.Allocate(then=then)
+                | L0.Load(then=then)
+                | L0.Store(then=then)
+                | L0.Address(then=then)
+            ):
+                self.collect(then)
+        self.ranges[id(statement)] = (start, len(self.ranges))
+
+    def live(self, name: L0.Identifier, statement: L0.Statement) -> bool:
+        start, end = self.ranges[id(statement)]
+        positions = self.uses.get(name, [])
+        index = bisect_left(positions, start)
+        return index < len(positions) and positions[index] < end
+
+
+@dataclass
+class _Slots:
+    liveness: _Liveness
+    pinned: frozenset[L0.Identifier]
+    assigned: dict[L0.Identifier, L0.Identifier] = field(default_factory=dict[L0.Identifier, L0.Identifier])
+    free: list[L0.Identifier] = field(default_factory=list[L0.Identifier])
+
+    def fork(self) -> _Slots:
+        return _Slots(liveness=self.liveness, pinned=self.pinned, assigned=dict(self.assigned), free=list(self.free))
+
+    def release(self, names: frozenset[L0.Identifier]) -> None:
+        for name in sorted(names):
+            slot = self.assigned.pop(name)
+            if slot not in self.pinned:
+                self.free.append(slot)
+
+    def use(self, names: list[L0.Identifier], then: L0.Statement) -> list[L0.Identifier]:
+        # The slots of `names`; those that are not live after the statement become free for its destination.
+        slots = [self.assigned[name] for name in names]
+        self.release(frozenset(name for name in names if not self.liveness.live(name, then)))
+        return slots
+
+    def define(self, name: L0.Identifier, then: L0.Statement) -> L0.Identifier:
+        slot = self.free.pop() if self.free else name
+        self.assigned[name] = slot
+        if not self.liveness.live(name, then):
+            self.release(frozenset([name]))
+        return slot
+
+    def enter(self, statement: L0.Statement) -> L0.Statement:
+        # Variables live on the other side of a branch but not on this one are dead from here on.
+        self.release(frozenset(name for name in self.assigned if not self.liveness.live(name, statement)))
+        return self.coalesce(statement)
+
+    def coalesce(self, statement: L0.Statement) -> L0.Statement:
+        match statement:
+            case L0.Copy(destination=destination, source=source, then=then):
+                [slot] = self.use([source], then)
+                if not self.liveness.live(destination, then):
+                    return self.coalesce(then)
+                if self.liveness.live(source, then):
+                    return L0.Copy(
+                        destination=self.define(destination, then),
+                        source=slot,
+                        then=self.coalesce(then),
+                        span=statement.span,
+                    )
+                # The source dies here, so the destination lives on in its slot and the copy disappears.
+                if slot in self.free:
+                    self.free.remove(slot)
+                self.assigned[destination] = slot
+                return self.coalesce(then)
+
+            case L0.Immediate(destination=destination, value=value, then=then):
+                return L0.Immediate(
+                    destination=self.define(destination, then),
+                    value=value,
+                    then=self.coalesce(then),
+                    span=statement.span,
+                )
+
+            case L0.Primitive(destination=destination, operator=operator, left=left, right=right, then=then):
+                left, right = self.use([left, right], then)
+                return L0.Primitive(
+                    destination=self.define(destination, then),
+                    operator=operator,
+                    left=left,
+                    right=right,
+                    then=self.coalesce(then),
+                    span=statement.span,
+                )
+
+            case L0.Branch(operator=operator, left=left, right=right, then=then, otherwise=otherwise):
+                left, right = [self.assigned[left], self.assigned[right]]
+                return L0.Branch(
+                    operator=operator,
+                    left=left,
+                    right=right,
+                    then=self.fork().enter(then),
+                    otherwise=self.fork().enter(otherwise),
+                    span=statement.span,
+                )
+
+            case L0.Allocate(destination=destination, count=count, fill=fill, then=then):
+                return L0.Allocate(
+                    destination=self.define(destination, then),
+                    count=count,
+                    fill=fill,
+                    then=self.coalesce(then),
+                    span=statement.span,
+                )
+
+            case L0.Load(destination=destination, base=base, index=index, then=then):
+                [base] = self.use([base], then)
+                return L0.Load(
+                    destination=self.define(destination, then),
+                    base=base,
+                    index=index,
+                    then=self.coalesce(then),
+                    span=statement.span,
+                )
+
+            case L0.Store(base=base, index=index, value=value, then=then):
+                base, value = self.use([base, value], then)
+                return L0.Store(base=base, index=index, value=value, then=self.coalesce(then), span=statement.span)
+
+            case L0.Address(destination=destination, name=name, then=then):
+                return L0.Address(
+                    destination=self.define(destination, then), name=name, then=self.coalesce(then), span=statement.span
+                )
+
+            case L0.Call(target=target, arguments=arguments):
+                return L0.Call(
+                    target=self.assigned[target], arguments=[self.assigned[a] for a in arguments], span=statement.span
+                )
+
+            case L0.Halt(value=value):  # pragma: no branch
+                return L0.Halt(value=self.assigned[value], span=statement.span)
+
+
+def coalesce_procedure(procedure: L0.Procedure) -> L0.Procedure:
+    match procedure:
+        case L0.Procedure(parameters=parameters, body=body):  # pragma: no branch
+            liveness = _Liveness()
+            liveness.collect(body)
+            slots = _Slots(liveness=liveness, pinned=frozenset(parameters), assigned={p: p for p in parameters})
+            return L0.Procedure(name=procedure.name, parameters=parameters, body=slots.enter(body), span=procedure.span)
+
+
+def coalesce_program(program: L0.Program) -> L0.Program:
+    match program:
+        case L0.Program(procedures=procedures):  # pragma: no branch
+            return L0.Program(procedures=[coalesce_procedure(procedure) for procedure in procedures])
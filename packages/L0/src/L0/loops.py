@@ -0,0 +1,84 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from .syntax import (
+    Address,
+    Allocate,
+    Branch,
+    Call,
+    Copy,
+    Halt,
+    Identifier,
+    Immediate,
+    Load,
+    Primitive,
+    Procedure,
+    Statement,
+    Store,
+)
+
+# Self tail calls. Closure conversion addresses a closure's own code when the closure calls itself, and every call of
+# a lifted function addresses its procedure, so a self call is a Call whose target was last set by an Address of the
+# procedure's own name. Every call in L0 is a tail call and a closure holds copies of what it captures, so the
+# backends can rebind the parameters and jump back to the top of the procedure instead.
+
+
+@dataclass(frozen=True)
+class Loop:
+    parameters: Sequence[Identifier]
+    # The self calls, by identity.
+    calls: frozenset[int]
+
+
+@dataclass
+class _Calls:
+    procedure: Procedure
+    # The procedure each name holds, for the names last defined by an Address on the path being walked.
+    addresses: dict[Identifier, Identifier] = field(default_factory=dict[Identifier, Identifier])
+    calls: set[int] = field(default_factory=set[int])
+
+    def define(self, destination: Identifier, name: Identifier | None, then: Statement) -> None:
+        previous = self.addresses.pop(destination, None)
+        if name is not None:
+            self.addresses[destination] = name
+        self.collect(then)
+        self.addresses.pop(destination, None)
+        if previous is not None:
+            self.addresses[destination] = previous
+
+    def collect(self, statement: Statement) -> None:
+        match statement:
+            case Call(target=target, arguments=arguments):
+                if self.addresses.get(target) == self.procedure.name and len(arguments) == len(
+                    self.procedure.parameters
+                ):
+                    self.calls.add(id(statement))
+
+            case Halt():
+                pass
+
+            case Branch(then=then, otherwise=otherwise):
+                self.collect(then)
+                self.collect(otherwise)
+
+            case Store(then=then):
+                self.collect(then)
+
+            case Address(destination=destination, name=name, then=then):
+                self.define(destination, name, then)
+
+            case (  # pragma: no branch
+                Copy(destination=destination, then=then)
+                | Immediate(destination=destination, then=then)
+                | Primitive(destination=destination, then=then)
+                | Allocate(destination=destination, then=then)
+                | Load(destination=destination, then=then)
+            ):
+                self.define(destination, None, then)
+
+
+def find_loop(procedure: Procedure) -> Loop | None:
+    """The self calls of `procedure`, or None if it makes none."""
+    calls = _Calls(procedure)
+    calls.collect(procedure.body)
+    return Loop(parameters=procedure.parameters, calls=frozenset(calls.calls)) if calls.calls else None
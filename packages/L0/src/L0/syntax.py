@@ -2,11 +2,15 @@ from collections.abc import Sequence
 from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
+from util.source_map import Span
 
 type Identifier = Annotated[str, Field(min_length=1)]
 
 type Nat = Annotated[int, Field(ge=0)]
 
+# Where a node came from in the L3 source, when it was parsed with positions; not serialized or shown.
+Location = Annotated[Span | None, Field(exclude=True, repr=False)]
+
 
 class Program(BaseModel, frozen=True):
     tag: Literal["l0"] = "l0"
@@ -18,6 +22,7 @@ class Procedure(BaseModel, frozen=True):
     name: Identifier
     parameters: Sequence[Identifier]
     body: Statement
+    span: Location = None
 
 
 type Statement = Annotated[
@@ -31,6 +36,7 @@ class Copy(BaseModel, frozen=True):
     destination: Identifier
     source: Identifier
     then: Statement
+    span: Location = None
 
 
 class Immediate(BaseModel, frozen=True):
@@ -38,6 +44,7 @@ class Immediate(BaseModel, frozen=True):
     destination: Identifier
     value: int
     then: Statement
+    span: Location = None
 
 
 class Primitive(BaseModel, frozen=True):
@@ -47,6 +54,7 @@ class Primitive(BaseModel, frozen=True):
     left: Identifier
     right: Identifier
     then: Statement
+    span: Location = None
 
 
 class Branch(BaseModel, frozen=True):
@@ -56,13 +64,16 @@ class Branch(BaseModel, frozen=True):
     right: Identifier
     then: Statement
     otherwise: Statement
+    span: Location = None
 
 
 class Allocate(BaseModel, frozen=True):
     tag: Literal["allocate"] = "allocate"
     destination: Identifier
     count: Nat
+    fill: int | None = None
     then: Statement
+    span: Location = None
 
 
 class Load(BaseModel, frozen=True):
@@ -71,6 +82,7 @@ class Load(BaseModel, frozen=True):
     base: Identifier
     index: Nat
     then: Statement
+    span: Location = None
 
 
 class Store(BaseModel, frozen=True):
@@ -79,6 +91,7 @@ class Store(BaseModel, frozen=True):
     index: Nat
     value: Identifier
     then: Statement
+    span: Location = None
 
 
 class Address(BaseModel, frozen=True):
@@ -86,14 +99,17 @@ class Address(BaseModel, frozen=True):
     destination: Identifier
     name: Identifier
     then: Statement
+    span: Location = None
 
 
 class Call(BaseModel, frozen=True):
     tag: Literal["call"] = "call"
     target: Identifier
     arguments: Sequence[Identifier]
+    span: Location = None
 
 
 class Halt(BaseModel, frozen=True):
     tag: Literal["halt"] = "halt"
     value: Identifier
+    span: Location = None
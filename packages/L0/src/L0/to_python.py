@@ -1,9 +1,15 @@
 import ast
 from ast import stmt
+from collections.abc import Callable
 from functools import partial
 
 from util.encode import encode
+from util.instrument import Sites, counted, instrumentation
+from util.runtime import allocation, record_classes, slot_load, slot_store
+from util.source_map import locate
+from util.trampoline import drive, frame_allocation, frame_call, frame_function, frame_size
 
+from .loops import Loop, find_loop
 from .syntax import (
     Address,
     Allocate,
@@ -29,10 +35,42 @@ def store(name: str) -> ast.Name:
     return ast.Name(id=encode(name), ctx=ast.Store())
 
 
+def rebind(parameters: list[str], arguments: list[str]) -> list[ast.stmt]:
+    changed = [(parameter, argument) for parameter, argument in zip(parameters, arguments) if parameter != argument]
+    match changed:
+        case []:
+            return []
+
+        case [(parameter, argument)]:
+            return [ast.Assign(targets=[store(parameter)], value=load(argument))]
+
+        case _:
+            return [
+                ast.Assign(
+                    targets=[ast.Tuple(elts=[store(parameter) for parameter, _ in changed], ctx=ast.Store())],
+                    value=ast.Tuple(elts=[load(argument) for _, argument in changed], ctx=ast.Load()),
+                )
+            ]
+
+
+def loop_body(loop: Loop | None, body: list[ast.stmt]) -> list[ast.stmt]:
+    if loop is None:
+        return body
+    return [ast.While(test=ast.Constant(True), body=body)]
+
+
 def to_ast_statement(
     term: Statement,
+    trampoline: bool = False,
+    sites: Sites | None = None,
+    loop: Loop | None = None,
 ) -> list[ast.stmt]:
-    _statement: partial[list[stmt]] = partial(to_ast_statement)
+    # The statements generated for a term carry its L3 position, when it has one.
+    return locate(_to_ast_statement(term, trampoline, sites, loop), term.span)
+
+
+def _to_ast_statement(term: Statement, trampoline: bool, sites: Sites | None, loop: Loop | None) -> list[ast.stmt]:
+    _statement: partial[list[stmt]] = partial(to_ast_statement, trampoline=trampoline, sites=sites, loop=loop)
 
     match term:
         case Copy(destination=destination, source=source, then=then):
@@ -90,43 +128,24 @@ def to_ast_statement(
                 ),
             ]
 
-        case Allocate(destination=destination, count=count, then=then):
+        case Allocate(destination=destination, count=count, fill=fill, then=then):
             return [
-                ast.Assign(
-                    targets=[store(destination)],
-                    value=ast.List(
-                        elts=[ast.Constant(None) for _ in range(count)],
-                        ctx=ast.Load(),
-                    ),
-                ),
+                *counted(sites, "allocations", destination),
+                ast.Assign(targets=[store(destination)], value=allocation(count, fill)),
                 *_statement(then),
             ]
 
         case Load(destination=destination, base=base, index=index, then=then):
             return [
-                ast.Assign(
-                    targets=[store(destination)],
-                    value=ast.Subscript(
-                        value=load(base),
-                        slice=ast.Constant(index),
-                        ctx=ast.Load(),
-                    ),
-                ),
+                *counted(sites, "loads", f"{base}[{index}]"),
+                ast.Assign(targets=[store(destination)], value=slot_load(load(base), index)),
                 *_statement(then),
             ]
 
         case Store(base=base, index=index, value=value, then=then):
             return [
-                ast.Assign(
-                    targets=[
-                        ast.Subscript(
-                            value=store(base),
-                            slice=ast.Constant(index),
-                            ctx=ast.Store(),
-                        )
-                    ],
-                    value=load(value),
-                ),
+                *counted(sites, "stores", f"{base}[{index}]"),
+                ast.Assign(targets=[slot_store(load(base), index)], value=load(value)),
                 *_statement(then),
             ]
 
@@ -136,6 +155,12 @@ def to_ast_statement(
                 *_statement(then),
             ]
 
+        case Call(arguments=arguments) if loop is not None and id(term) in loop.calls:
+            return [*rebind([*loop.parameters], [*arguments]), ast.Continue()]
+
+        case Call(target=target, arguments=arguments) if trampoline:
+            return frame_call(load(target), [load(argument) for argument in arguments])
+
         case Call(target=target, arguments=arguments):
             return [
                 ast.Return(
@@ -152,23 +177,51 @@ def to_ast_statement(
             ]
 
 
-def to_ast_procedure(procedure: Procedure) -> ast.stmt:
-    _statement: partial[list[stmt]] = partial(to_ast_statement)
+def to_ast_procedure(procedure: Procedure, trampoline: bool = False, sites: Sites | None = None) -> ast.stmt:
+    [definition] = locate([_to_ast_procedure(procedure, trampoline, sites)], procedure.span)
+    return definition
+
+
+def _to_ast_procedure(procedure: Procedure, trampoline: bool, sites: Sites | None) -> ast.stmt:
+    # A procedure that calls itself runs as a `while True:` loop; the call counter goes inside it, so every iteration
+    # counts as a call.
+    loop = find_loop(procedure)
+    _statement: partial[list[stmt]] = partial(to_ast_statement, trampoline=trampoline, sites=sites, loop=loop)
 
     match procedure:
+        case Procedure(name=name, parameters=parameters, body=body) if trampoline and name == "l0":
+            # The entry point is called from Python with ordinary arguments and drives every call after it. Its body
+            # runs as a nested function that only reads the parameters, so it keeps its self calls as bounces.
+            _statement = partial(to_ast_statement, trampoline=trampoline, sites=sites)
+            return ast.FunctionDef(
+                name=name,
+                args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
+                body=[*counted(sites, "calls", name), *drive(_statement(body))],
+            )
+
+        case Procedure(name=name, parameters=parameters, body=body) if trampoline:
+            return frame_function(
+                name,
+                [store(parameter) for parameter in parameters],
+                loop_body(loop, [*counted(sites, "calls", name), *_statement(body)]),
+            )
+
         case Procedure(name=name, parameters=parameters, body=body):  # pragma: no branch
             return ast.FunctionDef(
                 name=name,
-                args=ast.arguments(args=[ast.arg(arg=parameter) for parameter in parameters]),
-                body=_statement(body),
+                args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
+                body=loop_body(loop, [*counted(sites, "calls", name), *_statement(body)]),
             )
 
 
-def to_ast_program(
+def to_ast_module(
     program: Program,
-) -> str:
-    _procedure = partial(to_ast_procedure)
-    _statement = partial(to_ast_statement)
+    trampoline: bool = False,
+    instrument: bool = False,
+    at_exit: bool = True,
+) -> ast.Module:
+    sites = Sites() if instrument else None
+    _procedure = partial(to_ast_procedure, trampoline=trampoline, sites=sites)
 
     match program:
         case Program(procedures=procedures):  # pragma: no branch
@@ -216,6 +269,33 @@ def to_ast_program(
                 ]
             )
 
-            ast.fix_missing_locations(module)
+            module.body[0:0] = record_classes(module)
+            if sites is not None:
+                module.body[0:0] = instrumentation(sites, at_exit)
+            if trampoline:
+                module.body.insert(0, frame_allocation(frame_size(module)))
+
+            return ast.fix_missing_locations(module)
+
+
+def to_ast_program(
+    program: Program,
+    trampoline: bool = False,
+    instrument: bool = False,
+) -> str:
+    return ast.unparse(to_ast_module(program, trampoline, instrument))
 
-            return ast.unparse(module)
+
+def compile_to_callable(
+    program: Program,
+    trampoline: bool = False,
+    instrument: bool = False,
+    filename: str | None = None,
+) -> Callable[..., int]:
+    # Compile the module in memory and hand back its entry point; `__name__` keeps the command-line stub inert.
+    # Naming the L3 source file lets tracebacks and profilers show the lines the code was generated from. The
+    # counters of an instrumented entry point are printed with `util.instrument.report`, not at exit.
+    namespace: dict[str, object] = {"__name__": "l0"}
+    module = to_ast_module(program, trampoline, instrument, at_exit=False)
+    exec(compile(module, filename or "<l0>", "exec"), namespace)
+    return namespace["l0"]  # type: ignore[return-value]
@@ -0,0 +1,235 @@
+from array import array
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from .syntax import (
+    Address,
+    Allocate,
+    Branch,
+    Call,
+    Copy,
+    Halt,
+    Immediate,
+    Identifier,
+    Load,
+    Primitive,
+    Procedure,
+    Program,
+    Statement,
+    Store,
+)
+
+# A register machine for L0. Every procedure body is laid out in one flat stream of 64-bit words: an opcode followed
+# by its operands. Operands are register numbers, except for constant pool indices, procedure numbers, record sizes
+# and slot indices, and jump targets. Each variable of a procedure gets its own register, parameters first, so a
+# procedure needs as many registers as it has distinct names; coalesced code needs fewer.
+#
+# Every call in L0 is a tail call, so a call replaces the register file instead of pushing a frame and the machine
+# runs any program in constant Python stack depth. A branch tests its operands and jumps to the otherwise arm when
+# the test fails; the then arm follows the branch in the stream.
+
+IMMEDIATE = 0  # destination, constant
+COPY = 1  # destination, source
+ADD = 2  # destination, left, right
+SUBTRACT = 3  # destination, left, right
+MULTIPLY = 4  # destination, left, right
+LESS = 5  # left, right, otherwise
+EQUAL = 6  # left, right, otherwise
+ALLOCATE = 7  # destination, count, fill
+LOAD = 8  # destination, base, index
+STORE = 9  # base, index, value
+ADDRESS = 10  # destination, procedure
+CALL = 11  # target, count, arguments...
+HALT = 12  # value
+
+NAMES = (
+    "immediate",
+    "copy",
+    "add",
+    "subtract",
+    "multiply",
+    "less",
+    "equal",
+    "allocate",
+    "load",
+    "store",
+    "address",
+    "call",
+    "halt",
+)
+
+_PRIMITIVES = {"+": ADD, "-": SUBTRACT, "*": MULTIPLY}
+_BRANCHES = {"<": LESS, "==": EQUAL}
+
+
+@dataclass(frozen=True)
+class Image:
+    code: array[int]
+    # Immediates and fill values are arbitrary-precision integers, so they live in a pool rather than in the code. An
+    # allocation without a fill value leaves its slots None.
+    constants: Sequence[int | None]
+    names: Sequence[Identifier]
+    offsets: Sequence[int]
+    sizes: Sequence[int]
+    entry: int
+
+
+@dataclass
+class _Assembler:
+    procedures: dict[Identifier, int]
+    code: array[int] = field(default_factory=lambda: array("q"))
+    constants: dict[int | None, int] = field(default_factory=dict[int | None, int])
+
+    def constant(self, value: int | None) -> int:
+        return self.constants.setdefault(value, len(self.constants))
+
+    def emit(self, *words: int) -> None:
+        self.code.extend(words)
+
+    def procedure(self, procedure: Procedure) -> int:
+        registers = {parameter: i for i, parameter in enumerate(procedure.parameters)}
+        self.statement(procedure.body, registers)
+        return len(registers)
+
+    def statement(self, statement: Statement, registers: dict[Identifier, int]) -> None:
+        def register(name: Identifier) -> int:
+            return registers.setdefault(name, len(registers))
+
+        match statement:
+            case Copy(destination=destination, source=source, then=then):
+                self.emit(COPY, register(destination), registers[source])
+                self.statement(then, registers)
+
+            case Immediate(destination=destination, value=value, then=then):
+                self.emit(IMMEDIATE, register(destination), self.constant(value))
+                self.statement(then, registers)
+
+            case Primitive(destination=destination, operator=operator, left=left, right=right, then=then):
+                self.emit(_PRIMITIVES[operator], register(destination), registers[left], registers[right])
+                self.statement(then, registers)
+
+            case Branch(operator=operator, left=left, right=right, then=then, otherwise=otherwise):
+                self.emit(_BRANCHES[operator], registers[left], registers[right], 0)
+                patch = len(self.code) - 1
+                self.statement(then, registers)
+                self.code[patch] = len(self.code)
+                self.statement(otherwise, registers)
+
+            case Allocate(destination=destination, count=count, fill=fill, then=then):
+                self.emit(ALLOCATE, register(destination), count, self.constant(fill))
+                self.statement(then, registers)
+
+            case Load(destination=destination, base=base, index=index, then=then):
+                self.emit(LOAD, register(destination), registers[base], index)
+                self.statement(then, registers)
+
+            case Store(base=base, index=index, value=value, then=then):
+                self.emit(STORE, registers[base], index, registers[value])
+                self.statement(then, registers)
+
+            case Address(destination=destination, name=name, then=then):
+                self.emit(ADDRESS, register(destination), self.procedures[name])
+                self.statement(then, registers)
+
+            case Call(target=target, arguments=arguments):
+                self.emit(CALL, registers[target], len(arguments), *[registers[argument] for argument in arguments])
+
+            case Halt(value=value):  # pragma: no branch
+                self.emit(HALT, registers[value])
+
+
+def assemble(program: Program) -> Image:
+    match program:
+        case Program(procedures=procedures):  # pragma: no branch
+            assembler = _Assembler(procedures={procedure.name: i for i, procedure in enumerate(procedures)})
+            offsets: list[int] = []
+            sizes: list[int] = []
+            for procedure in procedures:
+                offsets.append(len(assembler.code))
+                sizes.append(assembler.procedure(procedure))
+
+            return Image(
+                code=assembler.code,
+                constants=list(assembler.constants),
+                names=[procedure.name for procedure in procedures],
+                offsets=offsets,
+                sizes=sizes,
+                entry=assembler.procedures["l0"],
+            )
+
+
+def execute(image: Image, arguments: Sequence[int]) -> int:
+    code, constants, offsets, sizes = image.code, image.constants, image.offsets, image.sizes
+
+    registers: list[Any] = [*arguments, *[None] * (sizes[image.entry] - len(arguments))]
+    pc = offsets[image.entry]
+
+    # Dispatch is an if chain on the opcode, most frequent first; the operands are read straight from the code.
+    while True:
+        op = code[pc]
+        if op == LOAD:
+            registers[code[pc + 1]] = registers[code[pc + 2]][code[pc + 3]]
+            pc += 4
+        elif op == CALL:
+            procedure = registers[code[pc + 1]]
+            count = code[pc + 2]
+            frame = [registers[register] for register in code[pc + 3 : pc + 3 + count]]
+            frame += [None] * (sizes[procedure] - count)
+            registers = frame
+            pc = offsets[procedure]
+        elif op == ADDRESS:
+            registers[code[pc + 1]] = code[pc + 2]
+            pc += 3
+        elif op == IMMEDIATE:
+            registers[code[pc + 1]] = constants[code[pc + 2]]
+            pc += 3
+        elif op == STORE:
+            registers[code[pc + 1]][code[pc + 2]] = registers[code[pc + 3]]
+            pc += 4
+        elif op == ALLOCATE:
+            registers[code[pc + 1]] = [constants[code[pc + 3]]] * code[pc + 2]
+            pc += 4
+        elif op == ADD:
+            registers[code[pc + 1]] = registers[code[pc + 2]] + registers[code[pc + 3]]
+            pc += 4
+        elif op == SUBTRACT:
+            registers[code[pc + 1]] = registers[code[pc + 2]] - registers[code[pc + 3]]
+            pc += 4
+        elif op == MULTIPLY:
+            registers[code[pc + 1]] = registers[code[pc + 2]] * registers[code[pc + 3]]
+            pc += 4
+        elif op == LESS:
+            pc = pc + 4 if registers[code[pc + 1]] < registers[code[pc + 2]] else code[pc + 3]
+        elif op == EQUAL:
+            pc = pc + 4 if registers[code[pc + 1]] == registers[code[pc + 2]] else code[pc + 3]
+        elif op == COPY:
+            registers[code[pc + 1]] = registers[code[pc + 2]]
+            pc += 3
+        else:
+            return registers[code[pc + 1]]
+
+
+def disassemble(image: Image) -> str:
+    widths = {IMMEDIATE: 3, COPY: 3, ADDRESS: 3, HALT: 2}
+    lines: list[str] = []
+    starts = {offset: name for name, offset in zip(image.names, image.offsets, strict=True)}
+    pc = 0
+    while pc < len(image.code):
+        if pc in starts:
+            lines.append(f"{starts[pc]}:")
+        op = image.code[pc]
+        width = 3 + image.code[pc + 2] if op == CALL else widths.get(op, 4)
+        operands = " ".join(str(word) for word in image.code[pc + 1 : pc + width])
+        lines.append(f"{pc:>6} {NAMES[op]:<9} {operands}".rstrip())
+        pc += width
+    return "\n".join(lines)
+
+
+def compile_to_callable(program: Program) -> Callable[..., int]:
+    image = assemble(program)
+
+    def l0(*arguments: int) -> int:
+        return execute(image, arguments)
+
+    return l0
@@ -0,0 +1,188 @@
+from L0.coalesce import coalesce_procedure, coalesce_program
+from L0.syntax import Address, Allocate, Branch, Call, Copy, Halt, Immediate, Load, Primitive, Procedure, Program, Store
+from L0.to_python import compile_to_callable
+
+
+def test_coalesce_copy_and_dead_slots():
+    # The closure copy disappears into the parameter slot, and z reuses the slot of y, which dies at the addition.
+    procedure = Procedure(
+        name="code",
+        parameters=["env", "x"],
+        body=Copy(
+            destination="self",
+            source="env",
+            then=Load(
+                destination="y",
+                base="self",
+                index=1,
+                then=Primitive(destination="z", operator="+", left="x", right="y", then=Halt(value="z")),
+            ),
+        ),
+    )
+
+    assert coalesce_procedure(procedure) == Procedure(
+        name="code",
+        parameters=["env", "x"],
+        body=Load(
+            destination="y",
+            base="env",
+            index=1,
+            then=Primitive(destination="y", operator="+", left="x", right="y", then=Halt(value="y")),
+        ),
+    )
+
+
+def test_coalesce_branches():
+    # a is dead in the otherwise branch from the start, so its slot is free there but not in the then branch.
+    # e is never used; it still needs a slot for its assignment, which is free again right after.
+    procedure = Procedure(
+        name="l0",
+        parameters=["n"],
+        body=Immediate(
+            destination="a",
+            value=1,
+            then=Branch(
+                operator="<",
+                left="n",
+                right="n",
+                then=Immediate(
+                    destination="b",
+                    value=2,
+                    then=Primitive(destination="c", operator="+", left="a", right="b", then=Halt(value="c")),
+                ),
+                otherwise=Immediate(
+                    destination="d",
+                    value=3,
+                    then=Immediate(destination="e", value=4, then=Halt(value="d")),
+                ),
+            ),
+        ),
+    )
+
+    assert coalesce_procedure(procedure) == Procedure(
+        name="l0",
+        parameters=["n"],
+        body=Immediate(
+            destination="a",
+            value=1,
+            then=Branch(
+                operator="<",
+                left="n",
+                right="n",
+                then=Immediate(
+                    destination="b",
+                    value=2,
+                    then=Primitive(destination="b", operator="+", left="a", right="b", then=Halt(value="b")),
+                ),
+                otherwise=Immediate(
+                    destination="a",
+                    value=3,
+                    then=Immediate(destination="e", value=4, then=Halt(value="a")),
+                ),
+            ),
+        ),
+    )
+
+
+def test_coalesce_program():
+    # l0(n) = f(n, c) where c is a record holding n + 1 and f(x, c) = 2 * c[0] + x, with kept, dead and coalesced
+    # copies.
+    program = Program(
+        procedures=[
+            Procedure(
+                name="f",
+                parameters=["x", "cell"],
+                body=Load(
+                    destination="v",
+                    base="cell",
+                    index=0,
+                    then=Copy(
+                        destination="w",
+                        source="v",
+                        then=Copy(
+                            destination="unused",
+                            source="w",
+                            then=Primitive(
+                                destination="s",
+                                operator="+",
+                                left="w",
+                                right="v",
+                                then=Primitive(
+                                    destination="r",
+                                    operator="+",
+                                    left="s",
+                                    right="x",
+                                    then=Copy(destination="t", source="r", then=Halt(value="t")),
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+            Procedure(
+                name="l0",
+                parameters=["n"],
+                body=Immediate(
+                    destination="one",
+                    value=1,
+                    then=Primitive(
+                        destination="m",
+                        operator="+",
+                        left="n",
+                        right="one",
+                        then=Allocate(
+                            destination="c",
+                            count=1,
+                            then=Store(
+                                base="c",
+                                index=0,
+                                value="m",
+                                then=Address(destination="g", name="f", then=Call(target="g", arguments=["n", "c"])),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        ]
+    )
+
+    coalesced = coalesce_program(program)
+
+    assert coalesced.procedures[0].body == Load(
+        destination="v",
+        base="cell",
+        index=0,
+        then=Copy(
+            destination="w",
+            source="v",
+            then=Primitive(
+                destination="w",
+                operator="+",
+                left="w",
+                right="v",
+                then=Primitive(destination="w", operator="+", left="w", right="x", then=Halt(value="w")),
+            ),
+        ),
+    )
+    assert coalesced.procedures[1].body == Immediate(
+        destination="one",
+        value=1,
+        then=Primitive(
+            destination="one",
+            operator="+",
+            left="n",
+            right="one",
+            then=Allocate(
+                destination="c",
+                count=1,
+                then=Store(
+                    base="c",
+                    index=0,
+                    value="one",
+                    then=Address(destination="one", name="f", then=Call(target="one", arguments=["n", "c"])),
+                ),
+            ),
+        ),
+    )
+    for trampoline in (False, True):
+        assert compile_to_callable(coalesced, trampoline=trampoline)(4) == compile_to_callable(program)(4) == 14
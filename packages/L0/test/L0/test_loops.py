@@ -0,0 +1,48 @@
+import ast
+
+from L0.loops import find_loop
+from L0.syntax import Address, Branch, Call, Copy, Halt, Procedure
+from L0.to_python import rebind
+
+
+def test_find_loop():
+    # loop(n) = n if n == 0 else loop(n), with the self call reached through a fresh Address
+    call = Call(target="f", arguments=["n"])
+    procedure = Procedure(
+        name="loop",
+        parameters=["n"],
+        body=Branch(
+            operator="==",
+            left="n",
+            right="n",
+            then=Halt(value="n"),
+            otherwise=Address(destination="f", name="loop", then=call),
+        ),
+    )
+    loop = find_loop(procedure)
+
+    assert loop is not None
+    assert loop.parameters == ["n"]
+    assert loop.calls == frozenset({id(call)})
+
+
+def test_find_loop_not_a_self_call():
+    # f is redefined by a Copy before the call, or addresses another procedure, or the arity differs.
+    for body in (
+        Address(
+            destination="f", name="loop", then=Copy(destination="f", source="n", then=Call(target="f", arguments=["n"]))
+        ),
+        Address(destination="f", name="other", then=Call(target="f", arguments=["n"])),
+        Address(destination="f", name="loop", then=Call(target="f", arguments=["n", "n"])),
+        Halt(value="n"),
+    ):
+        assert find_loop(Procedure(name="loop", parameters=["n"], body=body)) is None
+
+
+def test_rebind():
+    def unparse(statements: list[ast.stmt]) -> str:
+        return ast.unparse(ast.fix_missing_locations(ast.Module(body=statements)))
+
+    assert rebind([], []) == []
+    assert unparse(rebind(["x", "y"], ["x", "z"])) == "y = z"
+    assert unparse(rebind(["x", "y"], ["y", "x"])) == "x, y = (y, x)"
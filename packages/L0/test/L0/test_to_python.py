@@ -0,0 +1,120 @@
+from L0.syntax import Address, Allocate, Branch, Call, Halt, Immediate, Load, Primitive, Procedure, Program, Store
+from L0.to_python import compile_to_callable, to_ast_program
+
+# l0(n) = loop(n, 0) where loop(n, acc) = acc if n == 0 else loop(n - 1, acc + n)
+SUM = Program(
+    procedures=[
+        Procedure(
+            name="loop",
+            parameters=["n", "acc"],
+            body=Immediate(
+                destination="zero",
+                value=0,
+                then=Branch(
+                    operator="==",
+                    left="n",
+                    right="zero",
+                    then=Halt(value="acc"),
+                    otherwise=Immediate(
+                        destination="one",
+                        value=1,
+                        then=Primitive(
+                            destination="m",
+                            operator="-",
+                            left="n",
+                            right="one",
+                            then=Primitive(
+                                destination="total",
+                                operator="+",
+                                left="acc",
+                                right="n",
+                                then=Address(
+                                    destination="f",
+                                    name="loop",
+                                    then=Call(target="f", arguments=["m", "total"]),
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+        Procedure(
+            name="l0",
+            parameters=["n"],
+            body=Immediate(
+                destination="acc",
+                value=0,
+                then=Address(destination="f", name="loop", then=Call(target="f", arguments=["n", "acc"])),
+            ),
+        ),
+    ]
+)
+
+
+def run(program: Program, *arguments: int, trampoline: bool) -> object:
+    namespace: dict[str, object] = {}
+    exec(to_ast_program(program, trampoline=trampoline), namespace)
+    return namespace["l0"](*arguments)  # type: ignore[operator]
+
+
+def test_to_ast_program():
+    # loop calls itself, so it runs as a loop rather than a Python call.
+    source = to_ast_program(SUM)
+
+    assert "def loop(n, acc):\n    while True:" in source
+    assert "return f(m, total)" not in source
+    assert run(SUM, 10, trampoline=False) == 55
+    assert run(SUM, 100_000, trampoline=False) == 5_000_050_000
+
+
+def test_to_ast_program_trampoline():
+    source = to_ast_program(SUM, trampoline=True)
+
+    assert source.startswith("_frame = [None] * 3\n")
+    assert "def loop():\n    n = _frame[1]\n    acc = _frame[2]" in source
+    assert "return f(" not in source
+    assert run(SUM, 10, trampoline=True) == 55
+    assert run(SUM, 100_000, trampoline=True) == 5_000_050_000
+
+
+def test_compile_to_callable():
+    assert compile_to_callable(SUM)(10) == 55
+    assert compile_to_callable(SUM, trampoline=True)(100_000) == 5_000_050_000
+
+
+def test_compile_to_callable_instrumented():
+    for trampoline in (False, True):
+        entry = compile_to_callable(SUM, trampoline=trampoline, instrument=True)
+
+        assert entry(10) == 55
+        counts = dict(zip(entry.__globals__["_sites"], entry.__globals__["_counters"]))
+        assert counts == {("calls", "loop"): 11, ("calls", "l0"): 1}
+
+
+def test_to_ast_program_records():
+    # l0(n) = let c = allocate 2 in c[1] := n; c[1]
+    program = Program(
+        procedures=[
+            Procedure(
+                name="l0",
+                parameters=["n"],
+                body=Allocate(
+                    destination="c",
+                    count=2,
+                    then=Store(
+                        base="c",
+                        index=1,
+                        value="n",
+                        then=Load(destination="v", base="c", index=1, then=Halt(value="v")),
+                    ),
+                ),
+            )
+        ]
+    )
+    source = to_ast_program(program)
+
+    assert source.startswith("class _Record2:\n    __slots__ = ('f0', 'f1')\n")
+    assert "c = _Record2()" in source
+    assert "c.f1 = n" in source
+    assert compile_to_callable(program)(7) == 7
@@ -0,0 +1,163 @@
+from L0.syntax import Address, Allocate, Branch, Call, Copy, Halt, Immediate, Load, Primitive, Procedure, Program, Store
+from L0.to_python import compile_to_callable as compile_to_python
+from L0.vm import assemble, compile_to_callable, disassemble
+
+# l0(n) = loop(n, 0) where loop(n, acc) = acc if n == 0 else loop(n - 1, acc + n)
+SUM = Program(
+    procedures=[
+        Procedure(
+            name="loop",
+            parameters=["n", "acc"],
+            body=Immediate(
+                destination="zero",
+                value=0,
+                then=Branch(
+                    operator="==",
+                    left="n",
+                    right="zero",
+                    then=Halt(value="acc"),
+                    otherwise=Immediate(
+                        destination="one",
+                        value=1,
+                        then=Primitive(
+                            destination="m",
+                            operator="-",
+                            left="n",
+                            right="one",
+                            then=Primitive(
+                                destination="total",
+                                operator="+",
+                                left="acc",
+                                right="n",
+                                then=Address(
+                                    destination="f",
+                                    name="loop",
+                                    then=Call(target="f", arguments=["m", "total"]),
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+        Procedure(
+            name="l0",
+            parameters=["n"],
+            body=Immediate(
+                destination="acc",
+                value=0,
+                then=Address(destination="f", name="loop", then=Call(target="f", arguments=["n", "acc"])),
+            ),
+        ),
+    ]
+)
+
+
+def test_assemble():
+    image = assemble(SUM)
+
+    assert image.sizes == [7, 3]
+    assert image.entry == 1
+    assert disassemble(image) == "\n".join(
+        [
+            "loop:",
+            "     0 immediate 2 0",
+            "     3 equal     0 2 9",
+            "     7 halt      1",
+            "     9 immediate 3 1",
+            "    12 subtract  4 0 3",
+            "    16 add       5 1 0",
+            "    20 address   6 0",
+            "    23 call      6 2 4 5",
+            "l0:",
+            "    28 immediate 1 0",
+            "    31 address   2 0",
+            "    34 call      2 2 0 1",
+        ]
+    )
+
+
+def test_execute():
+    # Tail calls replace the register file, so a long loop needs no Python stack.
+    assert compile_to_callable(SUM)(10) == 55
+    assert compile_to_callable(SUM)(100_000) == 5_000_050_000
+
+
+def test_execute_records():
+    # l0(n) = let c = allocate 2 in c[1] := n * big; (c[1] if n < big else n) where big does not fit in 64 bits
+    program = Program(
+        procedures=[
+            Procedure(
+                name="l0",
+                parameters=["n"],
+                body=Immediate(
+                    destination="big",
+                    value=2**70,
+                    then=Allocate(
+                        destination="c",
+                        count=2,
+                        then=Primitive(
+                            destination="p",
+                            operator="*",
+                            left="n",
+                            right="big",
+                            then=Store(
+                                base="c",
+                                index=1,
+                                value="p",
+                                then=Branch(
+                                    operator="<",
+                                    left="n",
+                                    right="big",
+                                    then=Load(destination="v", base="c", index=1, then=Halt(value="v")),
+                                    otherwise=Copy(destination="w", source="n", then=Halt(value="w")),
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            )
+        ]
+    )
+
+    for n in (3, 2**71):
+        assert compile_to_callable(program)(n) == compile_to_python(program)(n)
+    assert compile_to_callable(program)(3) == 3 * 2**70
+
+
+def test_execute_filled():
+    # l0(n) = let c = allocate 3 filled with 7 in c[1] := n; c[1] + c[2]
+    program = Program(
+        procedures=[
+            Procedure(
+                name="l0",
+                parameters=["n"],
+                body=Allocate(
+                    destination="c",
+                    count=3,
+                    fill=7,
+                    then=Store(
+                        base="c",
+                        index=1,
+                        value="n",
+                        then=Load(
+                            destination="a",
+                            base="c",
+                            index=1,
+                            then=Load(
+                                destination="b",
+                                base="c",
+                                index=2,
+                                then=Primitive(
+                                    destination="s", operator="+", left="a", right="b", then=Halt(value="s")
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            )
+        ]
+    )
+
+    assert compile_to_callable(program)(5) == compile_to_python(program)(5) == 12
+    assert disassemble(assemble(program)).splitlines()[1] == "     0 allocate  1 3 0"
@@ -1,4 +1,5 @@
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
 from functools import partial
 
 from L0 import syntax as L0
@@ -6,84 +7,194 @@ from util.sequential_name_generator import SequentialNameGenerator
 
 from L1 import syntax as L1
 
+from .free import annotate_free
+from .loops import function_targets
 
-def get_free(statement: L1.Statement, in_use: set[L1.Identifier]) -> dict[L1.Identifier, None]:
-    match statement:
-        case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
-            return get_free(statement=body, in_use=in_use | set([*parameters, *[destination]])) | get_free(
-                statement=then, in_use=in_use | set([destination])
-            )
-        case L1.Apply(target=target, arguments=arguments):
-            return {a: None for a in [*arguments, *[target]] if a not in in_use}
-        case L1.Copy(destination=destination, source=source, then=then):
-            so: dict[L1.Identifier, None] = {} if source in in_use else {source: None}
-            return so | get_free(statement=then, in_use=in_use | set([destination]))
-        case L1.Immediate(destination=destination, value=value, then=then):
-            return get_free(statement=then, in_use=in_use | set([destination]))
-        case L1.Primitive(destination=destination, operator=_, left=left, right=right, then=then):
-            le: dict[L1.Identifier, None] = {} if left in in_use else {left: None}
-            ri: dict[L1.Identifier, None] = {} if right in in_use else {right: None}
-            return le | ri | get_free(statement=then, in_use=in_use | set([destination]))
-        case L1.Branch(operator=_, left=left, right=right, then=then, otherwise=otherwise):
-            le: dict[L1.Identifier, None] = {} if left in in_use else {left: None}
-            ri: dict[L1.Identifier, None] = {} if right in in_use else {right: None}
-            return le | ri | get_free(statement=then, in_use=in_use) | get_free(statement=otherwise, in_use=in_use)
-        case L1.Allocate(destination=destination, count=_, then=then):
-            return get_free(statement=then, in_use=in_use | set([destination]))
-        case L1.Load(destination=destination, base=base, index=_, then=then):
-            ba: dict[L1.Identifier, None] = {} if base in in_use else {base: None}
-            return ba | get_free(statement=then, in_use=in_use | set([destination]))
-        case L1.Store(base=base, index=_, value=value, then=then):
-            ba: dict[L1.Identifier, None] = {} if base in in_use else {base: None}
-            va: dict[L1.Identifier, None] = {} if value in in_use else {value: None}
-            return ba | va | get_free(statement=then, in_use=in_use)
-        case L1.Halt(value=value):
-            return {} if value in in_use else {value: None}
-        case _:  # pragma: no cover
-            return
+
+# Lambda lifting. A function whose name is only ever the target of an Apply is known at every call site, so it needs
+# no closure: it becomes a top-level procedure that takes its free variables as extra leading parameters, and every
+# call site addresses it directly. Call sites lie in the scope of the definition, where those variables are visible;
+# a function defined in between that makes such a call captures them in place of the callee. That breaks down only
+# for a function that calls itself with free variables, which keeps its closure. Join points introduced by CPS
+# conversion and functions bound by `let` are the common cases. Binders are assumed unique, as closure conversion of
+# uniqified code guarantees.
+
+
+@dataclass
+class _Calls:
+    defined: dict[L1.Identifier, L1.Abstract] = field(default_factory=dict[L1.Identifier, L1.Abstract])
+    escaping: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+    # Functions called from within their own body, and the functions whose body the walk is in.
+    recursive: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+    enclosing: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+
+    def collect(self, statement: L1.Statement) -> None:
+        match statement:
+            case L1.Abstract(destination=destination, body=body, then=then):
+                self.defined[destination] = statement
+                self.enclosing.add(destination)
+                self.collect(body)
+                self.enclosing.remove(destination)
+                self.collect(then)
+            case L1.Apply(target=target, arguments=arguments):
+                if target in self.enclosing:
+                    self.recursive.add(target)
+                self.escaping.update(arguments)
+            case L1.Branch(left=left, right=right, then=then, otherwise=otherwise):
+                self.escaping.update([left, right])
+                self.collect(then)
+                self.collect(otherwise)
+            case L1.Halt(value=value):
+                self.escaping.add(value)
+            case L1.Copy(source=source, then=then):
+                self.escaping.add(source)
+                self.collect(then)
+            case L1.Primitive(left=left, right=right, then=then):
+                self.escaping.update([left, right])
+                self.collect(then)
+            case L1.Load(base=base, then=then):
+                self.escaping.add(base)
+                self.collect(then)
+            case L1.Store(base=base, value=value, then=then):
+                self.escaping.update([base, value])
+                self.collect(then)
+            case L1.Immediate(then=then) | L1.Allocate(then=then):
+                self.collect(then)
+            case _:  # pragma: no cover
+                return
+
+
+@dataclass(frozen=True)
+class Closures:
+    # Free variables of every Abstract's body by identity; the procedure name and extra leading arguments of every
+    # lifted function by name.
+    free: Mapping[int, dict[L1.Identifier, None]]
+    lifted: Mapping[L1.Identifier, L1.Identifier]
+    captured: Mapping[L1.Identifier, list[L1.Identifier]]
+    # Names known to denote a function, so that a closure calling itself can address its own code directly.
+    targets: Mapping[L1.Identifier, L1.Identifier] = field(default_factory=dict[L1.Identifier, L1.Identifier])
+
+
+def analyze_closures(statement: L1.Statement, fresh: Callable[[str], str]) -> Closures:
+    calls = _Calls()
+    calls.collect(statement)
+    free: dict[int, dict[L1.Identifier, None]] = {}
+    annotate_free(statement, free)
+
+    lifted = {
+        name: id(abstract)
+        for name, abstract in calls.defined.items()
+        if name not in calls.escaping and (not free[id(abstract)] or name not in calls.recursive)
+    }
+    if lifted:
+        free = {}
+        annotate_free(statement, free, lifted)
+
+    return Closures(
+        free=free,
+        lifted={name: fresh("lifted_code") for name in lifted},
+        captured={name: list(free[abstract]) for name, abstract in lifted.items()},
+        targets=function_targets(statement),
+    )
 
 
 def close_statement(
     statement: L1.Statement,
     procedures: list[L0.Procedure],
     fresh: Callable[[str], str],
+    closures: Closures | None = None,
+    current: tuple[L1.Abstract, str] | None = None,
 ) -> L0.Statement:
-    _close_statement = partial(close_statement, procedures=procedures, fresh=fresh)
+    # `current` is the closure whose procedure is being generated, with the name of its code.
+    if closures is None:
+        closures = analyze_closures(statement, fresh)
+
+    _close_statement = partial(close_statement, procedures=procedures, fresh=fresh, closures=closures, current=current)
     match statement:
+        case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then) if (
+            destination in closures.lifted
+        ):
+            body_closed = close_statement(body, procedures, fresh, closures)
+            procedures.append(
+                L0.Procedure(
+                    name=closures.lifted[destination],
+                    parameters=[*closures.captured[destination], *parameters],
+                    body=body_closed,
+                    span=statement.span,
+                )
+            )
+            return _close_statement(then)
         case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
             code = fresh("abstract_code")
             env = fresh("abstract_env")
             heap = fresh("abstract_heap")
-            body_closed = _close_statement(body)
-            body_free_dict = get_free(statement=body, in_use=set([*[destination], *parameters]))
+            body_closed = close_statement(body, procedures, fresh, closures, (statement, code))
+            body_free_dict = closures.free[id(statement)]
             for i, free in enumerate(body_free_dict):
-                body_closed = L0.Load(destination=free, base=env, index=i + 1, then=body_closed)
+                body_closed = L0.Load(destination=free, base=env, index=i + 1, then=body_closed, span=statement.span)
 
-            body_closed = L0.Copy(destination=destination, source=env, then=body_closed)
-            procedures.append(L0.Procedure(name=code, parameters=[*[env], *parameters], body=body_closed))
+            body_closed = L0.Copy(destination=destination, source=env, then=body_closed, span=statement.span)
+            procedures.append(
+                L0.Procedure(name=code, parameters=[*[env], *parameters], body=body_closed, span=statement.span)
+            )
 
             then_ = _close_statement(then)
             for i, free in enumerate(body_free_dict):
-                then_ = L0.Store(base=destination, index=i + 1, value=free, then=then_)
+                then_ = L0.Store(base=destination, index=i + 1, value=free, then=then_, span=statement.span)
             return L0.Allocate(
                 destination=destination,
                 count=len(body_free_dict.keys()) + 1,
                 then=L0.Address(
-                    destination=heap, name=code, then=L0.Store(base=destination, index=0, value=heap, then=then_)
+                    destination=heap,
+                    name=code,
+                    then=L0.Store(base=destination, index=0, value=heap, then=then_, span=statement.span),
+                    span=statement.span,
                 ),
+                span=statement.span,
+            )
+        case L1.Apply(target=target, arguments=arguments) if target in closures.lifted:
+            code = fresh("apply_code")
+            return L0.Address(
+                destination=code,
+                name=closures.lifted[target],
+                then=L0.Call(target=code, arguments=[*closures.captured[target], *arguments], span=statement.span),
+                span=statement.span,
+            )
+        case L1.Apply(target=target, arguments=arguments) if (
+            current is not None
+            and closures.targets.get(target) == current[0].destination
+            and len(arguments) == len(current[0].parameters)
+        ):
+            # A closure calling itself: the target holds this very closure, so its code is known. Addressing the code
+            # directly lets the backends see the self tail call.
+            code = fresh("apply_code")
+            return L0.Address(
+                destination=code,
+                name=current[1],
+                then=L0.Call(target=code, arguments=[target, *arguments], span=statement.span),
+                span=statement.span,
             )
         case L1.Apply(target=target, arguments=arguments):
             code = fresh("apply_code")
             return L0.Load(
-                destination=code, base=target, index=0, then=L0.Call(target=code, arguments=[*[target], *arguments])
+                destination=code,
+                base=target,
+                index=0,
+                then=L0.Call(target=code, arguments=[*[target], *arguments], span=statement.span),
+                span=statement.span,
             )
         case L1.Copy(destination=destination, source=source, then=then):
-            return L0.Copy(destination=destination, source=source, then=_close_statement(then))
+            return L0.Copy(destination=destination, source=source, then=_close_statement(then), span=statement.span)
         case L1.Immediate(destination=destination, value=value, then=then):
-            return L0.Immediate(destination=destination, value=value, then=_close_statement(then))
+            return L0.Immediate(destination=destination, value=value, then=_close_statement(then), span=statement.span)
         case L1.Primitive(destination=destination, operator=operator, left=left, right=right, then=then):
             return L0.Primitive(
-                destination=destination, operator=operator, left=left, right=right, then=_close_statement(then)
+                destination=destination,
+                operator=operator,
+                left=left,
+                right=right,
+                then=_close_statement(then),
+                span=statement.span,
             )
         case L1.Branch(operator=operator, left=left, right=right, then=then, otherwise=otherwise):
             return L0.Branch(
@@ -92,15 +203,20 @@ def close_statement(
                 right=right,
                 then=_close_statement(then),
                 otherwise=_close_statement(otherwise),
+                span=statement.span,
+            )
+        case L1.Allocate(destination=destination, count=count, fill=fill, then=then):
+            return L0.Allocate(
+                destination=destination, count=count, fill=fill, then=_close_statement(then), span=statement.span
             )
-        case L1.Allocate(destination=destination, count=count, then=then):
-            return L0.Allocate(destination=destination, count=count, then=_close_statement(then))
         case L1.Load(destination=destination, base=base, index=index, then=then):
-            return L0.Load(destination=destination, base=base, index=index, then=_close_statement(then))
+            return L0.Load(
+                destination=destination, base=base, index=index, then=_close_statement(then), span=statement.span
+            )
         case L1.Store(base=base, index=index, value=value, then=then):
-            return L0.Store(base=base, index=index, value=value, then=_close_statement(then))
+            return L0.Store(base=base, index=index, value=value, then=_close_statement(then), span=statement.span)
         case L1.Halt(value=value):
-            return L0.Halt(value=value)
+            return L0.Halt(value=value, span=statement.span)
         case _:  # pragma: no cover
             return
 
@@ -113,7 +229,7 @@ def close_program(
             procedures: list[L0.Procedure] = []
             procedures.append(
                 L0.Procedure(
-                    name="main",
+                    name="l0",
                     parameters=parameters,
                     body=close_statement(statement=body, procedures=procedures, fresh=SequentialNameGenerator()),
                 )
@@ -0,0 +1,211 @@
+from collections import Counter, deque
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Literal
+
+from L1 import syntax as L1
+
+from .optimize import count_uses
+
+# Selective CPS. A CPS program can be emitted in direct style (native calls and returns) when its continuations
+# are second-class: each function's continuation is only invoked or passed on as the continuation of a call, and
+# no function captures a continuation it did not bind itself. Nothing in L2 can reify a continuation, so every
+# program cps_convert produces qualifies; the analysis still checks rather than assumes.
+#
+# L1 does not say which names are continuations. `f(x)` either returns x to the continuation f or calls the
+# nullary function f with the continuation x, so kinds are inferred: every use of a name constrains it to be a
+# value, a continuation, or the opposite kind of some other name, and the constraints are solved by propagating
+# from the names whose kind is fixed.
+
+type Kind = Literal["value", "continuation"]
+
+PROGRAM = "<program>"
+
+
+def _opposite(kind: Kind) -> Kind:
+    return "continuation" if kind == "value" else "value"
+
+
+@dataclass
+class _Constraints:
+    fixed: dict[L1.Identifier, Kind] = field(default_factory=dict[L1.Identifier, Kind])
+    opposite: dict[L1.Identifier, list[L1.Identifier]] = field(default_factory=dict[L1.Identifier, list[L1.Identifier]])
+    same: dict[L1.Identifier, list[L1.Identifier]] = field(default_factory=dict[L1.Identifier, list[L1.Identifier]])
+    problems: list[str] = field(default_factory=list[str])
+
+    def fix(self, kind: Kind, *names: L1.Identifier) -> None:
+        for name in names:
+            if self.fixed.setdefault(name, kind) != kind:
+                self.problems.append(f"{name} is used as both a value and a continuation")
+
+    def relate(self, left: L1.Identifier, right: L1.Identifier, same: bool) -> None:
+        edges = self.same if same else self.opposite
+        edges.setdefault(left, []).append(right)
+        edges.setdefault(right, []).append(left)
+
+    def collect(self, statement: L1.Statement) -> None:
+        match statement:
+            case L1.Copy(destination=destination, source=source, then=then):
+                self.relate(destination, source, same=True)
+                self.collect(then)
+
+            case L1.Abstract(destination=destination, parameters=[*values, continuation], body=body, then=then):
+                if values:
+                    self.fix("value", destination, *values)
+                    self.fix("continuation", continuation)
+                else:
+                    self.relate(destination, continuation, same=False)
+                self.collect(body)
+                self.collect(then)
+
+            case L1.Abstract(destination=destination, body=body, then=then):
+                self.problems.append(f"{destination} takes no continuation")
+                self.collect(body)
+                self.collect(then)
+
+            case L1.Apply(target=target, arguments=[*values, continuation]):
+                if values:
+                    self.fix("value", target, *values)
+                    self.fix("continuation", continuation)
+                else:
+                    self.relate(target, continuation, same=False)
+
+            case L1.Apply(target=target):
+                self.problems.append(f"{target} is called without a continuation")
+
+            case L1.Immediate(destination=destination, then=then) | L1.Allocate(destination=destination, then=then):
+                self.fix("value", destination)
+                self.collect(then)
+
+            case L1.Primitive(destination=destination, left=left, right=right, then=then):
+                self.fix("value", destination, left, right)
+                self.collect(then)
+
+            case L1.Branch(left=left, right=right, then=then, otherwise=otherwise):
+                self.fix("value", left, right)
+                self.collect(then)
+                self.collect(otherwise)
+
+            case L1.Load(destination=destination, base=base, then=then):
+                self.fix("value", destination, base)
+                self.collect(then)
+
+            case L1.Store(base=base, value=value, then=then):
+                self.fix("value", base, value)
+                self.collect(then)
+
+            case L1.Halt(value=value):  # pragma: no branch
+                self.fix("value", value)
+
+    def solve(self) -> dict[L1.Identifier, Kind]:
+        kinds = dict(self.fixed)
+        queue = deque(kinds)
+        while queue:
+            name = queue.popleft()
+            for related, kind in [
+                *((other, kinds[name]) for other in self.same.get(name, [])),
+                *((other, _opposite(kinds[name])) for other in self.opposite.get(name, [])),
+            ]:
+                if related not in kinds:
+                    kinds[related] = kind
+                    queue.append(related)
+                elif kinds[related] != kind:
+                    self.problems.append(f"{related} is used as both a value and a continuation")
+
+        for name in sorted((self.same.keys() | self.opposite.keys()) - kinds.keys()):
+            self.problems.append(f"cannot tell whether {name} is a continuation")
+        return kinds
+
+
+@dataclass(frozen=True)
+class Analysis:
+    continuations: frozenset[L1.Identifier]
+    # Continuations whose only use is as the continuation of one call; their body follows the call inline.
+    inlined: frozenset[L1.Identifier]
+    # Every function (and the program body) mapped to the reason it needs CPS, or None.
+    functions: Mapping[str, str | None]
+
+    @property
+    def direct(self) -> bool:
+        return all(reason is None for reason in self.functions.values())
+
+
+def _check(
+    statement: L1.Statement,
+    owner: str,
+    visible: frozenset[L1.Identifier],
+    continuations: frozenset[L1.Identifier],
+    functions: dict[str, str | None],
+) -> None:
+    def fail(reason: str) -> None:
+        if functions[owner] is None:
+            functions[owner] = reason
+
+    match statement:
+        case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
+            if destination in continuations:
+                visible = visible | {destination}
+                _check(body, owner, visible, continuations, functions)
+            else:
+                functions[destination] = None
+                _check(body, destination, frozenset(parameters[-1:]), continuations, functions)
+            _check(then, owner, visible, continuations, functions)
+
+        case L1.Apply(target=target, arguments=arguments):
+            for name in [target, *arguments]:
+                if name in continuations and name not in visible:
+                    fail(f"captures continuation {name}")
+
+        case L1.Copy(source=source, then=then):
+            if source in continuations:
+                fail(f"copies continuation {source}")
+            _check(then, owner, visible, continuations, functions)
+
+        case L1.Branch(then=then, otherwise=otherwise):
+            _check(then, owner, visible, continuations, functions)
+            _check(otherwise, owner, visible, continuations, functions)
+
+        case L1.Halt():
+            if owner != PROGRAM:
+                fail("halts the program")
+
+        case _:
+            _check(statement.then, owner, visible, continuations, functions)
+
+
+def analyze_program(program: L1.Program) -> Analysis:
+    match program:
+        case L1.Program(parameters=parameters, body=body):  # pragma: no branch
+            constraints = _Constraints()
+            constraints.fix("value", *parameters)
+            constraints.collect(body)
+            kinds = constraints.solve()
+            continuations = frozenset(name for name, kind in kinds.items() if kind == "continuation")
+
+            functions: dict[str, str | None] = {PROGRAM: None}
+            _check(body, PROGRAM, frozenset(), continuations, functions)
+            if constraints.problems:
+                functions[PROGRAM] = constraints.problems[0]
+
+            uses = Counter[L1.Identifier]()
+            calls = Counter[L1.Identifier]()
+            count_uses(statement=body, uses=uses, calls=calls)
+
+            return Analysis(
+                continuations=continuations,
+                inlined=frozenset(name for name in continuations if uses[name] == 1 and calls[name] == 0),
+                functions=functions,
+            )
+
+
+def report(analysis: Analysis) -> str:
+    lines = [
+        f"{name:<20} {'direct' if reason is None else 'cps':<7} {reason or ''}".rstrip()
+        for name, reason in analysis.functions.items()
+    ]
+    if analysis.direct:
+        lines.append("emitted in direct style")
+    else:
+        # Calls through closures do not know their target, so one calling convention is used for the whole program.
+        lines.append("emitted in CPS: every function shares one calling convention")
+    return "\n".join(lines)
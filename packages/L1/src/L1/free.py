@@ -0,0 +1,74 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+from L1 import syntax as L1
+
+
+@dataclass
+class _Free:
+    # The walk behind annotate_free. `acc` collects the free variables of the function body being walked, in order of
+    # first use; `bound` counts the binders in scope within that body, so a shadowing binder unwinds correctly.
+    free: dict[int, dict[L1.Identifier, None]]
+    lifted: Mapping[L1.Identifier, int]
+    acc: dict[L1.Identifier, None] = field(default_factory=dict[L1.Identifier, None])
+    bound: dict[L1.Identifier, int] = field(default_factory=dict[L1.Identifier, int])
+
+    def use(self, *names: L1.Identifier) -> None:
+        for name in names:
+            if not self.bound.get(name):
+                self.acc.setdefault(name)
+
+    def bind(self, destination: L1.Identifier, then: L1.Statement) -> None:
+        self.bound[destination] = self.bound.get(destination, 0) + 1
+        self.walk(then)
+        self.bound[destination] -= 1
+
+    def walk(self, statement: L1.Statement) -> None:
+        match statement:
+            case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
+                inner = _Free(self.free, self.lifted, bound=dict.fromkeys([destination, *parameters], 1))
+                inner.walk(body)
+                self.free[id(statement)] = inner.acc
+                self.use(*inner.acc)
+                self.bind(destination, then)
+            case L1.Apply(target=target, arguments=arguments) if target in self.lifted:
+                # Only a closed function calls itself, before its own entry is recorded.
+                self.use(*arguments, *self.free.get(self.lifted[target], {}))
+            case L1.Apply(target=target, arguments=arguments):
+                self.use(*arguments, target)
+            case L1.Copy(destination=destination, source=source, then=then):
+                self.use(source)
+                self.bind(destination, then)
+            case L1.Immediate(destination=destination, then=then) | L1.Allocate(destination=destination, then=then):
+                self.bind(destination, then)
+            case L1.Primitive(destination=destination, left=left, right=right, then=then):
+                self.use(left, right)
+                self.bind(destination, then)
+            case L1.Branch(left=left, right=right, then=then, otherwise=otherwise):
+                self.use(left, right)
+                self.walk(then)
+                self.walk(otherwise)
+            case L1.Load(destination=destination, base=base, then=then):
+                self.use(base)
+                self.bind(destination, then)
+            case L1.Store(base=base, value=value, then=then):
+                self.use(base, value)
+                self.walk(then)
+            case L1.Halt(value=value):
+                self.use(value)
+            case _:  # pragma: no cover
+                return
+
+
+def annotate_free(
+    statement: L1.Statement,
+    free: dict[int, dict[L1.Identifier, None]],
+    lifted: Mapping[L1.Identifier, int] | None = None,
+) -> dict[L1.Identifier, None]:
+    # One walk, linear in the size of the statement and of the results: returns the free variables of `statement` in
+    # order of first use, and records those of every Abstract's body (less its parameters and destination) in `free`,
+    # keyed by identity. A call of a `lifted` function (name to Abstract identity) uses the variables the function
+    # captures instead of its name.
+    walker = _Free(free, lifted or {})
+    walker.walk(statement)
+    return walker.acc
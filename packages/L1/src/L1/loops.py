@@ -0,0 +1,236 @@
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import dataclass, field
+
+from L1 import syntax as L1
+
+from .free import annotate_free
+
+# Self tail calls. eliminate_letrec turns a recursive function into a one-slot box that is stored once, in the same
+# activation that allocates it, so a call through a load of that box is a call of the function itself. When such a
+# call passes the function's own continuation and sits in the function's own Python frame, the backends rebind the
+# parameters and jump back to the top of a `while True:` loop instead.
+#
+# Iterations share one frame, so every binder in it is reassigned on the next iteration. A closure created in the
+# frame that could outlive its iteration would observe that, so any nested function capturing a binder of the
+# frame disqualifies the loop. Continuations are exempt: they are only ever invoked by a call that ends the frame.
+
+
+@dataclass
+class _Boxes:
+    groups: dict[L1.Identifier, L1.Identifier] = field(default_factory=dict[L1.Identifier, L1.Identifier])
+    # How many functions enclose each allocation; a store from a more deeply nested function may run repeatedly.
+    depths: dict[L1.Identifier, int] = field(default_factory=dict[L1.Identifier, int])
+    stores: dict[L1.Identifier, list[L1.Identifier]] = field(default_factory=dict[L1.Identifier, list[L1.Identifier]])
+    loads: list[tuple[L1.Identifier, L1.Identifier]] = field(default_factory=list[tuple[L1.Identifier, L1.Identifier]])
+    escaped: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+    functions: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+
+    def escape(self, *names: L1.Identifier) -> None:
+        self.escaped.update(self.groups[name] for name in names if name in self.groups)
+
+    def collect(self, statement: L1.Statement, continuations: Collection[L1.Identifier], depth: int) -> None:
+        match statement:
+            # A filled cell holds a value before any store, so only an unfilled one can be a box.
+            case L1.Allocate(destination=destination, count=1, fill=None, then=then):
+                self.groups[destination] = destination
+                self.depths[destination] = depth
+                self.stores[destination] = []
+                self.collect(then, continuations, depth)
+
+            case L1.Copy(destination=destination, source=source, then=then):
+                if source in self.groups:
+                    self.groups[destination] = self.groups[source]
+                self.collect(then, continuations, depth)
+
+            case L1.Store(base=base, index=index, value=value, then=then):
+                if base in self.groups and index == 0 and self.depths[self.groups[base]] == depth:
+                    self.stores[self.groups[base]].append(value)
+                else:
+                    self.escape(base)
+                self.escape(value)
+                self.collect(then, continuations, depth)
+
+            case L1.Load(destination=destination, base=base, index=index, then=then):
+                if base in self.groups and index == 0:
+                    self.loads.append((destination, self.groups[base]))
+                else:
+                    self.escape(base)
+                self.collect(then, continuations, depth)
+
+            case L1.Abstract(destination=destination, body=body, then=then) if destination in continuations:
+                self.collect(body, continuations, depth)
+                self.collect(then, continuations, depth)
+
+            case L1.Abstract(destination=destination, body=body, then=then):
+                self.functions.add(destination)
+                self.collect(body, continuations, depth + 1)
+                self.collect(then, continuations, depth)
+
+            case L1.Apply(target=target, arguments=arguments):
+                self.escape(target, *arguments)
+
+            case L1.Primitive(left=left, right=right, then=then):
+                self.escape(left, right)
+                self.collect(then, continuations, depth)
+
+            case L1.Branch(left=left, right=right, then=then, otherwise=otherwise):
+                self.escape(left, right)
+                self.collect(then, continuations, depth)
+                self.collect(otherwise, continuations, depth)
+
+            case L1.Halt(value=value):
+                self.escape(value)
+
+            case L1.Immediate(then=then) | L1.Allocate(then=then):  # pragma: no branch
+                self.collect(then, continuations, depth)
+
+    def targets(self) -> dict[L1.Identifier, L1.Identifier]:
+        targets = {function: function for function in self.functions}
+        for destination, group in self.loads:
+            stored = self.stores[group]
+            if group not in self.escaped and len(stored) == 1 and stored[0] in self.functions:
+                targets[destination] = stored[0]
+        return targets
+
+
+@dataclass
+class _Frame:
+    binders: set[L1.Identifier] = field(default_factory=set[L1.Identifier])
+    closures: list[L1.Abstract] = field(default_factory=list[L1.Abstract])
+    calls: list[L1.Apply] = field(default_factory=list[L1.Apply])
+
+    def collect(
+        self,
+        statement: L1.Statement,
+        continuations: Collection[L1.Identifier],
+        inlined: Collection[L1.Identifier],
+    ) -> None:
+        match statement:
+            case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
+                self.binders.add(destination)
+                if destination in inlined:
+                    self.binders.update(parameters)
+                    self.collect(body, continuations, inlined)
+                elif destination not in continuations:
+                    self.closures.append(statement)
+                self.collect(then, continuations, inlined)
+
+            case L1.Apply():
+                self.calls.append(statement)
+
+            case L1.Branch(then=then, otherwise=otherwise):
+                self.collect(then, continuations, inlined)
+                self.collect(otherwise, continuations, inlined)
+
+            case L1.Halt():
+                pass
+
+            case L1.Store(then=then):
+                self.collect(then, continuations, inlined)
+
+            case (  # pragma: no branch
+                L1.Copy(destination=destination, then=then)
+                | L1.Immediate(destination=destination, then=then)
+                | L1.Primitive(destination=destination, then=then)
+                | L1.Allocate(destination=destination, then=then)
+                | L1.Load(destination=destination, then=then)
+            ):
+                self.binders.add(destination)
+                self.collect(then, continuations, inlined)
+
+
+@dataclass(frozen=True)
+class Loops:
+    # Functions whose body becomes a `while True:` loop.
+    functions: frozenset[L1.Identifier]
+    # Names known to denote a function: the function itself and every load of its letrec box.
+    targets: Mapping[L1.Identifier, L1.Identifier]
+
+    def is_self_call(self, function: L1.Abstract, target: L1.Identifier, arguments: Sequence[L1.Identifier]) -> bool:
+        return _is_self_call(function, self.targets, target, arguments)
+
+
+def _is_self_call(
+    function: L1.Abstract,
+    targets: Mapping[L1.Identifier, L1.Identifier],
+    target: L1.Identifier,
+    arguments: Sequence[L1.Identifier],
+) -> bool:
+    return (
+        targets.get(target) == function.destination
+        and len(arguments) == len(function.parameters)
+        and arguments[-1] == function.parameters[-1]
+    )
+
+
+def _is_loop(
+    function: L1.Abstract,
+    targets: Mapping[L1.Identifier, L1.Identifier],
+    continuations: Collection[L1.Identifier],
+    inlined: Collection[L1.Identifier],
+    free: Mapping[int, Collection[L1.Identifier]],
+) -> bool:
+    frame = _Frame(binders=set(function.parameters))
+    frame.collect(function.body, continuations, inlined)
+
+    if not any(_is_self_call(function, targets, call.target, call.arguments) for call in frame.calls):
+        return False
+
+    return all(frame.binders.isdisjoint(free[id(closure)]) for closure in frame.closures)
+
+
+def _abstracts(statement: L1.Statement, abstracts: list[L1.Abstract]) -> None:
+    match statement:
+        case L1.Abstract(body=body, then=then):
+            abstracts.append(statement)
+            _abstracts(body, abstracts)
+            _abstracts(then, abstracts)
+
+        case L1.Apply() | L1.Halt():
+            pass
+
+        case L1.Branch(then=then, otherwise=otherwise):
+            _abstracts(then, abstracts)
+            _abstracts(otherwise, abstracts)
+
+        case _:
+            _abstracts(statement.then, abstracts)
+
+
+def function_targets(statement: L1.Statement) -> Mapping[L1.Identifier, L1.Identifier]:
+    """Map every name known to denote a function, itself or a load of its letrec box, to the function's name."""
+    boxes = _Boxes()
+    boxes.collect(statement, (), 0)
+    return boxes.targets()
+
+
+def find_loops(
+    program: L1.Program,
+    continuations: Collection[L1.Identifier] = (),
+    inlined: Collection[L1.Identifier] = (),
+) -> Loops:
+    """Find self-tail-recursive functions.
+
+    `continuations` exempts continuation closures from the capture check; leaving it empty is always safe.
+    `inlined` names continuations whose body the backend emits inside the frame of the call that receives them.
+    """
+    match program:
+        case L1.Program(body=body):  # pragma: no branch
+            boxes = _Boxes()
+            boxes.collect(body, continuations, 0)
+            targets = boxes.targets()
+
+            abstracts: list[L1.Abstract] = []
+            _abstracts(body, abstracts)
+            free: dict[int, dict[L1.Identifier, None]] = {}
+            annotate_free(body, free)
+
+            return Loops(
+                functions=frozenset(
+                    abstract.destination
+                    for abstract in abstracts
+                    if abstract.destination in boxes.functions
+                    and _is_loop(abstract, targets, continuations, inlined, free)
+                ),
+                targets=targets,
+            )
@@ -0,0 +1,186 @@
+from collections import Counter
+from dataclasses import dataclass, field
+
+from L1 import syntax as L1
+
+# Shrinking reductions for CPS output. Every rewrite removes a binding, so repeating rounds until nothing changes
+# terminates. The rewrites substitute names globally and move bodies across scopes, which is only sound because
+# binders are unique (uniqify runs before CPS conversion and CPS conversion only introduces fresh names).
+
+
+def count_uses(statement: L1.Statement, uses: Counter[L1.Identifier], calls: Counter[L1.Identifier]) -> None:
+    match statement:
+        case L1.Copy(source=source, then=then):
+            uses[source] += 1
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Abstract(body=body, then=then):
+            count_uses(statement=body, uses=uses, calls=calls)
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Apply(target=target, arguments=arguments):
+            uses[target] += 1
+            calls[target] += 1
+            for argument in arguments:
+                uses[argument] += 1
+
+        case L1.Immediate(then=then) | L1.Allocate(then=then):
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Primitive(left=left, right=right, then=then):
+            uses[left] += 1
+            uses[right] += 1
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Branch(left=left, right=right, then=then, otherwise=otherwise):
+            uses[left] += 1
+            uses[right] += 1
+            count_uses(statement=then, uses=uses, calls=calls)
+            count_uses(statement=otherwise, uses=uses, calls=calls)
+
+        case L1.Load(base=base, then=then):
+            uses[base] += 1
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Store(base=base, value=value, then=then):
+            uses[base] += 1
+            uses[value] += 1
+            count_uses(statement=then, uses=uses, calls=calls)
+
+        case L1.Halt(value=value):  # pragma: no branch
+            uses[value] += 1
+
+
+@dataclass
+class Contraction:
+    uses: Counter[L1.Identifier]
+    calls: Counter[L1.Identifier]
+    # Names replaced by other names: copies, eta-reduced abstracts and the parameters of inlined abstracts.
+    renames: dict[L1.Identifier, L1.Identifier] = field(default_factory=dict[L1.Identifier, L1.Identifier])
+    # Abstracts whose only use is the call that is going to receive their body.
+    inlines: dict[L1.Identifier, L1.Abstract] = field(default_factory=dict[L1.Identifier, L1.Abstract])
+
+    def resolve(self, name: L1.Identifier) -> L1.Identifier:
+        while name in self.renames:
+            name = self.renames[name]
+        return name
+
+    def contract(self, statement: L1.Statement) -> L1.Statement:
+        resolve = self.resolve
+
+        match statement:
+            case L1.Copy(destination=destination, source=source, then=then):
+                self.renames[destination] = resolve(source)
+                return self.contract(then)
+
+            case L1.Abstract(destination=destination, parameters=parameters, body=body, then=then):
+                if self.uses[destination] == 0:
+                    return self.contract(then)
+
+                match body:
+                    case L1.Apply(target=target, arguments=arguments) if (
+                        [resolve(argument) for argument in arguments] == list(parameters)
+                        and resolve(target) not in (destination, *parameters)
+                        and resolve(target) not in self.inlines
+                    ):
+                        self.renames[destination] = resolve(target)
+                        return self.contract(then)
+
+                    case _:
+                        pass
+
+                if self.uses[destination] == 1 and self.calls[destination] == 1:
+                    self.inlines[destination] = statement
+                    return self.contract(then)
+
+                return L1.Abstract(
+                    destination=destination,
+                    parameters=parameters,
+                    body=self.contract(body),
+                    then=self.contract(then),
+                    span=statement.span,
+                )
+
+            case L1.Apply(target=target, arguments=arguments):
+                target = resolve(target)
+                if target in self.inlines:
+                    inlined = self.inlines.pop(target)
+                    for parameter, argument in zip(inlined.parameters, arguments, strict=True):
+                        self.renames[parameter] = resolve(argument)
+                    return self.contract(inlined.body)
+
+                return L1.Apply(
+                    target=target, arguments=[resolve(argument) for argument in arguments], span=statement.span
+                )
+
+            case L1.Immediate(destination=destination, value=value, then=then):
+                if self.uses[destination] == 0:
+                    return self.contract(then)
+                return L1.Immediate(destination=destination, value=value, then=self.contract(then), span=statement.span)
+
+            case L1.Primitive(destination=destination, operator=operator, left=left, right=right, then=then):
+                if self.uses[destination] == 0:
+                    return self.contract(then)
+                return L1.Primitive(
+                    destination=destination,
+                    operator=operator,
+                    left=resolve(left),
+                    right=resolve(right),
+                    then=self.contract(then),
+                    span=statement.span,
+                )
+
+            case L1.Branch(operator=operator, left=left, right=right, then=then, otherwise=otherwise):
+                return L1.Branch(
+                    operator=operator,
+                    left=resolve(left),
+                    right=resolve(right),
+                    then=self.contract(then),
+                    otherwise=self.contract(otherwise),
+                    span=statement.span,
+                )
+
+            case L1.Allocate(destination=destination, count=count, fill=fill, then=then):
+                return L1.Allocate(
+                    destination=destination, count=count, fill=fill, then=self.contract(then), span=statement.span
+                )
+
+            case L1.Load(destination=destination, base=base, index=index, then=then):
+                return L1.Load(
+                    destination=destination,
+                    base=resolve(base),
+                    index=index,
+                    then=self.contract(then),
+                    span=statement.span,
+                )
+
+            case L1.Store(base=base, index=index, value=value, then=then):
+                return L1.Store(
+                    base=resolve(base),
+                    index=index,
+                    value=resolve(value),
+                    then=self.contract(then),
+                    span=statement.span,
+                )
+
+            case L1.Halt(value=value):  # pragma: no branch
+                return L1.Halt(value=resolve(value), span=statement.span)
+
+
+def contract_statement(statement: L1.Statement) -> L1.Statement:
+    uses = Counter[L1.Identifier]()
+    calls = Counter[L1.Identifier]()
+    count_uses(statement=statement, uses=uses, calls=calls)
+    return Contraction(uses=uses, calls=calls).contract(statement)
+
+
+def optimize_program(
+    program: L1.Program,
+) -> L1.Program:
+    match program:
+        case L1.Program(parameters=parameters, body=body):  # pragma: no branch
+            while True:
+                contracted = contract_statement(body)
+                if contracted == body:
+                    return L1.Program(parameters=parameters, body=body)
+                body = contracted
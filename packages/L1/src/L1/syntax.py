@@ -2,10 +2,14 @@ from collections.abc import Sequence
 from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
+from util.source_map import Span
 
 type Identifier = Annotated[str, Field(min_length=1)]
 type Nat = Annotated[int, Field(ge=0)]
 
+# Where a node came from in the L3 source, when it was parsed with positions; not serialized or shown.
+Location = Annotated[Span | None, Field(exclude=True, repr=False)]
+
 
 class Program(BaseModel, frozen=True):
     tag: Literal["l1"] = "l1"
@@ -24,6 +28,7 @@ class Copy(BaseModel, frozen=True):
     destination: Identifier
     source: Identifier
     then: Statement
+    span: Location = None
 
 
 class Abstract(BaseModel, frozen=True):
@@ -32,12 +37,14 @@ class Abstract(BaseModel, frozen=True):
     parameters: Sequence[Identifier]
     body: Statement
     then: Statement
+    span: Location = None
 
 
 class Apply(BaseModel, frozen=True):
     tag: Literal["apply"] = "apply"
     target: Identifier
     arguments: Sequence[Identifier]
+    span: Location = None
 
 
 class Immediate(BaseModel, frozen=True):
@@ -45,6 +52,7 @@ class Immediate(BaseModel, frozen=True):
     destination: Identifier
     value: int
     then: Statement
+    span: Location = None
 
 
 class Primitive(BaseModel, frozen=True):
@@ -54,6 +62,7 @@ class Primitive(BaseModel, frozen=True):
     left: Identifier
     right: Identifier
     then: Statement
+    span: Location = None
 
 
 class Branch(BaseModel, frozen=True):
@@ -63,13 +72,16 @@ class Branch(BaseModel, frozen=True):
     right: Identifier
     then: Statement
     otherwise: Statement
+    span: Location = None
 
 
 class Allocate(BaseModel, frozen=True):
     tag: Literal["allocate"] = "allocate"
     destination: Identifier
     count: Nat
+    fill: int | None = None
     then: Statement
+    span: Location = None
 
 
 class Load(BaseModel, frozen=True):
@@ -78,6 +90,7 @@ class Load(BaseModel, frozen=True):
     base: Identifier
     index: Nat
     then: Statement
+    span: Location = None
 
 
 class Store(BaseModel, frozen=True):
@@ -86,8 +99,10 @@ class Store(BaseModel, frozen=True):
     index: Nat
     value: Identifier
     then: Statement
+    span: Location = None
 
 
 class Halt(BaseModel, frozen=True):
     tag: Literal["halt"] = "halt"
     value: Identifier
+    span: Location = None
@@ -1,8 +1,16 @@
 import ast
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
 from functools import partial
 
 from util.encode import encode
+from util.instrument import Sites, counted, instrumentation
+from util.runtime import allocation, record_classes, slot_load, slot_store
+from util.source_map import locate
+from util.trampoline import drive, frame_allocation, frame_call, frame_function, frame_size
 
+from .direct import Analysis, analyze_program
+from .loops import Loops, find_loops
 from .syntax import (
     Abstract,
     Allocate,
@@ -27,24 +35,153 @@ def store(name: str) -> ast.Name:
     return ast.Name(id=encode(name), ctx=ast.Store())
 
 
+@dataclass(frozen=True)
+class Direct:
+    analysis: Analysis
+    # The continuation that means "return from the Python function being generated"; None at the top level.
+    returns: str | None = None
+    # Inlined continuations waiting for the call whose result they receive.
+    pending: dict[str, Abstract] = field(default_factory=dict[str, Abstract])
+
+
+@dataclass(frozen=True)
+class Loop:
+    loops: Loops
+    # The function whose Python frame is being generated, if its body is a loop; None elsewhere.
+    function: Abstract | None = None
+
+    def enter(self, abstract: Abstract) -> Loop:
+        return replace(self, function=abstract if abstract.destination in self.loops.functions else None)
+
+
+def loop_body(loop: Loop | None, body: list[ast.stmt]) -> list[ast.stmt]:
+    if loop is None or loop.function is None:
+        return body
+    return [ast.While(test=ast.Constant(True), body=body)]
+
+
+def rebind(parameters: list[str], arguments: list[str]) -> list[ast.stmt]:
+    changed = [(parameter, argument) for parameter, argument in zip(parameters, arguments) if parameter != argument]
+    match changed:
+        case []:
+            return []
+
+        case [(parameter, argument)]:
+            return [ast.Assign(targets=[store(parameter)], value=load(argument))]
+
+        case _:
+            return [
+                ast.Assign(
+                    targets=[ast.Tuple(elts=[store(parameter) for parameter, _ in changed], ctx=ast.Store())],
+                    value=ast.Tuple(elts=[load(argument) for _, argument in changed], ctx=ast.Load()),
+                )
+            ]
+
+
+def function(name: str, parameters: list[str], body: list[ast.stmt]) -> ast.FunctionDef:
+    return ast.FunctionDef(
+        name=encode(name),
+        args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
+        body=body,
+    )
+
+
+def to_direct_apply(
+    target: str, arguments: list[str], direct: Direct, loop: Loop | None = None, sites: Sites | None = None
+) -> list[ast.stmt]:
+    if target in direct.analysis.continuations:
+        [value] = arguments
+        if target == direct.returns:
+            return [ast.Return(load(value))]
+        return [ast.Return(ast.Call(func=load(target), args=[load(value)]))]
+
+    *values, continuation = arguments
+    call = ast.Call(func=load(target), args=[load(value) for value in values])
+
+    if continuation == direct.returns:
+        return [ast.Return(call)]
+
+    if continuation in direct.pending:
+        inlined = direct.pending.pop(continuation)
+        [parameter] = inlined.parameters
+        return [
+            ast.Assign(targets=[store(parameter)], value=call),
+            *to_ast_statement(inlined.body, direct, loop=loop, sites=sites),
+        ]
+
+    return [ast.Return(ast.Call(func=load(continuation), args=[call]))]
+
+
 def to_ast_statement(
     statement: Statement,
+    direct: Direct | None = None,
+    trampoline: bool = False,
+    loop: Loop | None = None,
+    sites: Sites | None = None,
 ) -> list[ast.stmt]:
-    _statement = partial(to_ast_statement)
+    # The statements generated for a statement carry its L3 position, when it has one.
+    return locate(_to_ast_statement(statement, direct, trampoline, loop, sites), statement.span)
+
+
+def _to_ast_statement(
+    statement: Statement,
+    direct: Direct | None,
+    trampoline: bool,
+    loop: Loop | None,
+    sites: Sites | None,
+) -> list[ast.stmt]:
+    _statement = partial(to_ast_statement, direct=direct, trampoline=trampoline, loop=loop, sites=sites)
+
+    def _body(abstract: Abstract, direct: Direct | None = direct) -> list[ast.stmt]:
+        # The call counter goes inside the loop, so a function compiled to a loop counts every iteration.
+        inner = loop.enter(abstract) if loop is not None else None
+        body = to_ast_statement(abstract.body, direct, trampoline, inner, sites)
+        return loop_body(inner, [*counted(sites, "calls", abstract.destination), *body])
 
     match statement:
+        case Apply(target=target, arguments=arguments) if (
+            loop is not None and loop.function is not None and loop.loops.is_self_call(loop.function, target, arguments)
+        ):
+            return [*rebind([*loop.function.parameters[:-1]], [*arguments[:-1]]), ast.Continue()]
+
+        case Abstract(destination=destination, parameters=parameters, then=then) if direct is not None:
+            if destination in direct.analysis.inlined:
+                direct.pending[destination] = statement
+                return _statement(then)
+
+            if destination in direct.analysis.continuations:
+                return [function(destination, [*parameters], _body(statement)), *_statement(then)]
+
+            *values, continuation = parameters
+            return [
+                function(destination, values, _body(statement, replace(direct, returns=continuation))),
+                *_statement(then),
+            ]
+
+        case Apply(target=target, arguments=arguments) if direct is not None:
+            return to_direct_apply(target, [*arguments], direct, loop, sites)
+
+        case Abstract(destination=destination, parameters=parameters, then=then) if trampoline:
+            return [
+                frame_function(encode(destination), [store(parameter) for parameter in parameters], _body(statement)),
+                *_statement(then),
+            ]
+
+        case Apply(target=target, arguments=arguments) if trampoline:
+            return frame_call(load(target), [load(argument) for argument in arguments])
+
         case Copy(destination=destination, source=source, then=then):
             return [
                 ast.Assign(targets=[store(destination)], value=load(source)),
                 *_statement(then),
             ]
 
-        case Abstract(destination=destination, parameters=parameters, body=body, then=then):
+        case Abstract(destination=destination, parameters=parameters, then=then):
             return [
                 ast.FunctionDef(
                     name=encode(destination),
-                    args=ast.arguments(args=[ast.arg(arg=parameter) for parameter in parameters]),
-                    body=_statement(body),
+                    args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
+                    body=_body(statement),
                 ),
                 *_statement(then),
             ]
@@ -100,43 +237,24 @@ def to_ast_statement(
                 ),
             ]
 
-        case Allocate(destination=destination, count=count, then=then):
+        case Allocate(destination=destination, count=count, fill=fill, then=then):
             return [
-                ast.Assign(
-                    targets=[store(destination)],
-                    value=ast.List(
-                        elts=[ast.Constant(None) for _ in range(count)],
-                        ctx=ast.Load(),
-                    ),
-                ),
+                *counted(sites, "allocations", destination),
+                ast.Assign(targets=[store(destination)], value=allocation(count, fill)),
                 *_statement(then),
             ]
 
         case Load(destination=destination, base=base, index=index, then=then):
             return [
-                ast.Assign(
-                    targets=[store(destination)],
-                    value=ast.Subscript(
-                        value=load(base),
-                        slice=ast.Constant(index),
-                        ctx=ast.Load(),
-                    ),
-                ),
+                *counted(sites, "loads", f"{base}[{index}]"),
+                ast.Assign(targets=[store(destination)], value=slot_load(load(base), index)),
                 *_statement(then),
             ]
 
         case Store(base=base, index=index, value=value, then=then):
             return [
-                ast.Assign(
-                    targets=[
-                        ast.Subscript(
-                            value=load(base),
-                            slice=ast.Constant(index),
-                            ctx=ast.Store(),
-                        )
-                    ],
-                    value=load(value),
-                ),
+                *counted(sites, "stores", f"{base}[{index}]"),
+                ast.Assign(targets=[slot_store(load(base), index)], value=load(value)),
                 *_statement(then),
             ]
 
@@ -146,17 +264,42 @@ def to_ast_statement(
             ]
 
 
-def to_ast_program(
+def to_ast_module(
     program: Program,
-) -> str:
+    direct: Analysis | None = None,
+    trampoline: bool = False,
+    instrument: bool = False,
+    at_exit: bool = True,
+) -> ast.Module:
     match program:
         case Program(parameters=parameters, body=body):  # pragma: no branch
+            # Continuations are only known to be second-class when the selective CPS analysis accepts the program.
+            kinds = direct if direct is not None else analyze_program(program)
+            emit_direct = not trampoline and direct is not None and direct.direct
+            loop = Loop(
+                loops=find_loops(
+                    program,
+                    continuations=kinds.continuations if kinds.direct else (),
+                    inlined=kinds.inlined if emit_direct else (),
+                )
+            )
+
+            sites = Sites() if instrument else None
+            entry = counted(sites, "calls", "l1")
+            if trampoline:
+                statements = [*entry, *drive(to_ast_statement(body, trampoline=True, loop=loop, sites=sites))]
+            else:
+                statements = [
+                    *entry,
+                    *to_ast_statement(body, Direct(analysis=kinds) if emit_direct else None, loop=loop, sites=sites),
+                ]
+
             module = ast.Module(
                 body=[
                     ast.FunctionDef(
                         name="l1",
-                        args=ast.arguments(args=[ast.arg(arg=parameter) for parameter in parameters]),
-                        body=to_ast_statement(body),
+                        args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
+                        body=statements,
                     ),
                     ast.If(
                         test=ast.Compare(
@@ -197,6 +340,35 @@ def to_ast_program(
                 ]
             )
 
-            ast.fix_missing_locations(module)
+            module.body[0:0] = record_classes(module)
+            if sites is not None:
+                module.body[0:0] = instrumentation(sites, at_exit)
+            if trampoline:
+                module.body.insert(0, frame_allocation(frame_size(module)))
 
-            return ast.unparse(module)
+            return ast.fix_missing_locations(module)
+
+
+def to_ast_program(
+    program: Program,
+    direct: Analysis | None = None,
+    trampoline: bool = False,
+    instrument: bool = False,
+) -> str:
+    return ast.unparse(to_ast_module(program, direct, trampoline, instrument))
+
+
+def compile_to_callable(
+    program: Program,
+    direct: Analysis | None = None,
+    trampoline: bool = False,
+    instrument: bool = False,
+    filename: str | None = None,
+) -> Callable[..., int]:
+    # Compile the module in memory and hand back its entry point; `__name__` keeps the command-line stub inert.
+    # Naming the L3 source file lets tracebacks and profilers show the lines the code was generated from. The
+    # counters of an instrumented entry point are printed with `util.instrument.report`, not at exit.
+    namespace: dict[str, object] = {"__name__": "l1"}
+    module = to_ast_module(program, direct, trampoline, instrument, at_exit=False)
+    exec(compile(module, filename or "<l1>", "exec"), namespace)
+    return namespace["l1"]  # type: ignore[return-value]
@@ -1,5 +1,5 @@
 from L0 import syntax as L0
-from L1.close import SequentialNameGenerator, close_program, close_statement
+from L1.close import SequentialNameGenerator, annotate_free, close_program, close_statement
 from L1.syntax import Abstract, Allocate, Apply, Branch, Copy, Halt, Immediate, Load, Primitive, Program, Store
 
 
@@ -17,7 +17,7 @@ def test_close_program():
         body=Halt(value="h"),
     )
     l0_actual = close_program(program=program)
-    l0_expected = L0.Program(procedures=[proc("main", ["par1", "par2"], h("h"))])
+    l0_expected = L0.Program(procedures=[proc("l0", ["par1", "par2"], h("h"))])
     assert l0_actual == l0_expected
 
     program = Program(
@@ -29,33 +29,18 @@ def test_close_program():
             then=Apply(target="d", arguments=["x"]),
         ),
     )
+    # d is closed and only ever called, so it is lifted and called directly.
     l0_actual = close_program(program=program)
     l0_expected = L0.Program(
         procedures=[
+            proc("lifted_code0", ["y"], h("y")),
             proc(
-                "abstract_code0", ["abstract_env0", "y"], L0.Copy(destination="d", source="abstract_env0", then=h("y"))
-            ),
-            proc(
-                "main",
+                "l0",
                 ["x"],
-                L0.Allocate(
-                    destination="d",
-                    count=1,
-                    then=L0.Address(
-                        destination="abstract_heap0",
-                        name="abstract_code0",
-                        then=L0.Store(
-                            base="d",
-                            index=0,
-                            value="abstract_heap0",
-                            then=L0.Load(
-                                destination="apply_code0",
-                                base="d",
-                                index=0,
-                                then=L0.Call(target="apply_code0", arguments=["d", "x"]),
-                            ),
-                        ),
-                    ),
+                L0.Address(
+                    destination="apply_code0",
+                    name="lifted_code0",
+                    then=L0.Call(target="apply_code0", arguments=["x"]),
                 ),
             ),
         ]
@@ -76,52 +61,26 @@ def test_close_program():
             then=Halt(value="d1"),
         ),
     )
+    # d1 escapes and keeps its closure; d2 is only called by d1, which passes it x1.
     l0_actual = close_program(program=program)
     l0_expected = L0.Program(
         procedures=[
-            proc(
-                "abstract_code1",
-                ["abstract_env1", "x2"],
-                L0.Copy(
-                    destination="d2",
-                    source="abstract_env1",
-                    then=L0.Load(destination="x1", base="abstract_env1", index=1, then=h("x1")),
-                ),
-            ),
+            proc("lifted_code0", ["x1", "x2"], h("x1")),
             proc(
                 "abstract_code0",
                 ["abstract_env0", "x1"],
                 L0.Copy(
                     destination="d1",
                     source="abstract_env0",
-                    then=L0.Allocate(
-                        destination="d2",
-                        count=2,
-                        then=L0.Address(
-                            destination="abstract_heap1",
-                            name="abstract_code1",
-                            then=L0.Store(
-                                base="d2",
-                                index=0,
-                                value="abstract_heap1",
-                                then=L0.Store(
-                                    base="d2",
-                                    index=1,
-                                    value="x1",
-                                    then=L0.Load(
-                                        destination="apply_code0",
-                                        base="d2",
-                                        index=0,
-                                        then=L0.Call(target="apply_code0", arguments=["d2", "x1"]),
-                                    ),
-                                ),
-                            ),
-                        ),
+                    then=L0.Address(
+                        destination="apply_code0",
+                        name="lifted_code0",
+                        then=L0.Call(target="apply_code0", arguments=["x1", "x1"]),
                     ),
                 ),
             ),
             proc(
-                "main",
+                "l0",
                 ["par1", "par2"],
                 L0.Allocate(
                     destination="d1",
@@ -215,7 +174,7 @@ def test_close_program():
                 ),
             ),
             proc(
-                "main",
+                "l0",
                 [],
                 L0.Allocate(
                     destination="d",
@@ -279,41 +238,12 @@ def test_close_statement():
     )
     actual_procedures: list[L0.Procedure] = []
     l0_actual = close_statement(statement=statement, procedures=actual_procedures, fresh=SequentialNameGenerator())
-    l0_expected = L0.Allocate(
-        destination="d",
-        count=2,
-        then=L0.Address(
-            destination="abstract_heap0",
-            name="abstract_code0",
-            then=L0.Store(
-                base="d",
-                index=0,
-                value="abstract_heap0",
-                then=L0.Store(
-                    base="d",
-                    index=1,
-                    value="y",
-                    then=L0.Load(
-                        destination="apply_code0",
-                        base="d",
-                        index=0,
-                        then=L0.Call(target="apply_code0", arguments=["d", "x"]),
-                    ),
-                ),
-            ),
-        ),
+    l0_expected = L0.Address(
+        destination="apply_code0",
+        name="lifted_code0",
+        then=L0.Call(target="apply_code0", arguments=["y", "x"]),
     )
-    expected_procedures = [
-        proc(
-            "abstract_code0",
-            ["abstract_env0", "x"],
-            L0.Copy(
-                destination="d",
-                source="abstract_env0",
-                then=L0.Load(destination="y", base="abstract_env0", index=1, then=h("y")),
-            ),
-        )
-    ]
+    expected_procedures = [proc("lifted_code0", ["y", "x"], h("y"))]
     assert l0_actual == l0_expected
     assert actual_procedures == expected_procedures
 
@@ -345,47 +275,22 @@ def test_close_statement():
     )
     actual_procedures: list[L0.Procedure] = []
     l0_actual = close_statement(statement=statement, procedures=actual_procedures, fresh=SequentialNameGenerator())
-    l0_expected = L0.Allocate(
-        destination="j0",
-        count=1,
+    l0_expected = L0.Branch(
+        operator="==",
+        left="x",
+        right="y",
         then=L0.Address(
-            destination="abstract_heap0",
-            name="abstract_code0",
-            then=L0.Store(
-                base="j0",
-                index=0,
-                value="abstract_heap0",
-                then=L0.Branch(
-                    operator="==",
-                    left="x",
-                    right="y",
-                    then=L0.Load(
-                        destination="apply_code0",
-                        base="j0",
-                        index=0,
-                        then=L0.Call(target="apply_code0", arguments=["j0", "a"]),
-                    ),
-                    otherwise=L0.Load(
-                        destination="apply_code1",
-                        base="j0",
-                        index=0,
-                        then=L0.Call(target="apply_code1", arguments=["j0", "b"]),
-                    ),
-                ),
-            ),
+            destination="apply_code0",
+            name="lifted_code0",
+            then=L0.Call(target="apply_code0", arguments=["a"]),
+        ),
+        otherwise=L0.Address(
+            destination="apply_code1",
+            name="lifted_code0",
+            then=L0.Call(target="apply_code1", arguments=["b"]),
         ),
     )
-    expected_procedures = [
-        proc(
-            "abstract_code0",
-            ["abstract_env0", "t0"],
-            L0.Copy(
-                destination="j0",
-                source="abstract_env0",
-                then=h("t0"),
-            ),
-        )
-    ]
+    expected_procedures = [proc("lifted_code0", ["t0"], h("t0"))]
     assert l0_actual == l0_expected
     assert actual_procedures == expected_procedures
 
@@ -506,10 +411,10 @@ def test_close_statement():
             L0.Copy(
                 destination="rec",
                 source="abstract_env0",
-                then=L0.Load(
+                # A closure calling itself addresses its own code.
+                then=L0.Address(
                     destination="apply_code0",
-                    base="rec",
-                    index=0,
+                    name="abstract_code0",
                     then=L0.Call(target="apply_code0", arguments=["rec", "x"]),
                 ),
             ),
@@ -568,3 +473,154 @@ def test_close_statement():
     ]
     assert l0_actual == l0_expected
     assert actual_procedures == expected_procedures
+
+
+def test_annotate_free():
+    # Every statement form, with the inner function capturing in an order different from the one it binds in.
+    inner = Abstract(
+        destination="g",
+        parameters=["k"],
+        body=Load(
+            destination="v",
+            base="b",
+            index=0,
+            then=Store(
+                base="b",
+                index=0,
+                value="a",
+                then=Primitive(
+                    destination="s", operator="+", left="v", right="z", then=Apply(target="k", arguments=["s"])
+                ),
+            ),
+        ),
+        then=Halt(value="g"),
+    )
+    outer = Abstract(
+        destination="f",
+        parameters=["a"],
+        body=Immediate(
+            destination="z",
+            value=1,
+            then=Copy(
+                destination="c",
+                source="y",
+                then=Branch(
+                    operator="<",
+                    left="a",
+                    right="c",
+                    then=Allocate(destination="b", count=1, then=inner),
+                    otherwise=Halt(value="w"),
+                ),
+            ),
+        ),
+        then=Apply(target="f", arguments=["x"]),
+    )
+
+    free: dict[int, dict[str, None]] = {}
+    result = annotate_free(outer, free)
+
+    assert list(result) == ["y", "w", "x"]
+    assert list(free[id(outer)]) == ["y", "w"]
+    assert list(free[id(inner)]) == ["b", "a", "z"]
+
+    # A use before a binder of the same name is free; the binder's scope ends with its own continuation.
+    shadowed = Branch(
+        operator="<",
+        left="a",
+        right="a",
+        then=Copy(destination="x", source="x", then=Halt(value="x")),
+        otherwise=Halt(value="x"),
+    )
+    assert list(annotate_free(shadowed, {})) == ["a", "x"]
+    assert list(annotate_free(Copy(destination="x", source="y", then=Halt(value="x")), {})) == ["y"]
+
+
+def test_close_program_lifting():
+    # c is closed and e only captures n, so both are lifted even though other functions call them; f captures n and
+    # calls itself, so it keeps its closure. h is lifted and takes what it captures from e and f as extra arguments.
+    program = Program(
+        parameters=["n"],
+        body=Abstract(
+            destination="c",
+            parameters=["x"],
+            body=Halt(value="x"),
+            then=Abstract(
+                destination="e",
+                parameters=["v"],
+                body=Primitive(destination="u", operator="+", left="v", right="n", then=Halt(value="u")),
+                then=Abstract(
+                    destination="f",
+                    parameters=["y"],
+                    body=Primitive(
+                        destination="s", operator="+", left="y", right="n", then=Apply(target="f", arguments=["s"])
+                    ),
+                    then=Abstract(
+                        destination="g",
+                        parameters=["z"],
+                        body=Apply(target="c", arguments=["z"]),
+                        then=Abstract(
+                            destination="h",
+                            parameters=["w"],
+                            body=Branch(
+                                operator="<",
+                                left="w",
+                                right="n",
+                                then=Apply(target="e", arguments=["w"]),
+                                otherwise=Apply(target="f", arguments=["w"]),
+                            ),
+                            then=Apply(target="h", arguments=["g"]),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+    l0_actual = close_program(program=program)
+
+    assert [procedure.name for procedure in l0_actual.procedures] == [
+        "lifted_code0",
+        "lifted_code1",
+        "abstract_code0",
+        "abstract_code1",
+        "lifted_code2",
+        "l0",
+    ]
+    assert l0_actual.procedures[1] == proc(
+        "lifted_code1",
+        ["n", "v"],
+        L0.Primitive(destination="u", operator="+", left="v", right="n", then=h("u")),
+    )
+    assert l0_actual.procedures[3] == proc(
+        "abstract_code1",
+        ["abstract_env1", "z"],
+        L0.Copy(
+            destination="g",
+            source="abstract_env1",
+            then=L0.Address(
+                destination="apply_code1",
+                name="lifted_code0",
+                then=L0.Call(target="apply_code1", arguments=["z"]),
+            ),
+        ),
+    )
+    assert l0_actual.procedures[4] == proc(
+        "lifted_code2",
+        ["n", "f", "w"],
+        L0.Branch(
+            operator="<",
+            left="w",
+            right="n",
+            then=L0.Address(
+                destination="apply_code2",
+                name="lifted_code1",
+                then=L0.Call(target="apply_code2", arguments=["n", "w"]),
+            ),
+            otherwise=L0.Load(
+                destination="apply_code3",
+                base="f",
+                index=0,
+                then=L0.Call(target="apply_code3", arguments=["f", "w"]),
+            ),
+        ),
+    )
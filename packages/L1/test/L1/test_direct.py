@@ -0,0 +1,220 @@
+from L1.direct import PROGRAM, analyze_program, report
+from L1.syntax import Abstract, Allocate, Apply, Branch, Copy, Halt, Immediate, Load, Primitive, Program, Store
+from L1.to_python import compile_to_callable, to_ast_program
+
+
+def run(program: Program, *arguments: int, direct: bool) -> object:
+    namespace: dict[str, object] = {}
+    exec(to_ast_program(program, direct=analyze_program(program) if direct else None), namespace)
+    return namespace["l1"](*arguments)  # type: ignore[operator]
+
+
+# (let ((f (\ (y) (+ y y)))) (+ (f x) 1)), as produced by cps_convert.
+CALL = Program(
+    parameters=["x"],
+    body=Abstract(
+        destination="f",
+        parameters=["y", "k0"],
+        body=Primitive(destination="t0", operator="+", left="y", right="y", then=Apply(target="k0", arguments=["t0"])),
+        then=Abstract(
+            destination="k1",
+            parameters=["t1"],
+            body=Immediate(
+                destination="t2",
+                value=1,
+                then=Primitive(destination="t3", operator="+", left="t1", right="t2", then=Halt(value="t3")),
+            ),
+            then=Apply(target="f", arguments=["x", "k1"]),
+        ),
+    ),
+)
+
+
+def test_analyze_program_direct():
+    analysis = analyze_program(CALL)
+
+    assert analysis.continuations == {"k0", "k1"}
+    assert analysis.inlined == {"k1"}
+    assert analysis.functions == {PROGRAM: None, "f": None}
+    assert analysis.direct
+    assert report(analysis) == "<program>            direct\nf                    direct\nemitted in direct style"
+
+
+def test_to_ast_program_direct():
+    source = to_ast_program(CALL, direct=analyze_program(CALL))
+
+    assert "k0" not in source
+    assert "k1" not in source
+    assert "t1 = f(x)" in source
+    assert run(CALL, 5, direct=True) == run(CALL, 5, direct=False) == 11
+    assert compile_to_callable(CALL, direct=analyze_program(CALL))(5) == 11
+
+
+def test_to_ast_program_direct_join_and_nullary():
+    # (let ((g (\ () x))) (+ 1 (if (< x 0) (g) x))): a nullary call looks like a continuation call.
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="g",
+            parameters=["k0"],
+            body=Apply(target="k0", arguments=["x"]),
+            then=Immediate(
+                destination="t0",
+                value=1,
+                then=Immediate(
+                    destination="t1",
+                    value=0,
+                    then=Abstract(
+                        destination="j0",
+                        parameters=["t2"],
+                        body=Primitive(
+                            destination="t3",
+                            operator="+",
+                            left="t0",
+                            right="t2",
+                            then=Halt(value="t3"),
+                        ),
+                        then=Branch(
+                            operator="<",
+                            left="x",
+                            right="t1",
+                            then=Apply(target="g", arguments=["j0"]),
+                            otherwise=Apply(target="j0", arguments=["x"]),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+    analysis = analyze_program(program)
+    assert analysis.continuations == {"k0", "j0"}
+    assert analysis.inlined == set()
+    assert analysis.direct
+
+    for x in (-3, 3):
+        assert run(program, x, direct=True) == run(program, x, direct=False) == x + 1
+
+
+def test_to_ast_program_direct_tail_call_and_effects():
+    # A function that stores its argument and tail-calls another function with its own continuation.
+    program = Program(
+        parameters=["x"],
+        body=Allocate(
+            destination="b",
+            count=1,
+            then=Abstract(
+                destination="get",
+                parameters=["k0"],
+                body=Load(destination="t0", base="b", index=0, then=Apply(target="k0", arguments=["t0"])),
+                then=Abstract(
+                    destination="put",
+                    parameters=["v", "k1"],
+                    body=Store(base="b", index=0, value="v", then=Apply(target="get", arguments=["k1"])),
+                    then=Abstract(
+                        destination="k2",
+                        parameters=["t1"],
+                        body=Copy(destination="t2", source="t1", then=Halt(value="t2")),
+                        then=Apply(target="put", arguments=["x", "k2"]),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+    assert analyze_program(program).direct
+    assert run(program, 7, direct=True) == run(program, 7, direct=False) == 7
+
+
+def test_analyze_program_captured_continuation():
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="f",
+            parameters=["y", "k0"],
+            body=Abstract(
+                destination="g",
+                parameters=["z", "k1"],
+                body=Apply(target="k0", arguments=["z"]),
+                then=Apply(target="g", arguments=["y", "k0"]),
+            ),
+            then=Abstract(
+                destination="k2",
+                parameters=["t0"],
+                body=Halt(value="t0"),
+                then=Apply(target="f", arguments=["x", "k2"]),
+            ),
+        ),
+    )
+
+    analysis = analyze_program(program)
+
+    assert analysis.functions == {PROGRAM: None, "f": None, "g": "captures continuation k0"}
+    assert not analysis.direct
+    assert "g                    cps     captures continuation k0" in report(analysis)
+    assert report(analysis).endswith("emitted in CPS: every function shares one calling convention")
+    assert "k0" in to_ast_program(program, direct=analysis)
+
+
+def test_analyze_program_escaping_continuation():
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="f",
+            parameters=["y", "k0"],
+            body=Copy(destination="k1", source="k0", then=Halt(value="y")),
+            then=Apply(target="f", arguments=["x", "x"]),
+        ),
+    )
+
+    analysis = analyze_program(program)
+
+    assert analysis.functions["f"] == "copies continuation k0"
+    assert analysis.functions[PROGRAM] == "x is used as both a value and a continuation"
+
+
+def test_analyze_program_malformed():
+    program = Program(
+        parameters=[],
+        body=Abstract(
+            destination="f",
+            parameters=[],
+            body=Immediate(destination="t0", value=0, then=Halt(value="t0")),
+            then=Halt(value="f"),
+        ),
+    )
+    assert analyze_program(program).functions[PROGRAM] == "f takes no continuation"
+
+    program = Program(parameters=["g"], body=Apply(target="g", arguments=[]))
+    assert analyze_program(program).functions[PROGRAM] == "g is called without a continuation"
+
+
+def test_analyze_program_ambiguous():
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="h",
+            parameters=["a"],
+            body=Apply(target="a", arguments=["b"]),
+            then=Halt(value="x"),
+        ),
+    )
+
+    assert analyze_program(program).functions[PROGRAM] == "cannot tell whether a is a continuation"
+
+
+def test_analyze_program_conflicting():
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="f",
+            parameters=["y", "k0"],
+            body=Copy(destination="t0", source="k0", then=Halt(value="t0")),
+            then=Halt(value="x"),
+        ),
+    )
+
+    analysis = analyze_program(program)
+
+    assert analysis.functions[PROGRAM] == "t0 is used as both a value and a continuation"
+    assert analysis.functions["f"] == "copies continuation k0"
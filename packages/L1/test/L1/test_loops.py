@@ -0,0 +1,164 @@
+import ast
+
+from L1.direct import analyze_program
+from L1.loops import find_loops
+from L1.syntax import Abstract, Allocate, Apply, Branch, Halt, Immediate, Load, Primitive, Program, Statement, Store
+from L1.to_python import rebind, to_ast_program
+
+
+def loop_program(step: Statement = Apply(target="g", arguments=["i1", "a1", "k"])) -> Program:
+    # (letrec ((go (\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)), as produced by cps_convert.
+    return Program(
+        parameters=["n"],
+        body=Allocate(
+            destination="b",
+            count=1,
+            then=Abstract(
+                destination="go",
+                parameters=["i", "acc", "k"],
+                body=Branch(
+                    operator="<",
+                    left="i",
+                    right="n",
+                    then=Load(
+                        destination="g",
+                        base="b",
+                        index=0,
+                        then=Immediate(
+                            destination="one",
+                            value=1,
+                            then=Primitive(
+                                destination="i1",
+                                operator="+",
+                                left="i",
+                                right="one",
+                                then=Primitive(destination="a1", operator="+", left="acc", right="i", then=step),
+                            ),
+                        ),
+                    ),
+                    otherwise=Apply(target="k", arguments=["acc"]),
+                ),
+                then=Store(
+                    base="b",
+                    index=0,
+                    value="go",
+                    then=Load(
+                        destination="g0",
+                        base="b",
+                        index=0,
+                        then=Immediate(
+                            destination="z",
+                            value=0,
+                            then=Abstract(
+                                destination="k0",
+                                parameters=["r"],
+                                body=Halt(value="r"),
+                                then=Apply(target="g0", arguments=["z", "z", "k0"]),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+
+def run(program: Program, *arguments: int, **options: bool) -> object:
+    namespace: dict[str, object] = {}
+    direct = analyze_program(program) if options.pop("direct", False) else None
+    exec(to_ast_program(program, direct=direct, **options), namespace)
+    return namespace["l1"](*arguments)  # type: ignore[operator]
+
+
+def test_find_loops():
+    loops = find_loops(loop_program())
+
+    assert loops.functions == {"go"}
+    assert loops.targets == {"go": "go", "k0": "k0", "g": "go", "g0": "go"}
+
+
+def test_to_ast_program_loop():
+    program = loop_program()
+
+    assert "while True" in to_ast_program(program)
+    assert "i, acc = (i1, a1)" in to_ast_program(program)
+    for options in ({}, {"direct": True}, {"trampoline": True}):
+        assert run(program, 100_000, **options) == sum(range(100_000))
+
+
+def test_find_loops_not_a_self_tail_call():
+    # (go (+ i 1) (+ acc i)) in a non-tail position: the call gets a fresh continuation.
+    step = Abstract(
+        destination="k1",
+        parameters=["r1"],
+        body=Apply(target="k", arguments=["r1"]),
+        then=Apply(target="g", arguments=["i1", "a1", "k1"]),
+    )
+
+    assert find_loops(loop_program(step)).functions == set()
+
+
+def test_find_loops_captured_binder():
+    # A closure over i that outlives the iteration would see the next iteration's i.
+    step = Abstract(
+        destination="h",
+        parameters=["k1"],
+        body=Apply(target="k1", arguments=["i"]),
+        then=Allocate(
+            destination="c",
+            count=1,
+            then=Store(base="c", index=0, value="h", then=Apply(target="g", arguments=["i1", "a1", "k"])),
+        ),
+    )
+    program = loop_program(step)
+
+    assert find_loops(program).functions == set()
+    assert "while True" not in to_ast_program(program)
+
+
+def test_find_loops_continuations_exempt():
+    # A continuation that closes over i is only invoked by a call that leaves the loop.
+    step = Abstract(
+        destination="k1",
+        parameters=["r1"],
+        body=Primitive(destination="a2", operator="+", left="r1", right="i", then=Apply(target="k", arguments=["a2"])),
+        then=Branch(
+            operator="<",
+            left="i1",
+            right="n",
+            then=Apply(target="g", arguments=["i1", "a1", "k"]),
+            otherwise=Apply(target="k1", arguments=["a1"]),
+        ),
+    )
+    program = loop_program(step)
+    analysis = analyze_program(program)
+
+    assert find_loops(program).functions == set()
+    assert find_loops(program, continuations=analysis.continuations).functions == {"go"}
+    for options in ({}, {"direct": True}, {"trampoline": True}):
+        assert run(program, 100, **options) == sum(range(100)) + 99
+
+
+def test_find_loops_box_stored_again():
+    # A store from inside the function runs on every call, so loads of the box are no longer known calls.
+    step = Store(base="b", index=0, value="go", then=Apply(target="g", arguments=["i1", "a1", "k"]))
+
+    loops = find_loops(loop_program(step))
+
+    assert loops.functions == set()
+    assert "g" not in loops.targets
+
+
+def test_find_loops_box_read_elsewhere():
+    step = Load(destination="t", base="b", index=1, then=Apply(target="g", arguments=["i1", "a1", "k"]))
+
+    assert "g" not in find_loops(loop_program(step)).targets
+
+
+def test_rebind():
+    def unparse(statements: list[ast.stmt]) -> str:
+        return ast.unparse(ast.fix_missing_locations(ast.Module(body=statements)))
+
+    assert rebind([], []) == []
+    assert unparse(rebind(["x", "y"], ["x", "z"])) == "y = z"
+    assert unparse(rebind(["x", "y"], ["y", "x"])) == "x, y = (y, x)"
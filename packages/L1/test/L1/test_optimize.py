@@ -0,0 +1,166 @@
+from L1.close import close_program
+from L1.optimize import contract_statement, optimize_program
+from L1.syntax import Abstract, Allocate, Apply, Branch, Copy, Halt, Immediate, Load, Primitive, Program, Store
+
+
+def test_contract_copy_propagation():
+    statement = Copy(
+        destination="a",
+        source="x",
+        then=Copy(destination="b", source="a", then=Halt(value="b")),
+    )
+
+    assert contract_statement(statement) == Halt(value="x")
+
+
+def test_contract_eta_reduction():
+    statement = Abstract(
+        destination="k1",
+        parameters=["t"],
+        body=Apply(target="k0", arguments=["t"]),
+        then=Apply(target="f", arguments=["x", "k1"]),
+    )
+
+    assert contract_statement(statement) == Apply(target="f", arguments=["x", "k0"])
+
+
+def test_contract_eta_reduction_needs_forwarded_parameters():
+    statement = Abstract(
+        destination="k1",
+        parameters=["t"],
+        body=Apply(target="k0", arguments=["x"]),
+        then=Apply(target="f", arguments=["k1", "k1"]),
+    )
+
+    assert contract_statement(statement) == statement
+
+
+def test_contract_dead_immediate_and_abstract():
+    statement = Immediate(
+        destination="t0",
+        value=0,
+        then=Primitive(
+            destination="t1",
+            operator="+",
+            left="x",
+            right="x",
+            then=Abstract(
+                destination="f",
+                parameters=["y"],
+                body=Halt(value="y"),
+                then=Halt(value="x"),
+            ),
+        ),
+    )
+
+    assert contract_statement(statement) == Halt(value="x")
+
+
+def test_contract_inline_single_call():
+    statement = Abstract(
+        destination="k",
+        parameters=["t"],
+        body=Primitive(destination="u", operator="*", left="t", right="t", then=Halt(value="u")),
+        then=Branch(
+            operator="<",
+            left="x",
+            right="y",
+            then=Apply(target="k", arguments=["x"]),
+            otherwise=Halt(value="y"),
+        ),
+    )
+
+    expected = Branch(
+        operator="<",
+        left="x",
+        right="y",
+        then=Primitive(destination="u", operator="*", left="x", right="x", then=Halt(value="u")),
+        otherwise=Halt(value="y"),
+    )
+
+    assert contract_statement(statement) == expected
+
+
+def test_contract_keeps_shared_and_escaping_abstracts():
+    statement = Abstract(
+        destination="k",
+        parameters=["t"],
+        body=Halt(value="t"),
+        then=Branch(
+            operator="==",
+            left="x",
+            right="y",
+            then=Apply(target="k", arguments=["x"]),
+            otherwise=Apply(target="f", arguments=["k"]),
+        ),
+    )
+
+    assert contract_statement(statement) == statement
+
+
+def test_contract_keeps_effects():
+    statement = Immediate(
+        destination="i",
+        value=1,
+        then=Allocate(
+            destination="b",
+            count=1,
+            then=Store(
+                base="b",
+                index=0,
+                value="i",
+                then=Load(destination="v", base="b", index=0, then=Halt(value="x")),
+            ),
+        ),
+    )
+
+    assert contract_statement(statement) == statement
+
+
+def test_optimize_program():
+    # The shape cps_convert produces for (let ((a x)) (f a)) under a non-tail continuation.
+    program = Program(
+        parameters=["x", "f"],
+        body=Copy(
+            destination="a",
+            source="x",
+            then=Abstract(
+                destination="k0",
+                parameters=["t0"],
+                body=Halt(value="t0"),
+                then=Apply(target="f", arguments=["a", "k0"]),
+            ),
+        ),
+    )
+
+    expected = Program(
+        parameters=["x", "f"],
+        body=Abstract(
+            destination="k0",
+            parameters=["t0"],
+            body=Halt(value="t0"),
+            then=Apply(target="f", arguments=["x", "k0"]),
+        ),
+    )
+
+    assert optimize_program(program) == expected
+
+
+def test_optimize_program_before_close():
+    program = Program(
+        parameters=["x"],
+        body=Abstract(
+            destination="k0",
+            parameters=["t0"],
+            body=Halt(value="t0"),
+            then=Abstract(
+                destination="k1",
+                parameters=["t1"],
+                body=Apply(target="k0", arguments=["t1"]),
+                then=Apply(target="k1", arguments=["x"]),
+            ),
+        ),
+    )
+
+    assert len(close_program(program).procedures) == 3
+    assert len(close_program(optimize_program(program)).procedures) == 1
@@ -1,162 +1,752 @@
 from collections.abc import Callable, Sequence
-from functools import partial
+from dataclasses import dataclass
+from typing import Any
 
 from L1 import syntax as L1
+from util.source_map import Span
 
 from L2 import syntax as L2
 
+# The converter is a small abstract machine instead of a pair of mutually recursive functions so that
+# neither the depth of the input nor the length of the continuation chain is limited by the Python stack.
+#
+# Meta-continuations (what to do with the identifier holding a term's value) are immutable frames linked
+# through their `k` field. Holes are statement constructors waiting for the statement that fills their
+# `then` (or `body`) field; they live on an explicit stack.
+#
+# A `_Return` frame is a dynamic continuation: the value is passed to a continuation variable of the
+# generated program. Every other frame is static and only exists at conversion time. Calls and branches in
+# tail position (under a dynamic continuation) reuse the continuation variable instead of reifying a new
+# continuation or join point that would merely forward its argument.
+#
+# Sequences (let bindings, begin effects, call arguments) are walked by index rather than by slicing, so
+# converting a sequence of n terms does O(n) work instead of O(n^2).
 
-def cps_convert_term(
-    term: L2.Term,
-    k: Callable[[L1.Identifier], L1.Statement],
+
+@dataclass(frozen=True, slots=True)
+class _Static:
+    function: Callable[[Any], L1.Statement]
+
+
+@dataclass(frozen=True, slots=True)
+class _Return:
+    target: L1.Identifier
+
+
+@dataclass(frozen=True, slots=True)
+class _LetBinding:
+    bindings: Sequence[tuple[L2.Identifier, L2.Term]]
+    index: int
+    body: L2.Term
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _ApplyTarget:
+    arguments: Sequence[L2.Term]
+    value: L1.Identifier
+    continuation: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _ApplyArguments:
+    target: L1.Identifier
+    value: L1.Identifier
+    continuation: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _TailCallTarget:
+    arguments: Sequence[L2.Term]
+    continuation: L1.Identifier
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _TailCallArguments:
+    target: L1.Identifier
+    continuation: L1.Identifier
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _PrimitiveLeft:
+    operator: Any
+    right: L2.Term
+    destination: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _PrimitiveRight:
+    operator: Any
+    left: L1.Identifier
+    destination: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BranchLeft:
+    operator: Any
+    right: L2.Term
+    consequent: L2.Term
+    otherwise: L2.Term
+    join: L1.Identifier | None
+    value: L1.Identifier | None
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BranchRight:
+    operator: Any
+    left: L1.Identifier
+    consequent: L2.Term
+    otherwise: L2.Term
+    join: L1.Identifier | None
+    value: L1.Identifier | None
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _LoadBase:
+    index: int
+    destination: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _StoreBase:
+    index: int
+    value: L2.Term
+    destination: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _StoreValue:
+    base: L1.Identifier
+    index: int
+    destination: L1.Identifier
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BeginEffect:
+    effects: Sequence[L2.Term]
+    index: int
+    value: L2.Term
+    k: _Continuation
+
+
+@dataclass(frozen=True, slots=True)
+class _TermsElement:
+    terms: Sequence[L2.Term]
+    index: int
+    values: list[L1.Identifier]
+    k: _Continuation
+
+
+type _Continuation = (
+    _Static
+    | _Return
+    | _LetBinding
+    | _ApplyTarget
+    | _ApplyArguments
+    | _TailCallTarget
+    | _TailCallArguments
+    | _PrimitiveLeft
+    | _PrimitiveRight
+    | _BranchLeft
+    | _BranchRight
+    | _LoadBase
+    | _StoreBase
+    | _StoreValue
+    | _BeginEffect
+    | _TermsElement
+)
+
+
+@dataclass(frozen=True, slots=True)
+class _CopyHole:
+    destination: L1.Identifier
+    source: L1.Identifier
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _ImmediateHole:
+    destination: L1.Identifier
+    value: int
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _PrimitiveHole:
+    destination: L1.Identifier
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _AllocateHole:
+    destination: L1.Identifier
+    count: int
+    fill: int | None
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _LoadHole:
+    destination: L1.Identifier
+    base: L1.Identifier
+    index: int
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _StoreHole:
+    base: L1.Identifier
+    index: int
+    value: L1.Identifier
+    destination: L1.Identifier
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _AbstractBody:
+    destination: L1.Identifier
+    parameters: Sequence[L1.Identifier]
+    k: _Continuation
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _AbstractThen:
+    destination: L1.Identifier
+    parameters: Sequence[L1.Identifier]
+    body: L1.Statement
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _ApplyBody:
+    continuation: L1.Identifier
+    value: L1.Identifier
+    target: L1.Identifier
+    arguments: Sequence[L1.Identifier]
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BranchBody:
+    join: L1.Identifier
+    value: L1.Identifier
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    consequent: L2.Term
+    otherwise: L2.Term
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BranchThen:
+    join: L1.Identifier
+    value: L1.Identifier
+    body: L1.Statement
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    otherwise: L2.Term
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _BranchOtherwise:
+    join: L1.Identifier
+    value: L1.Identifier
+    body: L1.Statement
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    then: L1.Statement
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _TailBranchThen:
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    otherwise: L2.Term
+    k: _Return
+    span: Span | None
+
+
+@dataclass(frozen=True, slots=True)
+class _TailBranchOtherwise:
+    operator: Any
+    left: L1.Identifier
+    right: L1.Identifier
+    then: L1.Statement
+    span: Span | None
+
+
+type _Hole = (
+    _CopyHole
+    | _ImmediateHole
+    | _PrimitiveHole
+    | _AllocateHole
+    | _LoadHole
+    | _StoreHole
+    | _AbstractBody
+    | _AbstractThen
+    | _ApplyBody
+    | _BranchBody
+    | _BranchThen
+    | _BranchOtherwise
+    | _TailBranchThen
+    | _TailBranchOtherwise
+)
+
+
+def _convert(
+    term: L2.Term | None,
+    terms: Sequence[L2.Term] | None,
+    k: _Continuation,
     fresh: Callable[[str], str],
 ) -> L1.Statement:
-    _term = partial(cps_convert_term, fresh=fresh)
-    _terms = partial(cps_convert_terms, fresh=fresh)
-
-    match term:
-        case L2.Let(bindings=bindings, body=body):
-            if len(bindings) == 0:
-                return _term(body, k)
-            binding, t = bindings[0]
-            return _term(
-                t,
-                lambda x: L1.Copy(
-                    destination=binding, source=x, then=_term(L2.Let(bindings=bindings[1:], body=body), k)
-                ),
-            )
+    holes: list[_Hole] = []
+    value: Any = None
+    statement: L1.Statement | None = None
 
-        case L2.Reference(name=name):
-            return k(name)
-
-        case L2.Abstract(parameters=parameters, body=body):
-            new_identifier = fresh("t")
-            abstract_identifier = fresh("k")
-            return L1.Abstract(
-                destination=new_identifier,
-                parameters=parameters + [abstract_identifier],
-                body=_term(body, lambda bo: L1.Apply(target=abstract_identifier, arguments=[bo])),
-                then=k(new_identifier),
-            )
+    while True:
+        # Evaluate: convert `term` (or the sequence `terms`) until some continuation receives a value.
+        if terms is not None:
+            if len(terms) == 0:
+                value = []
+            else:
+                term, k = terms[0], _TermsElement(terms=terms, index=0, values=[], k=k)
 
-        case L2.Apply(target=target, arguments=arguments):
-            new_identifier = fresh("t")
-            abstract_identifier = fresh("k")
-            return _term(
-                target,
-                lambda tar: _terms(
-                    arguments,
-                    lambda args: L1.Abstract(
-                        destination=abstract_identifier,
-                        parameters=[new_identifier],
-                        body=k(new_identifier),
-                        then=L1.Apply(
-                            target=tar,
-                            arguments=args + [abstract_identifier],
+            terms = None
+
+        while term is not None:
+            match term:
+                case L2.Let(bindings=bindings, body=body):
+                    if len(bindings) == 0:
+                        term = body
+                    else:
+                        term, k = (
+                            bindings[0][1],
+                            _LetBinding(bindings=bindings, index=0, body=body, k=k, span=term.span),
+                        )
+
+                case L2.Reference(name=name):
+                    term, value = None, name
+
+                case L2.Abstract(parameters=parameters, body=body):
+                    new_identifier = fresh("t")
+                    abstract_identifier = fresh("k")
+                    holes.append(
+                        _AbstractBody(
+                            destination=new_identifier,
+                            parameters=[*parameters, abstract_identifier],
+                            k=k,
+                            span=term.span,
+                        )
+                    )
+                    term, k = body, _Return(target=abstract_identifier)
+
+                case L2.Apply(target=target, arguments=arguments) if isinstance(k, _Return):
+                    term, k = target, _TailCallTarget(arguments=arguments, continuation=k.target, span=term.span)
+
+                case L2.Apply(target=target, arguments=arguments):
+                    new_identifier = fresh("t")
+                    abstract_identifier = fresh("k")
+                    term, k = (
+                        target,
+                        _ApplyTarget(
+                            arguments=arguments,
+                            value=new_identifier,
+                            continuation=abstract_identifier,
+                            k=k,
+                            span=term.span,
+                        ),
+                    )
+
+                case L2.Immediate(value=immediate):
+                    new_identifier = fresh("t")
+                    holes.append(_ImmediateHole(destination=new_identifier, value=immediate, span=term.span))
+                    term, value = None, new_identifier
+
+                case L2.Primitive(operator=operator, left=left, right=right):
+                    new_identifier = fresh("t")
+                    term, k = (
+                        left,
+                        _PrimitiveLeft(operator=operator, right=right, destination=new_identifier, k=k, span=term.span),
+                    )
+
+                case L2.Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
+                    main_id = None if isinstance(k, _Return) else fresh("j")
+                    new_identifier = None if isinstance(k, _Return) else fresh("t")
+                    term, k = (
+                        left,
+                        _BranchLeft(
+                            operator=operator,
+                            right=right,
+                            consequent=consequent,
+                            otherwise=otherwise,
+                            join=main_id,
+                            value=new_identifier,
+                            k=k,
+                            span=term.span,
                         ),
+                    )
+
+                case L2.Allocate(count=count, fill=fill):
+                    new_identifier = fresh("t")
+                    holes.append(_AllocateHole(destination=new_identifier, count=count, fill=fill, span=term.span))
+                    term, value = None, new_identifier
+
+                case L2.Load(base=base, index=index):
+                    new_identifier = fresh("t")
+                    term, k = base, _LoadBase(index=index, destination=new_identifier, k=k, span=term.span)
+
+                case L2.Store(base=base, index=index, value=stored):
+                    immediate_id = fresh("t")
+                    term, k = base, _StoreBase(index=index, value=stored, destination=immediate_id, k=k, span=term.span)
+
+                case L2.Begin(effects=effects, value=result):  # pragma: no branch
+                    if len(effects) == 0:
+                        term = result
+                    else:
+                        term, k = effects[0], _BeginEffect(effects=effects, index=0, value=result, k=k)
+
+        # Apply: hand `value` to the continuation `k`, which either resumes evaluation or yields a statement.
+        match k:
+            case _Static(function=function):
+                statement = function(value)
+
+            case _Return(target=target):
+                statement = L1.Apply(target=target, arguments=[value])
+
+            case _LetBinding(bindings=bindings, index=index, body=body, k=k, span=span):
+                holes.append(_CopyHole(destination=bindings[index][0], source=value, span=span))
+                index += 1
+                if index == len(bindings):
+                    term = body
+                else:
+                    term, k = (
+                        bindings[index][1],
+                        _LetBinding(bindings=bindings, index=index, body=body, k=k, span=span),
+                    )
+                continue
+
+            case _ApplyTarget(
+                arguments=arguments, value=new_identifier, continuation=abstract_identifier, k=k, span=span
+            ):
+                terms, k = (
+                    arguments,
+                    _ApplyArguments(
+                        target=value, value=new_identifier, continuation=abstract_identifier, k=k, span=span
                     ),
-                ),
-            )
+                )
+                continue
 
-        case L2.Immediate(value=value):
-            new_identifier = fresh("t")
-            return L1.Immediate(
-                destination=new_identifier,
-                value=value,
-                then=k(new_identifier),
-            )
+            case _ApplyArguments(target=target, value=new_identifier, continuation=abstract_identifier, k=k, span=span):
+                holes.append(
+                    _ApplyBody(
+                        continuation=abstract_identifier,
+                        value=new_identifier,
+                        target=target,
+                        arguments=value,
+                        span=span,
+                    )
+                )
+                value = new_identifier
+                continue
+
+            case _TailCallTarget(arguments=arguments, continuation=continuation, span=span):
+                terms, k = arguments, _TailCallArguments(target=value, continuation=continuation, span=span)
+                continue
+
+            case _TailCallArguments(target=target, continuation=continuation, span=span):
+                statement = L1.Apply(target=target, arguments=[*value, continuation], span=span)
 
-        case L2.Primitive(operator=operator, left=left, right=right):
-            new_identifier = fresh("t")
-            return _term(
-                left,
-                lambda le: _term(
+            case _PrimitiveLeft(operator=operator, right=right, destination=destination, k=k, span=span):
+                term, k = (
                     right,
-                    lambda ri: L1.Primitive(
-                        destination=new_identifier,
+                    _PrimitiveRight(operator=operator, left=value, destination=destination, k=k, span=span),
+                )
+                continue
+
+            case _PrimitiveRight(operator=operator, left=left, destination=destination, k=k, span=span):
+                holes.append(
+                    _PrimitiveHole(destination=destination, operator=operator, left=left, right=value, span=span)
+                )
+                value = destination
+                continue
+
+            case _BranchLeft(
+                operator=operator,
+                right=right,
+                consequent=consequent,
+                otherwise=otherwise,
+                join=join,
+                value=new_identifier,
+                k=k,
+                span=span,
+            ):
+                term, k = (
+                    right,
+                    _BranchRight(
                         operator=operator,
-                        left=le,
-                        right=ri,
-                        then=k(new_identifier),
+                        left=value,
+                        consequent=consequent,
+                        otherwise=otherwise,
+                        join=join,
+                        value=new_identifier,
+                        k=k,
+                        span=span,
                     ),
-                ),
-            )
+                )
+                continue
 
-        case L2.Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
-            main_id = fresh("j")
-            new_identifier = fresh("t")
-            return _term(
-                left,
-                lambda le: _term(
-                    right,
-                    lambda ri: L1.Abstract(
-                        destination=main_id,
+            case _BranchRight(
+                operator=operator,
+                left=left,
+                consequent=consequent,
+                otherwise=otherwise,
+                join=None,
+                k=_Return() as k,
+                span=span,
+            ):
+                holes.append(
+                    _TailBranchThen(operator=operator, left=left, right=value, otherwise=otherwise, k=k, span=span)
+                )
+                term = consequent
+                continue
+
+            case _BranchRight(
+                operator=operator,
+                left=left,
+                consequent=consequent,
+                otherwise=otherwise,
+                join=str() as join,
+                value=str() as new_identifier,
+                k=k,
+                span=span,
+            ):
+                holes.append(
+                    _BranchBody(
+                        join=join,
+                        value=new_identifier,
+                        operator=operator,
+                        left=left,
+                        right=value,
+                        consequent=consequent,
+                        otherwise=otherwise,
+                        span=span,
+                    )
+                )
+                value = new_identifier
+                continue
+
+            case _LoadBase(index=index, destination=destination, k=k, span=span):
+                holes.append(_LoadHole(destination=destination, base=value, index=index, span=span))
+                value = destination
+                continue
+
+            case _StoreBase(index=index, value=stored, destination=destination, k=k, span=span):
+                term, k = stored, _StoreValue(base=value, index=index, destination=destination, k=k, span=span)
+                continue
+
+            case _StoreValue(base=base, index=index, destination=destination, k=k, span=span):
+                holes.append(_StoreHole(base=base, index=index, value=value, destination=destination, span=span))
+                value = destination
+                continue
+
+            case _BeginEffect(effects=effects, index=index, value=result, k=k):
+                index += 1
+                if index == len(effects):
+                    term = result
+                else:
+                    term, k = effects[index], _BeginEffect(effects=effects, index=index, value=result, k=k)
+                continue
+
+            case _TermsElement(terms=elements, index=index, values=values, k=k):  # pragma: no branch
+                # Each continuation frame is resumed exactly once, so the accumulator can be shared.
+                values.append(value)
+                index += 1
+                if index == len(elements):
+                    value = values
+                else:
+                    term, k = elements[index], _TermsElement(terms=elements, index=index, values=values, k=k)
+                continue
+
+        # Return: plug `statement` into the innermost hole until a hole asks for another conversion.
+        while True:
+            if not holes:
+                return statement
+
+            match holes.pop():
+                case _CopyHole(destination=destination, source=source, span=span):
+                    statement = L1.Copy(destination=destination, source=source, then=statement, span=span)
+
+                case _ImmediateHole(destination=destination, value=immediate, span=span):
+                    statement = L1.Immediate(destination=destination, value=immediate, then=statement, span=span)
+
+                case _PrimitiveHole(destination=destination, operator=operator, left=left, right=right, span=span):
+                    statement = L1.Primitive(
+                        destination=destination,
+                        operator=operator,
+                        left=left,
+                        right=right,
+                        then=statement,
+                        span=span,
+                    )
+
+                case _AllocateHole(destination=destination, count=count, fill=fill, span=span):
+                    statement = L1.Allocate(destination=destination, count=count, fill=fill, then=statement, span=span)
+
+                case _LoadHole(destination=destination, base=base, index=index, span=span):
+                    statement = L1.Load(destination=destination, base=base, index=index, then=statement, span=span)
+
+                case _StoreHole(base=base, index=index, value=stored, destination=destination, span=span):
+                    statement = L1.Store(
+                        base=base,
+                        index=index,
+                        value=stored,
+                        then=L1.Immediate(destination=destination, value=0, then=statement, span=span),
+                        span=span,
+                    )
+
+                case _AbstractBody(destination=destination, parameters=parameters, k=k, span=span):
+                    holes.append(
+                        _AbstractThen(destination=destination, parameters=parameters, body=statement, span=span)
+                    )
+                    value = destination
+                    break
+
+                case _AbstractThen(destination=destination, parameters=parameters, body=body, span=span):
+                    statement = L1.Abstract(
+                        destination=destination, parameters=parameters, body=body, then=statement, span=span
+                    )
+
+                case _ApplyBody(
+                    continuation=continuation, value=new_identifier, target=target, arguments=arguments, span=span
+                ):
+                    statement = L1.Abstract(
+                        destination=continuation,
                         parameters=[new_identifier],
-                        body=k(new_identifier),
-                        then=L1.Branch(
+                        body=statement,
+                        then=L1.Apply(target=target, arguments=[*arguments, continuation], span=span),
+                        span=span,
+                    )
+
+                case _BranchBody(
+                    join=join,
+                    value=new_identifier,
+                    operator=operator,
+                    left=left,
+                    right=right,
+                    consequent=consequent,
+                    otherwise=otherwise,
+                    span=span,
+                ):
+                    holes.append(
+                        _BranchThen(
+                            join=join,
+                            value=new_identifier,
+                            body=statement,
                             operator=operator,
-                            left=le,
-                            right=ri,
-                            then=_term(
-                                consequent,
-                                lambda con: L1.Apply(
-                                    target=main_id,
-                                    arguments=[
-                                        con,
-                                    ],
-                                ),
-                            ),
-                            otherwise=_term(
-                                otherwise,
-                                lambda oth: L1.Apply(
-                                    target=main_id,
-                                    arguments=[oth],
-                                ),
-                            ),
-                        ),
-                    ),
-                ),
-            )
+                            left=left,
+                            right=right,
+                            otherwise=otherwise,
+                            span=span,
+                        )
+                    )
+                    term, k = consequent, _Return(target=join)
+                    break
 
-        case L2.Allocate(count=count):
-            new_identifier = fresh("t")
-            return L1.Allocate(destination=new_identifier, count=count, then=k(new_identifier))
-
-        case L2.Load(base=base, index=index):
-            new_identifier = fresh("t")
-            return _term(
-                base,
-                lambda x: L1.Load(
-                    destination=new_identifier,
-                    base=x,
-                    index=index,
-                    then=k(new_identifier),
-                ),
-            )
+                case _BranchThen(
+                    join=join,
+                    value=new_identifier,
+                    body=body,
+                    operator=operator,
+                    left=left,
+                    right=right,
+                    otherwise=otherwise,
+                    span=span,
+                ):
+                    holes.append(
+                        _BranchOtherwise(
+                            join=join,
+                            value=new_identifier,
+                            body=body,
+                            operator=operator,
+                            left=left,
+                            right=right,
+                            then=statement,
+                            span=span,
+                        )
+                    )
+                    term, k = otherwise, _Return(target=join)
+                    break
 
-        case L2.Store(base=base, index=index, value=value):
-            immediate_id = fresh("t")
-            return _term(
-                base,
-                lambda ba: _term(
-                    value,
-                    lambda val: L1.Store(
-                        base=ba,
-                        index=index,
-                        value=val,
-                        then=L1.Immediate(
-                            destination=immediate_id,
-                            value=0,
-                            then=k(immediate_id),
+                case _TailBranchThen(operator=operator, left=left, right=right, otherwise=otherwise, k=k, span=span):
+                    holes.append(
+                        _TailBranchOtherwise(operator=operator, left=left, right=right, then=statement, span=span)
+                    )
+                    term = otherwise
+                    break
+
+                case _TailBranchOtherwise(operator=operator, left=left, right=right, then=then, span=span):
+                    statement = L1.Branch(
+                        operator=operator, left=left, right=right, then=then, otherwise=statement, span=span
+                    )
+
+                case _BranchOtherwise(  # pragma: no branch
+                    join=join,
+                    value=new_identifier,
+                    body=body,
+                    operator=operator,
+                    left=left,
+                    right=right,
+                    then=then,
+                    span=span,
+                ):
+                    statement = L1.Abstract(
+                        destination=join,
+                        parameters=[new_identifier],
+                        body=body,
+                        then=L1.Branch(
+                            operator=operator, left=left, right=right, then=then, otherwise=statement, span=span
                         ),
-                    ),
-                ),
-            )
+                        span=span,
+                    )
 
-        case L2.Begin(effects=effects, value=value):  # pragma: no branch
-            if len(effects) == 0:
-                return _term(value, k)
-            return _term(effects[0], lambda _: _term(L2.Begin(effects=effects[1:], value=value), k))
+
+def cps_convert_term(
+    term: L2.Term,
+    k: Callable[[L1.Identifier], L1.Statement],
+    fresh: Callable[[str], str],
+) -> L1.Statement:
+    return _convert(term, None, _Static(function=k), fresh)
 
 
 def cps_convert_terms(
@@ -164,29 +754,16 @@ def cps_convert_terms(
     k: Callable[[Sequence[L1.Identifier]], L1.Statement],
     fresh: Callable[[str], str],
 ) -> L1.Statement:
-    _term = partial(cps_convert_term, fresh=fresh)
-    _terms = partial(cps_convert_terms, fresh=fresh)
-
-    match terms:
-        case []:
-            return k([])
-
-        case [first, *rest]:
-            return _term(first, lambda first: _terms(rest, lambda rest: k([first, *rest])))
-
-        case _:  # pragma: no cover
-            raise ValueError(terms)
+    return _convert(None, terms, _Static(function=k), fresh)
 
 
 def cps_convert_program(
     program: L2.Program,
     fresh: Callable[[str], str],
 ) -> L1.Program:
-    _term = partial(cps_convert_term, fresh=fresh)
-
     match program:
         case L2.Program(parameters=parameters, body=body):  # pragma: no branch
             return L1.Program(
                 parameters=parameters,
-                body=_term(body, lambda value: L1.Halt(value=value)),
+                body=cps_convert_term(body, lambda value: L1.Halt(value=value), fresh),
             )
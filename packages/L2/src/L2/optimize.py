@@ -1,167 +1,173 @@
-from collections.abc import Mapping, Sequence
+from collections import Counter
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
 
 from L2 import syntax as L2
 
-type Context = Mapping[L2.Identifier, int | None]
+type Context = dict[L2.Identifier, int | None]
 
 
-def try_resolveable(term: L2.Term, context: Context) -> int | None:
-    match term:
-        case L2.Reference(name=name):
-            if name in context and context[name] is not None:
-                return context[name]
-        case L2.Immediate(value=value):
-            return value
-        case L2.Primitive(operator=operator, left=left, right=right):
-            le, ri = try_resolveable(term=left, context=context), try_resolveable(term=right, context=context)
-            if le is not None and ri is not None:
-                return le + ri if operator == "+" else le - ri if operator == "-" else le * ri
-        case _:
-            return None
-    return None
+def _constant(term: L2.Term) -> int | None:
+    return term.value if isinstance(term, L2.Immediate) else None
+
+
+@contextmanager
+def _bound(context: Context, names: Mapping[L2.Identifier, int | None]) -> Iterator[None]:
+    # Binds `names` in `context` for the duration of a scope, then restores what they shadowed.
+    shadowed = {name: context[name] for name in names if name in context}
+    context.update(names)
+    try:
+        yield
+    finally:
+        for name in names:
+            del context[name]
+        context.update(shadowed)
 
 
 def build_folding(term: L2.Term, context: Context) -> L2.Term:
+    # Children are folded before their parent looks at them, so a resolvable child is already an Immediate and every
+    # node is visited once. `context` is updated in place on the way into a scope and restored on the way out.
     match term:
         case L2.Let(bindings=bindings, body=body):
             new_bindings: Sequence[tuple[L2.Identifier, L2.Term]] = []
-            local = dict(context)
-            for name, te in bindings:
-                folded_te = build_folding(term=te, context=local)
-                new_bindings.append((name, folded_te))
-                local[name] = folded_te.value if isinstance(folded_te, L2.Immediate) else None
-            return L2.Let(bindings=new_bindings, body=build_folding(term=body, context=local))
+            with ExitStack() as scope:
+                for name, te in bindings:
+                    folded_te = build_folding(term=te, context=context)
+                    new_bindings.append((name, folded_te))
+                    scope.enter_context(_bound(context, {name: _constant(folded_te)}))
+                new_body = build_folding(term=body, context=context)
+            return L2.Let(bindings=new_bindings, body=new_body, span=term.span)
         case L2.Abstract(parameters=parameters, body=body):
-            return L2.Abstract(
-                parameters=parameters,
-                body=build_folding(term=body, context={**context, **{p: None for p in parameters}}),
-            )
+            with _bound(context, dict.fromkeys(parameters)):
+                new_body = build_folding(term=body, context=context)
+            return L2.Abstract(parameters=parameters, body=new_body, span=term.span)
         case L2.Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
-            left_res = try_resolveable(term=left, context=context)
-            right_res = try_resolveable(term=right, context=context)
+            new_left, new_right = build_folding(term=left, context=context), build_folding(term=right, context=context)
+            left_res, right_res = _constant(new_left), _constant(new_right)
             if left_res is not None and right_res is not None:
                 early_resolution = left_res < right_res if operator == "<" else left_res == right_res
                 return build_folding(term=consequent if early_resolution else otherwise, context=context)
             return L2.Branch(
                 operator=operator,
-                left=build_folding(term=left, context=context),
-                right=build_folding(term=right, context=context),
+                left=new_left,
+                right=new_right,
                 consequent=build_folding(term=consequent, context=context),
                 otherwise=build_folding(term=otherwise, context=context),
+                span=term.span,
             )
         case L2.Primitive(operator=operator, left=left, right=right):
-            value = try_resolveable(term=term, context=context)
-            if value is not None:
-                return L2.Immediate(value=value)
-            return L2.Primitive(
-                operator=operator,
-                left=build_folding(term=left, context=context),
-                right=build_folding(term=right, context=context),
-            )
+            new_left, new_right = build_folding(term=left, context=context), build_folding(term=right, context=context)
+            le, ri = _constant(new_left), _constant(new_right)
+            if le is not None and ri is not None:
+                value = le + ri if operator == "+" else le - ri if operator == "-" else le * ri
+                return L2.Immediate(value=value, span=term.span)
+            return L2.Primitive(operator=operator, left=new_left, right=new_right, span=term.span)
         case L2.Apply(target=target, arguments=arguments):
             return L2.Apply(
                 target=build_folding(term=target, context=context),
                 arguments=[build_folding(term=t, context=context) for t in arguments],
+                span=term.span,
             )
         case L2.Allocate(count=_):
             return term
         case L2.Immediate(value=_):
             return term
         case L2.Reference(name=name):
-            value = try_resolveable(term=term, context=context)
+            value = context.get(name)
             if value is not None:
-                return L2.Immediate(value=value)
+                return L2.Immediate(value=value, span=term.span)
             return term
         case L2.Load(base=base, index=index):
-            return L2.Load(base=build_folding(term=base, context=context), index=index)
+            return L2.Load(base=build_folding(term=base, context=context), index=index, span=term.span)
         case L2.Store(base=base, index=index, value=value):
             return L2.Store(
                 base=build_folding(term=base, context=context),
                 index=index,
                 value=build_folding(term=value, context=context),
+                span=term.span,
             )
         case L2.Begin(effects=effects, value=value):  # pragma: no branch
             return L2.Begin(
                 effects=[build_folding(term=t, context=context) for t in effects],
                 value=build_folding(term=value, context=context),
+                span=term.span,
             )
 
 
-def collect_uses(term: L2.Term) -> set[L2.Identifier]:
+def count_uses(term: L2.Term, uses: Counter[L2.Identifier], step: int = 1) -> None:
+    # Adds `step` to the count of every name `term` refers to.
     match term:
         case L2.Let(bindings=bindings, body=body):
-            uses = collect_uses(term=body)
-            for name, t in bindings:
-                uses = uses | collect_uses(term=t)
-            return uses
+            for _, t in bindings:
+                count_uses(term=t, uses=uses, step=step)
+            count_uses(term=body, uses=uses, step=step)
 
         case L2.Reference(name=name):
-            return {name}
+            uses[name] += step
 
-        case L2.Abstract(parameters=parameters, body=body):
-            return collect_uses(term=body) - set(parameters)
+        case L2.Abstract(parameters=_, body=body):
+            count_uses(term=body, uses=uses, step=step)
 
         case L2.Apply(target=target, arguments=arguments):
-            uses = collect_uses(term=target)
+            count_uses(term=target, uses=uses, step=step)
             for te in arguments:
-                uses = uses | collect_uses(term=te)
-            return uses
+                count_uses(term=te, uses=uses, step=step)
 
-        case L2.Immediate(value=_):
-            return set()
+        case L2.Immediate(value=_) | L2.Allocate(count=_):
+            pass
 
         case L2.Primitive(operator=_, left=left, right=right):
-            return collect_uses(term=left) | collect_uses(term=right)
+            count_uses(term=left, uses=uses, step=step)
+            count_uses(term=right, uses=uses, step=step)
 
         case L2.Branch(operator=_, left=left, right=right, consequent=consequent, otherwise=otherwise):
-            return (
-                collect_uses(term=left)
-                | collect_uses(term=right)
-                | collect_uses(term=consequent)
-                | collect_uses(term=otherwise)
-            )
-
-        case L2.Allocate(count=_):
-            return set()
+            for t in (left, right, consequent, otherwise):
+                count_uses(term=t, uses=uses, step=step)
 
         case L2.Load(base=base, index=_):
-            return collect_uses(term=base)
+            count_uses(term=base, uses=uses, step=step)
 
         case L2.Store(base=base, index=_, value=value):
-            return collect_uses(term=base) | collect_uses(term=value)
+            count_uses(term=base, uses=uses, step=step)
+            count_uses(term=value, uses=uses, step=step)
 
         case L2.Begin(effects=effects, value=value):  # pragma: no branch
-            uses = collect_uses(term=value)
             for t in effects:
-                uses = uses | collect_uses(term=t)
-            return uses
+                count_uses(term=t, uses=uses, step=step)
+            count_uses(term=value, uses=uses, step=step)
 
 
-def dead_code_elimination(term: L2.Term) -> L2.Term:
+def dead_code_elimination(term: L2.Term, uses: Counter[L2.Identifier]) -> L2.Term:
+    # `uses` counts the references to every name in the whole program, so a binding is dead when its name has none
+    # left. Binders are unique after uniqify; a name bound twice is only dropped once neither binding is referenced.
+    # A body is eliminated before the bindings around it, and a dropped binding takes its references with it, so
+    # bindings only used by dead code die too. Every node is visited at most twice, once here and once if dropped.
     match term:
         case L2.Let(bindings=bindings, body=body):
-            new_body = dead_code_elimination(term=body)
-            new_bindings: Sequence[tuple[L2.Identifier, L2.Term]] = []
-            uses = collect_uses(term=body)
-            for name, te in bindings:
-                if name in uses:
-                    new_bindings.append((name, dead_code_elimination(term=te)))
-            return L2.Let(bindings=new_bindings, body=new_body)
+            new_body = dead_code_elimination(term=body, uses=uses)
+            new_bindings: list[tuple[L2.Identifier, L2.Term]] = []
+            for name, te in reversed(bindings):
+                if uses[name] > 0:
+                    new_bindings.append((name, dead_code_elimination(term=te, uses=uses)))
+                else:
+                    count_uses(term=te, uses=uses, step=-1)
+            return L2.Let(bindings=new_bindings[::-1], body=new_body, span=term.span)
 
         case L2.Reference(name=name):
             return term
 
         case L2.Abstract(parameters=parameters, body=body):
-            return L2.Abstract(parameters=parameters, body=dead_code_elimination(term=body))
+            return L2.Abstract(parameters=parameters, body=dead_code_elimination(term=body, uses=uses), span=term.span)
 
         case L2.Apply(target=target, arguments=arguments):
-            new_target = dead_code_elimination(term=target)
+            new_target = dead_code_elimination(term=target, uses=uses)
             new_arguments: Sequence[L2.Term] = []
             for t in arguments:
-                new_arguments.append(dead_code_elimination(term=t))
+                new_arguments.append(dead_code_elimination(term=t, uses=uses))
             return L2.Apply(
                 target=new_target,
                 arguments=new_arguments,
+                span=term.span,
             )
 
         case L2.Immediate(value=_):
@@ -170,34 +176,37 @@ def dead_code_elimination(term: L2.Term) -> L2.Term:
         case L2.Primitive(operator=operator, left=left, right=right):
             return L2.Primitive(
                 operator=operator,
-                left=dead_code_elimination(term=left),
-                right=dead_code_elimination(term=right),
+                left=dead_code_elimination(term=left, uses=uses),
+                right=dead_code_elimination(term=right, uses=uses),
+                span=term.span,
             )
 
         case L2.Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
             return L2.Branch(
                 operator=operator,
-                left=dead_code_elimination(term=left),
-                right=dead_code_elimination(term=right),
-                consequent=dead_code_elimination(term=consequent),
-                otherwise=dead_code_elimination(term=otherwise),
+                left=dead_code_elimination(term=left, uses=uses),
+                right=dead_code_elimination(term=right, uses=uses),
+                consequent=dead_code_elimination(term=consequent, uses=uses),
+                otherwise=dead_code_elimination(term=otherwise, uses=uses),
+                span=term.span,
             )
 
         case L2.Allocate(count=_):
             return term
 
         case L2.Load(base=base, index=index):
-            return L2.Load(base=dead_code_elimination(term=base), index=index)
+            return L2.Load(base=dead_code_elimination(term=base, uses=uses), index=index, span=term.span)
 
         case L2.Store(base=base, index=_index, value=value):
             return L2.Store(
-                base=dead_code_elimination(term=base),
+                base=dead_code_elimination(term=base, uses=uses),
                 index=_index,
-                value=dead_code_elimination(term=value),
+                value=dead_code_elimination(term=value, uses=uses),
+                span=term.span,
             )
 
         case L2.Begin(effects=effects, value=value):  # pragma: no branch
-            return L2.Begin(effects=effects, value=dead_code_elimination(term=value))
+            return L2.Begin(effects=effects, value=dead_code_elimination(term=value, uses=uses), span=term.span)
 
 
 def optimize_program(
@@ -209,5 +218,7 @@ def optimize_program(
             folded_body = body
             for _ in range(5):
                 folded_body = build_folding(term=folded_body, context=context)
-            optimized_body = dead_code_elimination(term=folded_body)
+            uses: Counter[L2.Identifier] = Counter()
+            count_uses(term=folded_body, uses=uses)
+            optimized_body = dead_code_elimination(term=folded_body, uses=uses)
             return L2.Program(parameters=parameters, body=optimized_body)
@@ -2,11 +2,15 @@ from collections.abc import Sequence
 from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
+from util.source_map import Span
 
 type Identifier = Annotated[str, Field(min_length=1)]
 
 type Nat = Annotated[int, Field(ge=0)]
 
+# Where a node came from in the L3 source, when it was parsed with positions; not serialized or shown.
+Location = Annotated[Span | None, Field(exclude=True, repr=False)]
+
 
 class Program(BaseModel, frozen=True):
     tag: Literal["l2"] = "l2"
@@ -24,28 +28,33 @@ class Let(BaseModel, frozen=True):
     tag: Literal["let"] = "let"
     bindings: Sequence[tuple[Identifier, Term]]
     body: Term
+    span: Location = None
 
 
 class Reference(BaseModel, frozen=True):
     tag: Literal["reference"] = "reference"
     name: Identifier
+    span: Location = None
 
 
 class Abstract(BaseModel, frozen=True):
     tag: Literal["abstract"] = "abstract"
     parameters: Sequence[Identifier]
     body: Term
+    span: Location = None
 
 
 class Apply(BaseModel, frozen=True):
     tag: Literal["apply"] = "apply"
     target: Term
     arguments: Sequence[Term]
+    span: Location = None
 
 
 class Immediate(BaseModel, frozen=True):
     tag: Literal["immediate"] = "immediate"
     value: int
+    span: Location = None
 
 
 class Primitive(BaseModel, frozen=True):
@@ -53,6 +62,7 @@ class Primitive(BaseModel, frozen=True):
     operator: Literal["+", "-", "*"]
     left: Term
     right: Term
+    span: Location = None
 
 
 class Branch(BaseModel, frozen=True):
@@ -62,17 +72,21 @@ class Branch(BaseModel, frozen=True):
     right: Term
     consequent: Term
     otherwise: Term
+    span: Location = None
 
 
 class Allocate(BaseModel, frozen=True):
     tag: Literal["allocate"] = "allocate"
     count: Nat
+    fill: int | None = None
+    span: Location = None
 
 
 class Load(BaseModel, frozen=True):
     tag: Literal["load"] = "load"
     base: Term
     index: Nat
+    span: Location = None
 
 
 class Store(BaseModel, frozen=True):
@@ -80,9 +94,11 @@ class Store(BaseModel, frozen=True):
     base: Term
     index: Nat
     value: Term
+    span: Location = None
 
 
 class Begin(BaseModel, frozen=True):
     tag: Literal["begin"] = "begin"
     effects: Sequence[Term]
     value: Term
+    span: Location = None
@@ -2,6 +2,7 @@ import ast
 from functools import partial
 
 from util.encode import encode
+from util.runtime import allocation, record_classes, slot_assignment, slot_load
 
 from .syntax import (
     Abstract,
@@ -47,7 +48,7 @@ def to_ast_term(
 
         case Abstract(parameters=parameters, body=body):
             return ast.Lambda(
-                args=ast.arguments(args=[ast.arg(arg=parameter) for parameter in parameters]),
+                args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
                 body=_term(body),
             )
 
@@ -87,26 +88,17 @@ def to_ast_term(
                 orelse=_term(otherwise),
             )
 
-        case Allocate(count=count):
-            return ast.List(
-                elts=[ast.Constant(None) for _ in range(count)],
-                ctx=ast.Load(),
-            )
+        case Allocate(count=count, fill=fill):
+            return allocation(count, fill)
 
         case Load(base=base, index=index):
-            return ast.Call(
-                func=ast.Attribute(value=_term(base), attr="__getitem__", ctx=ast.Load()),
-                args=[ast.Constant(value=index)],
-            )
+            return slot_load(_term(base), index)
 
         case Store(base=base, index=index, value=value):
             return ast.Subscript(
                 value=ast.Tuple(
                     elts=[
-                        ast.Call(
-                            func=ast.Attribute(value=_term(base), attr="__setitem__", ctx=ast.Load()),
-                            args=[ast.Constant(value=index), _term(value)],
-                        ),
+                        slot_assignment(_term(base), index, _term(value)),
                         ast.Constant(value=0),
                     ],
                     ctx=ast.Load(),
@@ -138,7 +130,7 @@ def to_ast_program(
                 body=[
                     ast.FunctionDef(
                         name="l2",
-                        args=ast.arguments(args=[ast.arg(arg=parameter) for parameter in parameters]),
+                        args=ast.arguments(args=[ast.arg(arg=encode(parameter)) for parameter in parameters]),
                         body=[
                             ast.Return(value=to_ast_term(body)),
                         ],
@@ -182,6 +174,7 @@ def to_ast_program(
                 ]
             )
 
+            module.body[0:0] = record_classes(module)
             ast.fix_missing_locations(module)
 
             return ast.unparse(module)
@@ -1,6 +1,6 @@
 from L1 import syntax as L1
 from L2 import syntax as L2
-from L2.cps_convert import cps_convert_program, cps_convert_term
+from L2.cps_convert import cps_convert_program, cps_convert_term, cps_convert_terms
 from util.sequential_name_generator import SequentialNameGenerator
 
 
@@ -80,6 +80,17 @@ def test_cps_convert_term_let():
     assert actual == expected
 
 
+def test_cps_convert_term_let_empty():
+    term = L2.Let(bindings=[], body=L2.Reference(name="x"))
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    expected = L1.Halt(value="x")
+
+    assert actual == expected
+
+
 def test_cps_convert_term_abstract():
     term = L2.Abstract(
         parameters=["x"],
@@ -230,6 +241,16 @@ def test_cps_convert_term_begin():
     assert actual == expected
 
 
+def test_cps_convert_term_begin_empty():
+    term = L2.Begin(effects=[], value=L2.Reference(name="y"))
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    expected = L1.Halt(value="y")
+    assert actual == expected
+
+
 def test_cps_convert_program():
     program = L2.Program(
         parameters=["x"],
@@ -245,3 +266,160 @@ def test_cps_convert_program():
     )
 
     assert actual == expected
+
+
+def chain_length(statement: L1.Statement) -> int:
+    length = 1
+    while not isinstance(statement, (L1.Halt, L1.Apply)):
+        statement = statement.then
+        length += 1
+    return length
+
+
+def test_cps_convert_term_deep():
+    term: L2.Term = L2.Reference(name="x")
+    for _ in range(5000):
+        term = L2.Primitive(operator="+", left=L2.Immediate(value=1), right=term)
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    assert chain_length(actual) == 10001
+
+
+def test_cps_convert_term_long_begin():
+    term = L2.Begin(
+        effects=[L2.Store(base=L2.Reference(name="x"), index=0, value=L2.Immediate(value=i)) for i in range(10000)],
+        value=L2.Reference(name="x"),
+    )
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    assert chain_length(actual) == 30001
+
+
+def test_cps_convert_term_long_let():
+    term = L2.Let(
+        bindings=[(f"x{i}", L2.Immediate(value=i)) for i in range(10000)],
+        body=L2.Reference(name="x9999"),
+    )
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    assert chain_length(actual) == 20001
+
+
+def test_cps_convert_terms_long():
+    terms = [L2.Immediate(value=i) for i in range(10000)]
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_terms(terms, lambda names: L1.Apply(target="f", arguments=names), fresh)
+
+    assert chain_length(actual) == 10001
+
+
+def test_cps_convert_terms():
+    terms = [L2.Reference(name="x"), L2.Immediate(value=1)]
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_terms(terms, lambda names: L1.Apply(target="f", arguments=names), fresh)
+
+    expected = L1.Immediate(
+        destination="t0",
+        value=1,
+        then=L1.Apply(target="f", arguments=["x", "t0"]),
+    )
+
+    assert actual == expected
+
+
+def test_cps_convert_term_tail_apply():
+    term = L2.Abstract(
+        parameters=["x"],
+        body=L2.Apply(target=L2.Reference(name="f"), arguments=[L2.Reference(name="x")]),
+    )
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    expected = L1.Abstract(
+        destination="t0",
+        parameters=["x", "k0"],
+        body=L1.Apply(target="f", arguments=["x", "k0"]),
+        then=L1.Halt(value="t0"),
+    )
+
+    assert actual == expected
+
+
+def test_cps_convert_term_tail_branch():
+    term = L2.Abstract(
+        parameters=["x"],
+        body=L2.Branch(
+            operator="<",
+            left=L2.Reference(name="x"),
+            right=L2.Immediate(value=2),
+            consequent=L2.Reference(name="x"),
+            otherwise=L2.Apply(target=L2.Reference(name="f"), arguments=[L2.Reference(name="x")]),
+        ),
+    )
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    expected = L1.Abstract(
+        destination="t0",
+        parameters=["x", "k0"],
+        body=L1.Immediate(
+            destination="t1",
+            value=2,
+            then=L1.Branch(
+                operator="<",
+                left="x",
+                right="t1",
+                then=L1.Apply(target="k0", arguments=["x"]),
+                otherwise=L1.Apply(target="f", arguments=["x", "k0"]),
+            ),
+        ),
+        then=L1.Halt(value="t0"),
+    )
+
+    assert actual == expected
+
+
+def test_cps_convert_term_join_is_dynamic():
+    term = L2.Primitive(
+        operator="+",
+        left=L2.Immediate(value=1),
+        right=L2.Branch(
+            operator="==",
+            left=L2.Reference(name="x"),
+            right=L2.Reference(name="y"),
+            consequent=L2.Apply(target=L2.Reference(name="f"), arguments=[]),
+            otherwise=L2.Reference(name="y"),
+        ),
+    )
+
+    fresh = SequentialNameGenerator()
+    actual = cps_convert_term(term, k, fresh)
+
+    expected = L1.Immediate(
+        destination="t1",
+        value=1,
+        then=L1.Abstract(
+            destination="j0",
+            parameters=["t2"],
+            body=L1.Primitive(destination="t0", operator="+", left="t1", right="t2", then=L1.Halt(value="t0")),
+            then=L1.Branch(
+                operator="==",
+                left="x",
+                right="y",
+                then=L1.Apply(target="f", arguments=["j0"]),
+                otherwise=L1.Apply(target="j0", arguments=["y"]),
+            ),
+        ),
+    )
+
+    assert actual == expected
@@ -359,3 +359,34 @@ def test_optimize():
     actual = optimize_program(program)
 
     assert actual == expected
+
+
+def test_optimize_dead_chain_and_shadowing():
+    # let a = n in let b = a in 7: b is dead, and a is only used by b, so both go.
+    program = L2.Program(
+        parameters=["n"],
+        body=L2.Let(
+            bindings=[("a", L2.Reference(name="n"))],
+            body=L2.Let(bindings=[("b", L2.Reference(name="a"))], body=L2.Immediate(value=7)),
+        ),
+    )
+
+    assert optimize_program(program) == L2.Program(
+        parameters=["n"],
+        body=L2.Let(bindings=[], body=L2.Let(bindings=[], body=L2.Immediate(value=7))),
+    )
+
+    # let x = 1 in (let x = n in x) + x: the inner x is unknown, and the outer one is 1 again after it.
+    program = L2.Program(
+        parameters=["n"],
+        body=L2.Let(
+            bindings=[("x", L2.Immediate(value=1))],
+            body=L2.Primitive(
+                operator="+",
+                left=L2.Let(bindings=[("x", L2.Reference(name="n"))], body=L2.Reference(name="x")),
+                right=L2.Reference(name="x"),
+            ),
+        ),
+    )
+
+    assert optimize_program(program).body.body.right == L2.Immediate(value=1)  # type: ignore[attr-defined]
@@ -1,6 +1,7 @@
 from collections import Counter
-from collections.abc import Mapping
-from functools import partial
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
 
 from .syntax import (
     Abstract,
@@ -23,83 +24,100 @@ from .syntax import (
 type Context = Mapping[Identifier, None]
 
 
-def check_term(
-    term: Term,
-    context: Context,
-) -> None:
-    recur = partial(check_term, context=context)
+def _duplicates(names: Iterable[Identifier]) -> dict[Identifier, int]:
+    return {name: count for name, count in Counter(names).items() if count > 1}
 
-    match term:
-        case Let(bindings=bindings, body=body):
-            counts = Counter(name for name, _ in bindings)
-            duplicates = {name: count for name, count in counts.items() if count > 1}
-            if duplicates:
-                raise ValueError(f"duplicate binders: {duplicates}")
 
-            for _, value in bindings:
-                recur(value)
+@dataclass
+class _Checker:
+    # The binders in scope, counted, so a binder that shadows another can go out of scope without unbinding the
+    # name. The one scope is extended on the way into a binding construct and restored on the way out, rather than
+    # copied, so checking a deep chain of lets is linear.
+    scope: Counter[Identifier]
 
-            local = dict.fromkeys([name for name, _ in bindings])
-            recur(body, context={**context, **local})
+    @contextmanager
+    def bind(self, names: Iterable[Identifier]) -> Iterator[None]:
+        names = list(names)
+        self.scope.update(names)
+        try:
+            yield
+        finally:
+            self.scope.subtract(names)
 
-        case LetRec(bindings=bindings, body=body):
-            counts = Counter(name for name, _ in bindings)
-            duplicates = {name: count for name, count in counts.items() if count > 1}
-            if duplicates:
-                raise ValueError(f"duplicate binders: {duplicates}")
+    def check(self, term: Term) -> None:
+        match term:
+            case Let(bindings=bindings, body=body):
+                duplicates = _duplicates(name for name, _ in bindings)
+                if duplicates:
+                    raise ValueError(f"duplicate binders: {duplicates}")
 
-            local = dict.fromkeys([name for name, _ in bindings])
+                for _, value in bindings:
+                    self.check(value)
 
-            for name, value in bindings:
-                recur(value, context={**context, **local})
+                with self.bind(name for name, _ in bindings):
+                    self.check(body)
 
-            check_term(body, {**context, **local})
+            case LetRec(bindings=bindings, body=body):
+                duplicates = _duplicates(name for name, _ in bindings)
+                if duplicates:
+                    raise ValueError(f"duplicate binders: {duplicates}")
 
-        case Reference(name=name):
-            if name not in context:
-                raise ValueError(f"unknown variable: {name}")
+                with self.bind(name for name, _ in bindings):
+                    for _, value in bindings:
+                        self.check(value)
+                    self.check(body)
 
-        case Abstract(parameters=parameters, body=body):
-            counts = Counter(parameters)
-            duplicates = {name for name, count in counts.items() if count > 1}
-            if duplicates:
-                raise ValueError(f"duplicate parameters: {duplicates}")
+            case Reference(name=name):
+                if self.scope[name] <= 0:
+                    raise ValueError(f"unknown variable: {name}")
 
-            local = dict.fromkeys(parameters, None)
-            recur(body, context={**context, **local})
+            case Abstract(parameters=parameters, body=body):
+                duplicates = set(_duplicates(parameters))
+                if duplicates:
+                    raise ValueError(f"duplicate parameters: {duplicates}")
+
+                with self.bind(parameters):
+                    self.check(body)
+
+            case Apply(target=target, arguments=arguments):
+                self.check(target)
+                for argument in arguments:
+                    self.check(argument)
+
+            case Immediate(value=_value):
+                pass
 
-        case Apply(target=target, arguments=arguments):
-            recur(target)
-            for argument in arguments:
-                recur(argument)
+            case Primitive(operator=_operator, left=left, right=right):
+                self.check(left)
+                self.check(right)
 
-        case Immediate(value=_value):
-            pass
+            case Branch(operator=_operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
+                self.check(left)
+                self.check(right)
+                self.check(consequent)
+                self.check(otherwise)
 
-        case Primitive(operator=_operator, left=left, right=right):
-            recur(left)
-            recur(right)
+            case Allocate(count=_count):
+                pass
 
-        case Branch(operator=_operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
-            recur(left)
-            recur(right)
-            recur(consequent)
-            recur(otherwise)
+            case Load(base=base, index=_index):
+                self.check(base)
 
-        case Allocate(count=_count):
-            pass
+            case Store(base=base, index=_index, value=value):
+                self.check(base)
+                self.check(value)
 
-        case Load(base=base, index=_index):
-            recur(base)
+            case Begin(effects=effects, value=value):  # pragma: no branch
+                for effect in effects:
+                    self.check(effect)
+                self.check(value)
 
-        case Store(base=base, index=_index, value=value):
-            recur(base)
-            recur(value)
 
-        case Begin(effects=effects, value=value):  # pragma: no branch
-            for effect in effects:
-                recur(effect)
-            recur(value)
+def check_term(
+    term: Term,
+    context: Context,
+) -> None:
+    _Checker(scope=Counter(context.keys())).check(term)
 
 
 def check_program(
@@ -0,0 +1,213 @@
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from .syntax import (
+    Abstract,
+    Allocate,
+    Apply,
+    Begin,
+    Branch,
+    Identifier,
+    Immediate,
+    Let,
+    LetRec,
+    Load,
+    Primitive,
+    Program,
+    Reference,
+    Store,
+    Term,
+)
+
+# A closure-compiling evaluator: each term is compiled once into a Python closure that takes the frame of the
+# running function and returns the term's value, so running a program never looks at its syntax again.
+#
+# Every function activation has one frame, a list holding the frame of the function it was created in, then its
+# parameters, then one slot for each variable bound by a Let or LetRec in its body (outside nested functions). A
+# variable resolves at compile time to how many frames out it lives and its slot there. LetRec binds its slots
+# before evaluating the bindings, so functions see each other through the shared frame. Heap objects are lists.
+#
+# A call in tail position does not call: it returns a _TailCall, and whoever called the function running it enters
+# the callee in a loop until a value comes back. A loop written as tail recursion therefore runs in constant Python
+# stack. Other calls are Python calls, so only their nesting is bounded by the Python stack.
+
+type Code = Callable[[list[Any]], Any]
+
+# Compile-time context: the function nesting level and slot of every variable in scope.
+type Context = Mapping[Identifier, tuple[int, int]]
+
+
+@dataclass
+class _Function:
+    level: int
+    size: int
+
+    def slot(self) -> int:
+        self.size += 1
+        return self.size - 1
+
+
+class _Closure:
+    __slots__ = ("code", "frame", "count", "padding")
+
+    def __init__(self, code: Code, frame: list[Any], count: int, padding: list[None]) -> None:
+        self.code = code
+        self.frame = frame
+        self.count = count
+        self.padding = padding
+
+    def enter(self, arguments: list[Any]) -> Any:
+        # Runs the body on a fresh frame; the result may be a tail call still to make.
+        if len(arguments) != self.count:
+            raise TypeError(f"function takes {self.count} arguments but {len(arguments)} were given")
+        return self.code([self.frame, *arguments, *self.padding])
+
+    def __call__(self, *arguments: Any) -> Any:
+        result = self.enter([*arguments])
+        while type(result) is _TailCall:
+            result = result.closure.enter(result.arguments)
+        return result
+
+
+class _TailCall:
+    __slots__ = ("closure", "arguments")
+
+    def __init__(self, closure: _Closure, arguments: list[Any]) -> None:
+        self.closure = closure
+        self.arguments = arguments
+
+
+def _reference(depth: int, slot: int) -> Code:
+    match depth:
+        case 0:
+            return lambda frame: frame[slot]
+
+        case 1:
+            return lambda frame: frame[0][slot]
+
+        case _:
+
+            def reference(frame: list[Any]) -> Any:
+                for _ in range(depth):
+                    frame = frame[0]
+                return frame[slot]
+
+            return reference
+
+
+def _bind(slots: list[int], values: list[Code], body: Code) -> Code:
+    def bind(frame: list[Any]) -> Any:
+        for slot, value in zip(slots, values, strict=True):
+            frame[slot] = value(frame)
+        return body(frame)
+
+    return bind
+
+
+def compile_term(term: Term, context: Context, function: _Function, tail: bool = False) -> Code:
+    # `tail` says whether the term's value is the value of the function it is in.
+    def _term(term: Term, context: Context = context, tail: bool = False) -> Code:
+        return compile_term(term, context, function, tail)
+
+    match term:
+        case Let(bindings=bindings, body=body):
+            values = [_term(value) for _, value in bindings]
+            slots = [function.slot() for _ in bindings]
+            inner = {
+                **context,
+                **{name: (function.level, slot) for (name, _), slot in zip(bindings, slots, strict=True)},
+            }
+            return _bind(slots, values, _term(body, inner, tail))
+
+        case LetRec(bindings=bindings, body=body):
+            slots = [function.slot() for _ in bindings]
+            inner = {
+                **context,
+                **{name: (function.level, slot) for (name, _), slot in zip(bindings, slots, strict=True)},
+            }
+            return _bind(slots, [_term(value, inner) for _, value in bindings], _term(body, inner, tail))
+
+        case Reference(name=name):
+            if name not in context:
+                raise ValueError(f"unknown variable: {name}")
+            level, slot = context[name]
+            return _reference(function.level - level, slot)
+
+        case Abstract(parameters=parameters, body=body):
+            inner_function = _Function(level=function.level + 1, size=1 + len(parameters))
+            inner = {**context, **{name: (inner_function.level, i + 1) for i, name in enumerate(parameters)}}
+            code = compile_term(body, inner, inner_function, tail=True)
+            count = len(parameters)
+            padding = [None] * (inner_function.size - 1 - count)
+            return lambda frame: _Closure(code, frame, count, padding)
+
+        case Apply(target=target, arguments=arguments):
+            callee = _term(target)
+            values = [_term(argument) for argument in arguments]
+            if tail:
+                return lambda frame: _TailCall(callee(frame), [value(frame) for value in values])
+            return lambda frame: callee(frame)(*[value(frame) for value in values])
+
+        case Immediate(value=value):
+            return lambda frame: value
+
+        case Primitive(operator=operator, left=left, right=right):
+            first, second = _term(left), _term(right)
+            match operator:
+                case "+":
+                    return lambda frame: first(frame) + second(frame)
+
+                case "-":
+                    return lambda frame: first(frame) - second(frame)
+
+                case "*":  # pragma: no branch
+                    return lambda frame: first(frame) * second(frame)
+
+        case Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
+            first, second = _term(left), _term(right)
+            then, other = _term(consequent, tail=tail), _term(otherwise, tail=tail)
+            match operator:
+                case "<":
+                    return lambda frame: then(frame) if first(frame) < second(frame) else other(frame)
+
+                case "==":  # pragma: no branch
+                    return lambda frame: then(frame) if first(frame) == second(frame) else other(frame)
+
+        case Allocate(count=count, fill=fill):
+            return lambda frame: [fill] * count
+
+        case Load(base=base, index=index):
+            record = _term(base)
+            return lambda frame: record(frame)[index]
+
+        case Store(base=base, index=index, value=value):
+            record, stored = _term(base), _term(value)
+
+            def store(frame: list[Any]) -> int:
+                record(frame)[index] = stored(frame)
+                return 0
+
+            return store
+
+        case Begin(effects=effects, value=value):  # pragma: no branch
+            codes = [_term(effect) for effect in effects]
+            result = _term(value, tail=tail)
+
+            def begin(frame: list[Any]) -> Any:
+                for code in codes:
+                    code(frame)
+                return result(frame)
+
+            return begin
+
+
+def compile_program(program: Program) -> Callable[..., int]:
+    match program:
+        case Program(parameters=parameters, body=body):  # pragma: no branch
+            entry = compile_term(
+                Abstract(parameters=parameters, body=body),
+                {},
+                _Function(level=-1, size=0),
+            )
+            return entry([])
@@ -0,0 +1,281 @@
+import random
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Literal
+
+from .syntax import (
+    Abstract,
+    Allocate,
+    Apply,
+    Begin,
+    Branch,
+    Identifier,
+    Immediate,
+    Let,
+    LetRec,
+    Load,
+    Primitive,
+    Program,
+    Reference,
+    Store,
+    Term,
+)
+
+# Seeded random programs for benchmarks and differential testing. A program is well scoped and every variable holds
+# what its uses expect: integers, records of integers or functions of integers. Every run terminates without
+# touching an unset slot: recursive functions take a fuel parameter that every call site passes as a small constant
+# and that counts down to zero, and a call is only generated while the number of calls one run can make stays under
+# `Shape.work`. Binders are unique, and a letrec function only refers to itself and the functions bound before it.
+
+# Largest fuel a call site passes to a recursive function.
+FUEL = 4
+
+
+@dataclass(frozen=True)
+class Shape:
+    # Approximate number of nodes, and how deep terms may nest.
+    size: int = 200
+    depth: int = 10
+    # Relative weights of letrec-bound function groups, let-bound closures and record operations among the choices
+    # the generator makes at every node; 0 turns the construct off.
+    letrec: float = 1.0
+    closures: float = 1.0
+    heap: float = 1.0
+    # Upper bound on the calls one run of the program makes.
+    work: int = 1000
+    parameters: int = 1
+
+
+@dataclass(frozen=True)
+class _Function:
+    arity: int
+    # Whether the first parameter is fuel.
+    fuel: bool
+    # Calls made by one call, itself included.
+    cost: int
+
+
+@dataclass(frozen=True)
+class _Record:
+    count: int
+
+
+type _Type = Literal["int"] | _Function | _Record
+type _Scope = Mapping[Identifier, _Type]
+
+
+class _Generator:
+    def __init__(self, shape: Shape, seed: int) -> None:
+        self.shape = shape
+        self.rng = random.Random(seed)
+        self.counter = 0
+        # Calls the function body being generated may still make.
+        self.work = shape.work
+
+    def fresh(self, prefix: str) -> Identifier:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def split(self, budget: int, parts: int) -> list[int]:
+        if budget <= parts:
+            return [1] * parts
+        cuts = sorted(self.rng.sample(range(1, budget), parts - 1))
+        return [end - start for start, end in zip([0, *cuts], [*cuts, budget], strict=True)]
+
+    def width(self, budget: int, depth: int) -> int:
+        # Enough children per node to spend the budget within the remaining depth.
+        return self.rng.randint(1, max(1, min(budget // 2, 2 * round(budget ** (1 / depth)))))
+
+    def leaf(self, scope: _Scope) -> Term:
+        if any(isinstance(type_, _Record) for type_ in scope.values()):
+            if self.rng.random() < self.shape.heap / (4 + self.shape.heap):
+                return self.load(1, 0, scope)
+        integers = [name for name, type_ in scope.items() if type_ == "int"]
+        if integers and self.rng.random() < 0.7:
+            return Reference(name=self.rng.choice(integers))
+        return Immediate(value=self.rng.randint(0, 9))
+
+    def term(self, budget: int, depth: int, scope: _Scope) -> Term:
+        # An integer-valued term of about `budget` nodes.
+        if budget <= 1 or depth <= 0:
+            return self.leaf(scope)
+
+        records = [name for name, type_ in scope.items() if isinstance(type_, _Record)]
+        functions = [name for name, type_ in scope.items() if isinstance(type_, _Function) and type_.cost <= self.work]
+        choices: list[tuple[float, Callable[[int, int, _Scope], Term]]] = [
+            (3.0, self.primitive),
+            (1.5, self.branch),
+            (2.0, self.let),
+            (self.shape.letrec, self.letrec),
+            (2.0 * bool(functions), self.apply),
+            (self.shape.heap * bool(records), self.load),
+            (1.0, self.begin),
+        ]
+        _, choice = self.rng.choices(choices, weights=[weight for weight, _ in choices])[0]
+        return choice(budget, depth, scope)
+
+    def primitive(self, budget: int, depth: int, scope: _Scope) -> Term:
+        operator = self.rng.choice(["+", "-", "*"])
+        if operator == "*":
+            # Keep products small so values stay machine-sized.
+            return Primitive(
+                operator="*",
+                left=self.term(budget - 2, depth - 1, scope),
+                right=Immediate(value=self.rng.randint(0, 3)),
+            )
+        left, right = self.split(budget - 1, 2)
+        return Primitive(
+            operator=operator, left=self.term(left, depth - 1, scope), right=self.term(right, depth - 1, scope)
+        )
+
+    def branch(self, budget: int, depth: int, scope: _Scope) -> Term:
+        left, right, consequent, otherwise = self.split(budget - 1, 4)
+        return Branch(
+            operator=self.rng.choice(["<", "=="]),
+            left=self.term(min(left, 3), depth - 1, scope),
+            right=self.term(min(right, 3), depth - 1, scope),
+            consequent=self.term(consequent + max(left - 3, 0), depth - 1, scope),
+            otherwise=self.term(otherwise + max(right - 3, 0), depth - 1, scope),
+        )
+
+    def value(self, budget: int, depth: int, scope: _Scope) -> tuple[Term, _Type]:
+        # A value to bind: an integer, a closure or an initialized record.
+        choices = [1.0, self.shape.closures, self.shape.heap]
+        match self.rng.choices(["int", "closure", "record"], weights=choices)[0]:
+            case "closure":
+                arity = self.rng.randint(1, 3)
+                return self.function(budget, depth, scope, arity, None)
+
+            case "record":
+                count = self.rng.randint(1, 4)
+                name = self.fresh("r")
+                values = self.split(max(budget - 2, count), count)
+                return (
+                    Let(
+                        bindings=[(name, Allocate(count=count))],
+                        body=Begin(
+                            effects=[
+                                Store(base=Reference(name=name), index=i, value=self.term(size, depth - 1, scope))
+                                for i, size in enumerate(values)
+                            ],
+                            value=Reference(name=name),
+                        ),
+                    ),
+                    _Record(count=count),
+                )
+
+            case _:
+                return self.term(budget, depth, scope), "int"
+
+    def function(
+        self, budget: int, depth: int, scope: _Scope, arity: int, name: Identifier | None
+    ) -> tuple[Term, _Function]:
+        # A function of integers; given a name, it is recursive on its first parameter, which it may only be called
+        # with through the countdown generated here.
+        parameters = [self.fresh("n" if name is not None and i == 0 else "a") for i in range(arity)]
+        inner = {**scope, **dict.fromkeys(parameters, "int")}
+
+        # A body runs once per call, or once per unit of fuel.
+        outer = self.work
+        limit = self.work = self.shape.work // (4 * (FUEL + 1) if name is not None else 4)
+        if name is None:
+            body = self.term(budget - 1, depth - 1, inner)
+        else:
+            result = self.fresh("v")
+            base, rest, *arguments = self.split(max(budget - 6, arity + 1), arity + 1)
+            body = Branch(
+                operator="<",
+                left=Reference(name=parameters[0]),
+                right=Immediate(value=1),
+                consequent=self.term(base, depth - 1, inner),
+                otherwise=Let(
+                    bindings=[
+                        (
+                            result,
+                            Apply(
+                                target=Reference(name=name),
+                                arguments=[
+                                    Primitive(
+                                        operator="-", left=Reference(name=parameters[0]), right=Immediate(value=1)
+                                    ),
+                                    *[self.term(size, depth - 2, inner) for size in arguments],
+                                ],
+                            ),
+                        )
+                    ],
+                    body=self.term(rest, depth - 2, {**inner, result: "int"}),
+                ),
+            )
+        spent, self.work = limit - self.work, outer
+
+        cost = (FUEL + 1) * (spent + 1) if name is not None else spent + 1
+        return Abstract(parameters=parameters, body=body), _Function(arity=arity, fuel=name is not None, cost=cost)
+
+    def let(self, budget: int, depth: int, scope: _Scope) -> Term:
+        count = self.width(budget, depth)
+        *values, body = self.split(budget - 1, count + 1)
+        bindings: list[tuple[Identifier, Term]] = []
+        local: dict[Identifier, _Type] = {}
+        for size in values:
+            value, type_ = self.value(size, depth - 1, scope)
+            name = self.fresh("f" if isinstance(type_, _Function) else "x")
+            bindings.append((name, value))
+            local[name] = type_
+        return Let(bindings=bindings, body=self.term(body, depth - 1, {**scope, **local}))
+
+    def letrec(self, budget: int, depth: int, scope: _Scope) -> Term:
+        count = self.width(budget, depth)
+        *values, body = self.split(budget - 1, count + 1)
+        bindings: list[tuple[Identifier, Term]] = []
+        local: dict[Identifier, _Type] = {}
+        for size in values:
+            name = self.fresh("f")
+            recursive = self.rng.random() < 0.5
+            arity = self.rng.randint(1, 3)
+            value, type_ = self.function(size, depth - 1, {**scope, **local}, arity, name if recursive else None)
+            bindings.append((name, value))
+            local[name] = type_
+        return LetRec(bindings=bindings, body=self.term(body, depth - 1, {**scope, **local}))
+
+    def apply(self, budget: int, depth: int, scope: _Scope) -> Term:
+        name, type_ = self.rng.choice(
+            [(name, type_) for name, type_ in scope.items() if isinstance(type_, _Function) and type_.cost <= self.work]
+        )
+        self.work -= type_.cost
+        sizes = self.split(budget - 1, type_.arity)
+        arguments = [self.term(size, depth - 1, scope) for size in sizes]
+        if type_.fuel:
+            arguments[0] = Immediate(value=self.rng.randint(0, FUEL))
+        return Apply(target=Reference(name=name), arguments=arguments)
+
+    def load(self, budget: int, depth: int, scope: _Scope) -> Term:
+        name, type_ = self.rng.choice([(name, type_) for name, type_ in scope.items() if isinstance(type_, _Record)])
+        return Load(base=Reference(name=name), index=self.rng.randrange(type_.count))
+
+    def begin(self, budget: int, depth: int, scope: _Scope) -> Term:
+        # Effects overwrite record slots or compute integers for nothing.
+        records = [(name, type_) for name, type_ in scope.items() if isinstance(type_, _Record)]
+        count = self.width(budget, depth)
+        *sizes, value = self.split(budget - 1, count + 1)
+        effects: list[Term] = []
+        for size in sizes:
+            if records and self.rng.random() < self.shape.heap / (1 + self.shape.heap):
+                name, type_ = self.rng.choice(records)
+                effects.append(
+                    Store(
+                        base=Reference(name=name),
+                        index=self.rng.randrange(type_.count),
+                        value=self.term(size - 1, depth - 1, scope),
+                    )
+                )
+            else:
+                effects.append(self.term(size, depth - 1, scope))
+        return Begin(effects=effects, value=self.term(value, depth - 1, scope))
+
+
+def generate_program(seed: int, shape: Shape = Shape()) -> Program:
+    generator = _Generator(shape, seed)
+    parameters = [generator.fresh("x") for _ in range(shape.parameters)]
+    return Program(
+        parameters=parameters, body=generator.term(shape.size, shape.depth, dict.fromkeys(parameters, "int"))
+    )
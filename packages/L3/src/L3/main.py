@@ -1,34 +1,38 @@
+from collections.abc import Sequence
 from pathlib import Path
 
 import click
-from L1.to_python import to_ast_program
-from L2.cps_convert import cps_convert_program
-from L2.optimize import optimize_program
+from util.instrument import report
 
 from .check import check_program
-from .eliminate_letrec import eliminate_letrec_program
+from .evaluate import compile_program
 from .parse import parse_program
-from .uniqify import uniqify_program
+from .pipeline import (
+    BACKENDS,
+    VM_BACKEND,
+    DefaultGroup,
+    build_pass_manager,
+    compile_to_callable,
+    pipeline_options,
+    run_passes,
+    select_passes,
+)
 
 
-@click.command(
+@click.group(
+    cls=DefaultGroup,
+    default="compile",
     context_settings=dict(
         help_option_names=["-h", "--help"],
         max_content_width=120,
     ),
 )
-@click.option(
-    "--check/--no-check",
-    default=True,
-    show_default=True,
-    help="Enable or disable semantic analysis",
-)
-@click.option(
-    "--optimize/--no-optimize",
-    default=True,
-    show_default=True,
-    help="Enable or disable optimization",
-)
+def main() -> None:
+    """Compile an L3 program to Python, or compile and run it in memory."""
+
+
+@main.command("compile")
+@pipeline_options(build_pass_manager)
 @click.option(
     "-o",
     "--output",
@@ -36,30 +40,107 @@ from .uniqify import uniqify_program
     default=None,
     help="Output file (defaults to <INPUT>.py)",
 )
+@click.option(
+    "--source-map",
+    is_flag=True,
+    default=False,
+    help="Also write <OUTPUT>.map, mapping each generated line to the INPUT line and column it came from",
+)
 @click.argument(
     "input",
     type=click.Path(exists=True, readable=True, dir_okay=False, path_type=Path),
 )
-def main(
+def compile_command(
     output: Path | None,
+    source_map: bool,
     check: bool,
-    optimize: bool,
+    level: int,
+    enable_pass: Sequence[str],
+    disable_pass: Sequence[str],
+    pass_order: str | None,
+    selective_cps: bool,
+    trampoline: bool,
+    instrument: bool,
+    backend: str,
     input: Path,
 ) -> None:
-    l3 = parse_program(input.read_text())
+    """Compile INPUT to a Python module (the default command)."""
+    manager = build_pass_manager(backend)
+    passes = select_passes(manager, check, level, enable_pass, disable_pass, pass_order)
+    options = {
+        "selective_cps": selective_cps,
+        "trampoline": trampoline,
+        "instrument": instrument,
+        "backend": backend,
+        "source": str(input),
+        "source_map": source_map,
+    }
+
+    l3 = parse_program(input.read_text(), positions=True)
 
-    if check:
-        check_program(l3)
+    sidecars: dict[str, str] = {}
+    module = run_passes(manager, l3, passes, options, sidecars)
 
-    fresh, l3 = uniqify_program(l3)
+    output = output or input.with_suffix(".py")
+    output.write_text(module)
+    for suffix, text in sidecars.items():
+        output.with_name(output.name + suffix).write_text(text)
 
-    l2 = eliminate_letrec_program(l3)
 
-    if optimize:
-        l2 = optimize_program(l2)
+# Negative ARGUMENTS would otherwise be taken for short options.
+@main.command("run", context_settings=dict(ignore_unknown_options=True))
+@pipeline_options(build_pass_manager, backends=(*BACKENDS, VM_BACKEND))
+@click.option(
+    "--evaluate",
+    is_flag=True,
+    default=False,
+    help="Run INPUT on the closure-compiling evaluator instead of the compiler pipeline",
+)
+@click.argument(
+    "input",
+    type=click.Path(exists=True, readable=True, dir_okay=False, path_type=Path),
+)
+@click.argument("arguments", nargs=-1, type=int)
+def run_command(
+    check: bool,
+    level: int,
+    enable_pass: Sequence[str],
+    disable_pass: Sequence[str],
+    pass_order: str | None,
+    selective_cps: bool,
+    trampoline: bool,
+    instrument: bool,
+    backend: str,
+    evaluate: bool,
+    input: Path,
+    arguments: Sequence[int],
+) -> None:
+    """Compile INPUT in memory and print its result for ARGUMENTS."""
+    manager = build_pass_manager(backend)
+    passes = select_passes(manager, check, level, enable_pass, disable_pass, pass_order)
+    options = {
+        "selective_cps": selective_cps,
+        "trampoline": trampoline,
+        "instrument": instrument,
+        "backend": backend,
+        "source": str(input),
+    }
 
-    l1 = cps_convert_program(l2, fresh)
+    l3 = parse_program(input.read_text(), positions=True)
+    if len(arguments) != len(l3.parameters):
+        raise click.UsageError(f"{input.name} takes {len(l3.parameters)} arguments but {len(arguments)} were given")
 
-    module = to_ast_program(l1)
+    if evaluate:
+        if instrument:
+            raise click.UsageError(
+                "--instrument counts events in generated code and cannot be combined with --evaluate"
+            )
+        if check:
+            check_program(l3)
+        entry = compile_program(l3)
+    else:
+        entry = compile_to_callable(l3, manager, passes, options)
 
-    (output or input.with_suffix(".py")).write_text(module)
+    click.echo(entry(*arguments))
+    if instrument:
+        report(entry)
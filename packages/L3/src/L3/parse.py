@@ -3,7 +3,9 @@ from pathlib import Path
 from typing import cast
 
 from lark import Lark, Token, Transformer, Tree
+from lark.tree import Meta
 from lark.visitors import v_args  # pyright: ignore[reportUnknownVariableType]
+from util.source_map import Span
 
 from .syntax import (
     Abstract,
@@ -26,6 +28,11 @@ from .syntax import (
 
 
 class AstTransformer(Transformer[Token, Program | Term]):
+    def __init__(self, positions: bool = False) -> None:
+        super().__init__()
+        # Record where each term starts; the parser must propagate positions.
+        self.positions = positions
+
     @v_args(inline=True)
     def program(
         self,
@@ -68,13 +75,16 @@ class AstTransformer(Transformer[Token, Program | Term]):
     ) -> Sequence[Identifier]:
         return parameters
 
-    @v_args(inline=True)
+    @v_args(inline=True, meta=True)
     def term(
         self,
+        meta: Meta,
         term: Term,
     ) -> Term:
         if isinstance(term, str):
-            return Reference(name=term)
+            term = Reference(name=term)
+        if self.positions:
+            return term.model_copy(update={"span": Span(meta.line, meta.column)})
         return term
 
     @v_args(inline=True)
@@ -120,8 +130,8 @@ class AstTransformer(Transformer[Token, Program | Term]):
         return Branch(operator=operator.value, left=left, right=right, consequent=consequent, otherwise=otherwise)
 
     @v_args(inline=True)
-    def allocate(self, _: Token, count: Nat) -> Term:
-        return Allocate(count=count)
+    def allocate(self, _: Token, count: Nat, fill: int | None = None) -> Term:
+        return Allocate(count=count, fill=fill)
 
     @v_args(inline=True)
     def load(self, _: Token, base: Term, index: Nat) -> Term:
@@ -152,15 +162,71 @@ class AstTransformer(Transformer[Token, Program | Term]):
         return name, value
 
 
-def parse_term(source: str) -> Term:
+def parse_term(source: str, positions: bool = False) -> Term:
     grammar = Path(__file__).with_name("L3.lark").read_text()
-    parser = Lark(grammar, start="term")
+    parser = Lark(grammar, start="term", propagate_positions=positions)
     tree = parser.parse(source)  # pyright: ignore[reportUnknownMemberType]
-    return AstTransformer().transform(tree)  # pyright: ignore[reportReturnType]
+    return AstTransformer(positions).transform(tree)  # pyright: ignore[reportReturnType]
 
 
-def parse_program(source: str) -> Program:
+def parse_program(source: str, positions: bool = False) -> Program:
+    # With positions, every term carries the line and column where it starts, for source maps.
     grammar = Path(__file__).with_name("L3.lark").read_text()
-    parser = Lark(grammar, start="program")
+    parser = Lark(grammar, start="program", propagate_positions=positions)
     tree = parser.parse(source)  # pyright: ignore[reportUnknownMemberType]
-    return AstTransformer().transform(tree)  # pyright: ignore[reportReturnType]
+    return AstTransformer(positions).transform(tree)  # pyright: ignore[reportReturnType]
+
+
+def unparse_term(term: Term) -> str:
+    # The concrete syntax parse_term reads back; immediates must be non-negative, as the grammar has no minus sign.
+    match term:
+        case Let(bindings=bindings, body=body):
+            return f"(let ({' '.join(f'({name} {unparse_term(value)})' for name, value in bindings)}) {unparse_term(body)})"
+
+        case LetRec(bindings=bindings, body=body):
+            return (
+                f"(letrec ({' '.join(f'({name} {unparse_term(value)})' for name, value in bindings)}) "
+                f"{unparse_term(body)})"
+            )
+
+        case Reference(name=name):
+            return name
+
+        case Abstract(parameters=parameters, body=body):
+            return f"(\\ ({' '.join(parameters)}) {unparse_term(body)})"
+
+        case Apply(target=target, arguments=arguments):
+            return f"({' '.join(unparse_term(child) for child in [target, *arguments])})"
+
+        case Immediate(value=value):
+            return str(value)
+
+        case Primitive(operator=operator, left=left, right=right):
+            return f"({operator} {unparse_term(left)} {unparse_term(right)})"
+
+        case Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
+            return (
+                f"(if ({operator} {unparse_term(left)} {unparse_term(right)}) "
+                f"{unparse_term(consequent)} {unparse_term(otherwise)})"
+            )
+
+        case Allocate(count=count, fill=None):
+            return f"(allocate {count})"
+
+        case Allocate(count=count, fill=fill):
+            return f"(allocate {count} {fill})"
+
+        case Load(base=base, index=index):
+            return f"(load {unparse_term(base)} {index})"
+
+        case Store(base=base, index=index, value=value):
+            return f"(store {unparse_term(base)} {index} {unparse_term(value)})"
+
+        case Begin(effects=effects, value=value):  # pragma: no branch
+            return f"(begin {' '.join(unparse_term(child) for child in [*effects, value])})"
+
+
+def unparse_program(program: Program) -> str:
+    match program:
+        case Program(parameters=parameters, body=body):  # pragma: no branch
+            return f"(l3 ({' '.join(parameters)}) {unparse_term(body)})"
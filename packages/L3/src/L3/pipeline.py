@@ -0,0 +1,368 @@
+import ast
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+import click
+from L0 import syntax as L0
+from L0 import vm
+from L0.coalesce import coalesce_program
+from L0.to_python import compile_to_callable as compile_l0
+from L0.to_python import to_ast_module as to_flat_module
+from L1 import syntax as L1
+from L1.close import close_program
+from L1.direct import analyze_program, report
+from L1.optimize import optimize_program as contract_program
+from L1.to_python import compile_to_callable as compile_l1
+from L1.to_python import to_ast_module
+from L2.cps_convert import cps_convert_program
+from L2.optimize import optimize_program
+from util.pass_manager import Pass, PassManager, Session
+from util.source_map import source_map
+
+from . import syntax as L3
+from .check import check_program
+from .eliminate_letrec import eliminate_letrec_program
+from .uniqify import uniqify_program
+
+DEFAULT_LEVEL = 1
+
+# Code generators: nested Python functions straight from L1, or closure conversion to flat L0 procedures.
+BACKENDS = ("l1-nested", "l0-flat")
+DEFAULT_BACKEND = "l1-nested"
+# Runs the l0-flat pipeline's L0 output on the register machine instead of generating Python. It only runs programs
+# in memory, so only `l3 run` offers it.
+VM_BACKEND = "l0-vm"
+
+
+def _check(program: L3.Program, session: Session) -> L3.Program:
+    check_program(program)
+    return program
+
+
+def _uniqify(program: L3.Program, session: Session) -> L3.Program:
+    session.fresh, program = uniqify_program(program)
+    return program
+
+
+def _unparse(module: ast.Module, session: Session) -> str:
+    source = ast.unparse(module)
+    if session.options.get("source_map", False):
+        session.sidecars[".map"] = source_map(module, source, session.options.get("source"))
+    return source
+
+
+def _to_python(program: L1.Program, session: Session) -> Any:
+    arguments: dict[str, Any] = {"instrument": session.options.get("instrument", False)}
+    if session.options.get("trampoline", False):
+        arguments["trampoline"] = True
+    elif session.options.get("selective_cps", False):
+        analysis = analyze_program(program)
+        session.reports["selective_cps"] = report(analysis)
+        arguments["direct"] = analysis
+
+    # With the callable option the module is compiled in memory instead of being unparsed to source.
+    if session.options.get("callable", False):
+        return compile_l1(program, filename=session.options.get("source"), **arguments)
+    return _unparse(to_ast_module(program, **arguments), session)
+
+
+def _to_flat_python(program: L0.Program, session: Session) -> Any:
+    trampoline = session.options.get("trampoline", False)
+    instrument = session.options.get("instrument", False)
+    if session.options.get("callable", False):
+        return compile_l0(program, trampoline, instrument, filename=session.options.get("source"))
+    return _unparse(to_flat_module(program, trampoline, instrument), session)
+
+
+def _to_vm(program: L0.Program, session: Session) -> Any:
+    return vm.compile_to_callable(program)
+
+
+def register_passes(manager: PassManager, backend: str = DEFAULT_BACKEND) -> None:
+    manager.register(
+        Pass(
+            name="check",
+            source="l3",
+            target="l3",
+            run=_check,
+            level=0,
+            description="semantic analysis",
+        )
+    )
+    manager.register(
+        Pass(
+            name="uniqify",
+            source="l3",
+            target="l3",
+            run=_uniqify,
+            description="rename binders apart",
+        )
+    )
+    manager.register(
+        Pass(
+            name="eliminate_letrec",
+            source="l3",
+            target="l2",
+            run=lambda program, _: eliminate_letrec_program(program),
+            requires=["uniqify"],
+            description="replace letrec with heap cells",
+        )
+    )
+    manager.register(
+        Pass(
+            name="optimize",
+            source="l2",
+            target="l2",
+            run=lambda program, _: optimize_program(program),
+            level=1,
+            description="constant folding and dead code elimination",
+        )
+    )
+    manager.register(
+        Pass(
+            name="cps_convert",
+            source="l2",
+            target="l1",
+            run=lambda program, session: cps_convert_program(program, session.fresh),
+            requires=["uniqify"],
+            description="continuation-passing style conversion",
+        )
+    )
+    manager.register(
+        Pass(
+            name="contract",
+            source="l1",
+            target="l1",
+            run=lambda program, _: contract_program(program),
+            level=2,
+            requires=["uniqify"],
+            description="eta reduction, copy propagation, dead code and single-use inlining",
+        )
+    )
+    if backend == "l1-nested":
+        manager.register(
+            Pass(
+                name="to_python",
+                source="l1",
+                target="python",
+                run=_to_python,
+                description="generate nested-function Python",
+            )
+        )
+        return
+
+    manager.register(
+        Pass(
+            name="close",
+            source="l1",
+            target="l0",
+            run=lambda program, _: close_program(program),
+            description="closure conversion to flat procedures",
+        )
+    )
+    manager.register(
+        Pass(
+            name="coalesce",
+            source="l0",
+            target="l0",
+            run=lambda program, _: coalesce_program(program),
+            level=1,
+            requires=["uniqify"],
+            description="share locals between variables with disjoint live ranges",
+        )
+    )
+    if backend == VM_BACKEND:
+        manager.register(
+            Pass(
+                name="assemble",
+                source="l0",
+                target="python",
+                run=_to_vm,
+                description="assemble register machine code and run it on the L0 VM",
+            )
+        )
+        return
+
+    manager.register(
+        Pass(
+            name="to_python",
+            source="l0",
+            target="python",
+            run=_to_flat_python,
+            description="generate flat-procedure Python",
+        )
+    )
+
+
+def build_pass_manager(backend: str = DEFAULT_BACKEND) -> PassManager:
+    manager = PassManager(source="l3", target="python")
+    register_passes(manager, backend)
+    return manager
+
+
+def list_passes(manager: PassManager) -> str:
+    return "\n".join(
+        f"{pass_.name:<20} {pass_.source} -> {pass_.target:<8} {pass_.cost:<10} "
+        f"{'required' if pass_.level is None else f'-O{pass_.level}':<10} {pass_.description}"
+        for pass_ in manager.passes
+    )
+
+
+def select_passes(
+    manager: PassManager,
+    check: bool,
+    level: int,
+    enable_pass: Sequence[str],
+    disable_pass: Sequence[str],
+    pass_order: str | None,
+) -> list[Pass]:
+    order = None if pass_order is None else [name.strip() for name in pass_order.split(",") if name.strip()]
+    disable = [*disable_pass, *([] if check else ["check"])]
+
+    try:
+        return manager.schedule(level=level, enable=enable_pass, disable=disable, order=order)
+    except ValueError as error:
+        raise click.UsageError(str(error)) from error
+
+
+def run_passes(
+    manager: PassManager,
+    program: Any,
+    passes: Sequence[Pass],
+    options: Mapping[str, Any],
+    sidecars: dict[str, str] | None = None,
+) -> Any:
+    # Files the passes produce besides the module, such as a source map, are added to `sidecars` when given.
+    if options.get("trampoline", False) and options.get("selective_cps", False):
+        raise click.UsageError("--trampoline keeps every call in CPS and cannot be combined with --selective-cps")
+    if options.get("selective_cps", False) and options.get("backend", DEFAULT_BACKEND) != "l1-nested":
+        raise click.UsageError("--selective-cps only applies to the l1-nested backend")
+    if options.get("backend", DEFAULT_BACKEND) == VM_BACKEND:
+        if not options.get("callable", False):
+            raise click.UsageError(f"the {VM_BACKEND} backend runs programs in memory and does not generate a module")
+        for option in ("trampoline", "instrument"):
+            if options.get(option, False):
+                raise click.UsageError(
+                    f"--{option} applies to generated Python and cannot be combined with {VM_BACKEND}"
+                )
+
+    session = Session(options=options)
+    module = manager.run(program, passes, session)
+    for name, text in session.reports.items():
+        click.echo(f"{name}:\n{text}", err=True)
+    if sidecars is not None:
+        sidecars.update(session.sidecars)
+    return module
+
+
+def compile_to_callable(
+    program: Any,
+    manager: PassManager | None = None,
+    passes: Sequence[Pass] | None = None,
+    options: Mapping[str, Any] | None = None,
+) -> Callable[..., int]:
+    options = options or {}
+    manager = manager if manager is not None else build_pass_manager(options.get("backend", DEFAULT_BACKEND))
+    passes = passes if passes is not None else manager.schedule(level=DEFAULT_LEVEL)
+    return run_passes(manager, program, passes, {**options, "callable": True})
+
+
+class DefaultGroup(click.Group):
+    # A group that runs its `default` command unless the first argument names another one, so `l3 INPUT` keeps
+    # compiling to a file next to `l3 run INPUT ARGUMENTS...`.
+    def __init__(self, *args: Any, default: str, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.default = default
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (args[0] not in self.commands and args[0] not in self.get_help_option_names(ctx)):
+            args = [self.default, *args]
+        return super().parse_args(ctx, args)
+
+
+def pipeline_options[F: Callable[..., Any]](
+    build: Callable[[str], PassManager], backends: Sequence[str] = BACKENDS
+) -> Callable[[F], F]:
+    def show_passes(context: click.Context, _: click.Parameter, value: bool) -> None:
+        # --backend is eager too, so it has been parsed when it comes before --list-passes.
+        if value and not context.resilient_parsing:
+            click.echo(list_passes(build(context.params.get("backend", DEFAULT_BACKEND))))
+            context.exit()
+
+    options = [
+        click.option(
+            "--check/--no-check",
+            default=True,
+            show_default=True,
+            help="Enable or disable semantic analysis",
+        ),
+        click.option(
+            "-O",
+            "--opt-level",
+            "level",
+            type=click.IntRange(0, build(DEFAULT_BACKEND).max_level),
+            default=DEFAULT_LEVEL,
+            show_default=True,
+            help="Optimization level",
+        ),
+        click.option(
+            "--enable-pass",
+            multiple=True,
+            metavar="PASS",
+            help="Run PASS regardless of the optimization level (repeatable)",
+        ),
+        click.option(
+            "--disable-pass",
+            multiple=True,
+            metavar="PASS",
+            help="Skip PASS regardless of the optimization level (repeatable)",
+        ),
+        click.option(
+            "--pass-order",
+            default=None,
+            metavar="PASS,...",
+            help="Run exactly these passes in this order",
+        ),
+        click.option(
+            "--selective-cps",
+            is_flag=True,
+            default=False,
+            help="Emit direct-style Python when no continuation escapes, and report the choice per function",
+        ),
+        click.option(
+            "--trampoline",
+            is_flag=True,
+            default=False,
+            help="Return tail calls to a driver loop so deep recursion cannot overflow the Python stack",
+        ),
+        click.option(
+            "--instrument",
+            is_flag=True,
+            default=False,
+            help="Count calls per function, allocations per site, and loads and stores, and print the counts at exit",
+        ),
+        click.option(
+            "--backend",
+            type=click.Choice(backends),
+            default=DEFAULT_BACKEND,
+            show_default=True,
+            is_eager=True,
+            help="Emit nested Python functions from L1, or closure-convert to flat L0 procedures"
+            + (f"; {VM_BACKEND} runs those procedures on the L0 register machine" if VM_BACKEND in backends else ""),
+        ),
+        click.option(
+            "--list-passes",
+            is_flag=True,
+            expose_value=False,
+            is_eager=True,
+            callback=show_passes,
+            help="List the available passes and exit",
+        ),
+    ]
+
+    def decorate(function: F) -> F:
+        for option in reversed(options):
+            function = option(function)
+        return function
+
+    return decorate
@@ -1,4 +1,6 @@
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
 from functools import partial
 
 from util.sequential_name_generator import SequentialNameGenerator
@@ -23,83 +25,85 @@ from .syntax import (
 type Context = Mapping[str, str]
 
 
+@dataclass
+class _Uniqify:
+    # The new name of every variable in scope. Binding constructs update it in place and restore what they shadowed
+    # on the way out, instead of copying it, so renaming a deep chain of lets is linear.
+    names: dict[str, str]
+    fresh: Callable[[str], str]
+
+    @contextmanager
+    def bind(self, names: Mapping[str, str]) -> Iterator[None]:
+        shadowed = {name: self.names[name] for name in names if name in self.names}
+        self.names.update(names)
+        try:
+            yield
+        finally:
+            for name in names:
+                del self.names[name]
+            self.names.update(shadowed)
+
+    def term(self, term: Term) -> Term:
+        match term:
+            case Let(bindings=bindings, body=body):
+                new_bindings = [(self.fresh(ref), self.term(t)) for ref, t in bindings]
+                with self.bind({ref: new_ref for (ref, _), (new_ref, _) in zip(bindings, new_bindings)}):
+                    return Let(bindings=new_bindings, body=self.term(body), span=term.span)
+
+            case LetRec(bindings=bindings, body=body):
+                # Every binding sees all of them, including the ones bound after it.
+                with self.bind({ref: self.fresh(ref) for ref, _ in bindings}):
+                    new_bindings = [(self.names[ref], self.term(t)) for ref, t in bindings]
+                    return LetRec(bindings=new_bindings, body=self.term(body), span=term.span)
+
+            case Reference(name=name):
+                return Reference(name=self.names.get(name, name), span=term.span)
+
+            case Abstract(parameters=parameters, body=body):
+                new_parameters = [self.fresh(ref) for ref in parameters]
+                with self.bind(dict(zip(parameters, new_parameters))):
+                    return Abstract(parameters=new_parameters, body=self.term(body), span=term.span)
+
+            case Apply(target=target, arguments=arguments):
+                new_arguments = [self.term(t) for t in arguments]
+                return Apply(target=self.term(target), arguments=new_arguments, span=term.span)
+
+            case Immediate():
+                return term
+
+            case Primitive(operator=operator, left=left, right=right):
+                return Primitive(operator=operator, left=self.term(left), right=self.term(right), span=term.span)
+
+            case Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
+                return Branch(
+                    operator=operator,
+                    left=self.term(left),
+                    right=self.term(right),
+                    consequent=self.term(consequent),
+                    otherwise=self.term(otherwise),
+                    span=term.span,
+                )
+
+            case Allocate():
+                return term
+
+            case Load(base=base, index=index):
+                return Load(base=self.term(base), index=index, span=term.span)
+
+            case Store(base=base, index=index, value=value):
+                return Store(base=self.term(base), index=index, value=self.term(value), span=term.span)
+
+            case Begin(effects=effects, value=value):  # pragma: no branch
+                new_effects = [self.term(t) for t in effects]
+                return Begin(effects=new_effects, value=self.term(value), span=term.span)
+
+
 def uniqify_term(
     term: Term,
     context: Context,
     fresh: Callable[[str], str],
 ) -> Term:
-    _term = partial(uniqify_term, context=context, fresh=fresh)
-
-    match term:
-        case Let(bindings=bindings, body=body):
-            new_bindings = []
-            new_context = {**context}
-            for ref, t in bindings:
-                new_ref = fresh(ref)
-                new_context = {**new_context, ref: new_ref}
-                new_bindings.append((new_ref, _term(term=t, context=context, fresh=fresh)))
-            return Let(bindings=new_bindings, body=_term(term=body, context=new_context, fresh=fresh))
-
-        case LetRec(bindings=bindings, body=body):
-            new_bindings = []
-            new_context = {**context}
-            for ref, t in bindings:
-                new_ref = fresh(ref)
-                new_context = {**new_context, ref: new_ref}
-                new_bindings.append((new_ref, _term(term=t, context=new_context, fresh=fresh)))
-            return LetRec(bindings=new_bindings, body=_term(term=body, context=new_context, fresh=fresh))
-
-        case Reference(name=name):
-            return Reference(name=context.get(name, name))
-
-        case Abstract(parameters=parameters, body=body):
-            new_context = {**context}
-            new_parameters = []
-            for ref in parameters:
-                new_ref = fresh(ref)
-                new_context = {**new_context, ref: new_ref}
-                new_parameters.append(new_ref)
-            return Abstract(parameters=new_parameters, body=_term(term=body, context=new_context, fresh=fresh))
-
-        case Apply(target=target, arguments=arguments):
-            new_arguments = [_term(term=t, context=context, fresh=fresh) for t in arguments]
-            return Apply(target=_term(term=target, context=context, fresh=fresh), arguments=new_arguments)
-
-        case Immediate():
-            return term
-
-        case Primitive(operator=operator, left=left, right=right):
-            return Primitive(
-                operator=operator,
-                left=_term(term=left, context=context, fresh=fresh),
-                right=_term(term=right, context=context, fresh=fresh),
-            )
-
-        case Branch(operator=operator, left=left, right=right, consequent=consequent, otherwise=otherwise):
-            return Branch(
-                operator=operator,
-                left=_term(term=left, context=context, fresh=fresh),
-                right=_term(term=right, context=context, fresh=fresh),
-                consequent=_term(term=consequent, context=context, fresh=fresh),
-                otherwise=_term(term=otherwise, context=context, fresh=fresh),
-            )
-
-        case Allocate():
-            return term
-
-        case Load(base=base, index=index):
-            return Load(base=_term(term=base, context=context, fresh=fresh), index=index)
-
-        case Store(base=base, index=index, value=value):
-            return Store(
-                base=_term(term=base, context=context, fresh=fresh),
-                index=index,
-                value=_term(term=value, context=context, fresh=fresh),
-            )
-
-        case Begin(effects=effects, value=value):  # pragma: no branch
-            new_effects = [_term(term=t, context=context, fresh=fresh) for t in effects]
-            return Begin(effects=new_effects, value=_term(term=value, context=context, fresh=fresh))
+    return _Uniqify(names=dict(context), fresh=fresh).term(term)
 
 
 def uniqify_program(
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+from L3.evaluate import compile_program
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager, compile_to_callable
+
+EXAMPLES = Path(__file__).parents[2] / "examples"
+
+
+def evaluate(source: str, *arguments: int) -> object:
+    return compile_program(parse_program(source))(*arguments)
+
+
+def test_evaluate_examples():
+    # The evaluator agrees with the compiled pipeline on every example that parses.
+    manager = build_pass_manager()
+    for path in sorted(EXAMPLES.glob("*.l3")):
+        if path.stem == "sum":
+            continue
+        program = parse_program(path.read_text())
+        entry = compile_program(program)
+        compiled = compile_to_callable(program, manager, manager.schedule(level=2))
+        for n in range(6):
+            arguments = [n] * len(program.parameters)
+            assert entry(*arguments) == compiled(*arguments)
+
+
+def test_evaluate_scopes():
+    # Let binds in parallel, so y sees the outer x; the inner function reads x two frames out.
+    source = "(l3 (x) (let ((x (+ x 1)) (y x)) (((\\ (a) (\\ (b) (+ (+ a b) (* x y)))) 10) 100)))"
+    assert evaluate(source, 2) == 10 + 100 + 3 * 2
+
+    source = "(l3 (n) (letrec ((even (\\ (k) (if (== k 0) 1 (odd (- k 1))))) (odd (\\ (k) (if (== k 0) 0 (even (- k 1)))))) (even n)))"
+    assert [evaluate(source, n) for n in range(5)] == [1, 0, 1, 0, 1]
+
+
+def test_evaluate_tail_calls():
+    # Tail calls run in a loop, so neither self nor mutual tail recursion grows the Python stack.
+    source = "(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))"
+    assert evaluate(source, 100_000) == 4_999_950_000
+
+    source = "(l3 (n) (letrec ((even (\\ (k) (if (== k 0) 1 (odd (- k 1))))) (odd (\\ (k) (if (== k 0) 0 (even (- k 1)))))) (even n)))"
+    assert evaluate(source, 100_001) == 0
+
+    # A call whose value is used is not in tail position, and still returns the callee's final value.
+    source = "(l3 (n) (letrec ((go (\\ (i) (if (< i n) (go (+ i 1)) i)))) (+ (go 0) 1)))"
+    assert evaluate(source, 100_000) == 100_001
+
+
+def test_evaluate_heap():
+    # A store evaluates to 0.
+    source = "(l3 (n) (let ((c (allocate 2))) (begin (store c 0 n) (store c 1 (* n 3)) (+ (load c 1) (store c 1 n)))))"
+    assert evaluate(source, 5) == 15
+
+
+def test_evaluate_errors():
+    with pytest.raises(ValueError, match="unknown variable: y"):
+        evaluate("(l3 (x) y)")
+
+    with pytest.raises(TypeError, match="takes 1 arguments but 2 were given"):
+        evaluate("(l3 (x) ((\\ (a) a) x x))", 1)
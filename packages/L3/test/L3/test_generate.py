@@ -0,0 +1,62 @@
+from collections import Counter
+
+from L3.check import check_program
+from L3.evaluate import compile_program
+from L3.generate import Shape, generate_program
+from L3.parse import parse_program, unparse_program
+from L3.pipeline import build_pass_manager, compile_to_callable
+from pydantic import BaseModel
+
+
+def kinds(node: object, counts: Counter[str]) -> Counter[str]:
+    if isinstance(node, BaseModel):
+        counts[type(node).__name__] += 1
+        for _, child in node:
+            kinds(child, counts)
+    elif isinstance(node, (list, tuple)):
+        for child in node:
+            kinds(child, counts)
+    return counts
+
+
+def test_generate_seeded():
+    assert generate_program(7) == generate_program(7)
+    assert generate_program(7) != generate_program(8)
+
+    for size in (100, 1000):
+        counts = kinds(generate_program(0, Shape(size=size)), Counter())
+        assert size // 3 <= counts.total() <= size * 3
+
+
+def test_generate_shape():
+    counts = Counter[str]()
+    for seed in range(5):
+        kinds(generate_program(seed, Shape(size=300)), counts)
+    for kind in ("LetRec", "Abstract", "Apply", "Allocate", "Load", "Store"):
+        assert counts[kind] > 0
+
+    counts = Counter[str]()
+    for seed in range(5):
+        kinds(generate_program(seed, Shape(size=300, letrec=0, closures=0, heap=0)), counts)
+    for kind in ("LetRec", "Abstract", "Apply", "Allocate", "Load", "Store"):
+        assert counts[kind] == 0
+
+
+def test_generate_source():
+    for seed in range(3):
+        program = generate_program(seed, Shape(size=60))
+        assert parse_program(unparse_program(program)) == program
+
+
+def test_generate_runs():
+    # Generated programs check and compute the same result on the evaluator and on both backends.
+    for seed in range(10):
+        program = generate_program(seed, Shape(size=60, parameters=2))
+        check_program(program)
+
+        expected = compile_program(program)(3, 4)
+        for backend in ("l1-nested", "l0-flat"):
+            manager = build_pass_manager(backend)
+            for level in (0, manager.max_level):
+                entry = compile_to_callable(program, manager, manager.schedule(level=level), {"backend": backend})
+                assert entry(3, 4) == expected
@@ -1,4 +1,8 @@
-from L3.parse import parse_program, parse_term
+from pathlib import Path
+
+import pytest
+
+from L3.parse import parse_program, parse_term, unparse_program, unparse_term
 from L3.syntax import (
     Abstract,
     Allocate,
@@ -14,6 +18,7 @@ from L3.syntax import (
     Reference,
     Store,
 )
+from util.source_map import Span
 
 
 # Let
@@ -224,6 +229,15 @@ def test_parse_allocate():
 
     assert actual == expected
 
+    source = "(allocate 3 0)"
+
+    expected = Allocate(count=3, fill=0)
+
+    actual = parse_term(source)
+
+    assert actual == expected
+    assert unparse_term(actual) == source
+
 
 # Load
 def test_parse_load():
@@ -295,3 +309,47 @@ def test_parse_program_identity():
     actual = parse_program(source)
 
     assert actual == expected
+
+
+# Positions
+def test_parse_positions():
+    source = "(l3 (x)\n  (let ((y (+ x 1)))\n    (f y)))"
+
+    actual = parse_program(source, positions=True)
+
+    match actual.body:
+        case Let(bindings=[(_, Primitive() as value)], body=Apply(target=target) as body) as let:
+            assert let.span == Span(2, 3)
+            assert value.span == Span(2, 12)
+            assert body.span == Span(3, 5)
+            assert target.span == Span(3, 6)
+        case _:
+            pytest.fail(f"unexpected parse: {actual.body!r}")
+
+    # Positions are metadata: they are neither serialized nor shown.
+    assert actual.model_dump() == parse_program(source).model_dump()
+    assert "span" not in repr(actual)
+    assert parse_program(source).body.span is None
+
+
+# Unparse
+def test_unparse_program_examples():
+    examples = Path(__file__).parents[2] / "examples"
+    for path in sorted(examples.glob("*.l3")):
+        if path.stem == "sum":
+            continue
+        program = parse_program(path.read_text())
+        assert parse_program(unparse_program(program)) == program
+
+
+def test_unparse_term():
+    term = LetRec(
+        bindings=[("f", Abstract(parameters=[], body=Load(base=Allocate(count=1), index=0)))],
+        body=Begin(
+            effects=[Store(base=Reference(name="r"), index=0, value=Immediate(value=1))],
+            value=Apply(target=Reference(name="f"), arguments=[]),
+        ),
+    )
+
+    assert unparse_term(term) == "(letrec ((f (\\ () (load (allocate 1) 0)))) (begin (store r 0 1) (f)))"
+    assert parse_term(unparse_term(term)) == term
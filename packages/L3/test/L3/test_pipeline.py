@@ -0,0 +1,371 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import CodeType
+
+import click
+import pytest
+from click.testing import CliRunner
+from L1.to_python import to_ast_program
+from L2.cps_convert import cps_convert_program
+from L2.optimize import optimize_program
+from L3.eliminate_letrec import eliminate_letrec_program
+from L3.main import main
+from L3.parse import parse_program
+from L3.pipeline import build_pass_manager, compile_to_callable, list_passes, run_passes, select_passes
+from L3.uniqify import uniqify_program
+
+EXAMPLES = Path(__file__).parents[2] / "examples"
+
+
+def names(level: int, backend: str = "l1-nested", **kwargs) -> list[str]:
+    manager = build_pass_manager(backend)
+    return [pass_.name for pass_ in manager.schedule(level=level, **kwargs)]
+
+
+def test_schedule_levels():
+    assert names(0) == ["check", "uniqify", "eliminate_letrec", "cps_convert", "to_python"]
+    assert names(1) == ["check", "uniqify", "eliminate_letrec", "optimize", "cps_convert", "to_python"]
+    assert names(2) == ["check", "uniqify", "eliminate_letrec", "optimize", "cps_convert", "contract", "to_python"]
+    assert names(0, enable=["optimize"]) == names(1)
+    assert names(1, disable=["optimize", "check"]) == ["uniqify", "eliminate_letrec", "cps_convert", "to_python"]
+    assert names(0, "l0-flat") == ["check", "uniqify", "eliminate_letrec", "cps_convert", "close", "to_python"]
+    assert names(2, "l0-flat")[-5:] == ["cps_convert", "contract", "close", "coalesce", "to_python"]
+
+
+def test_run_matches_direct_pipeline():
+    source = (EXAMPLES / "fib.l3").read_text()
+
+    fresh, l3 = uniqify_program(parse_program(source))
+    expected = to_ast_program(cps_convert_program(optimize_program(eliminate_letrec_program(l3)), fresh))
+
+    manager = build_pass_manager()
+    actual = manager.run(parse_program(source), manager.schedule(level=1))
+
+    assert actual == expected
+
+
+def test_select_passes():
+    manager = build_pass_manager()
+
+    passes = select_passes(manager, False, 1, [], ["optimize"], None)
+    assert [pass_.name for pass_ in passes] == ["uniqify", "eliminate_letrec", "cps_convert", "to_python"]
+
+    passes = select_passes(manager, True, 0, [], [], "uniqify, eliminate_letrec, optimize, cps_convert, to_python")
+    assert [pass_.name for pass_ in passes] == ["uniqify", "eliminate_letrec", "optimize", "cps_convert", "to_python"]
+
+    with pytest.raises(click.UsageError, match="required pass cannot be disabled"):
+        select_passes(manager, True, 1, [], ["cps_convert"], None)
+
+
+def test_list_passes():
+    listing = list_passes(build_pass_manager())
+
+    assert "optimize" in listing
+    assert "-O1" in listing
+    assert "l2 -> l1" in listing
+
+
+def test_main(tmp_path: Path):
+    output = tmp_path / "fib.py"
+    runner = CliRunner()
+
+    # No pass is registered above -O2, so -O3 is rejected rather than accepted as another name for it.
+    result = runner.invoke(main, ["-O3", "-o", str(output), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 2
+    assert "0<=x<=2" in result.output
+
+    result = runner.invoke(main, ["-O0", "-o", str(output), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 0
+    assert "def l1(" in output.read_text()
+
+    result = runner.invoke(main, ["--disable-pass", "uniqify", str(EXAMPLES / "fib.l3")])
+    assert result.exit_code != 0
+    assert "required pass cannot be disabled" in result.output
+
+    result = runner.invoke(main, ["--selective-cps", "-o", str(output), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 0
+    assert "emitted in direct style" in result.stderr
+    assert "return n" in output.read_text()
+
+    result = runner.invoke(main, ["--trampoline", "-o", str(output), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 0
+    assert "_frame = [None] * 3" in output.read_text()
+
+    result = runner.invoke(main, ["--list-passes"])
+    assert result.exit_code == 0
+    assert "cps_convert" in result.output
+
+
+def test_run_contracted():
+    source = (EXAMPLES / "add_complex.l3").read_text()
+    manager = build_pass_manager()
+
+    namespace: dict[str, object] = {}
+    exec(manager.run(parse_program(source), manager.schedule(level=2)), namespace)
+
+    assert namespace["l1"](3, 4) == 7  # type: ignore[operator]
+
+
+def test_run_trampolined():
+    source = "(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))"
+    manager = build_pass_manager()
+
+    namespace: dict[str, object] = {}
+    exec(run_passes(manager, parse_program(source), manager.schedule(level=2), {"trampoline": True}), namespace)
+
+    assert namespace["l1"](100_000) == 4_999_950_000  # type: ignore[operator]
+
+    with pytest.raises(click.UsageError, match="cannot be combined"):
+        run_passes(manager, parse_program(source), [], {"trampoline": True, "selective_cps": True})
+
+
+def test_run_self_tail_calls_as_loops():
+    source = "(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))"
+    manager = build_pass_manager()
+
+    for level in range(manager.max_level + 1):
+        for selective_cps in (False, True):
+            passes = manager.schedule(level=level)
+            module = run_passes(manager, parse_program(source), passes, {"selective_cps": selective_cps})
+            namespace: dict[str, object] = {}
+            exec(module, namespace)
+
+            assert "while True:" in module
+            assert namespace["l1"](100_000) == 4_999_950_000  # type: ignore[operator]
+
+    manager = build_pass_manager("l0-flat")
+    for level in range(manager.max_level + 1):
+        module = run_passes(manager, parse_program(source), manager.schedule(level=level), {"backend": "l0-flat"})
+        namespace = {}
+        exec(module, namespace)
+
+        assert "while True:" in module
+        assert namespace["l0"](100_000) == 4_999_950_000  # type: ignore[operator]
+
+
+def test_compile_to_callable():
+    source = (EXAMPLES / "fib.l3").read_text()
+    manager = build_pass_manager()
+
+    assert compile_to_callable(parse_program(source))(10) == 55
+    for options in ({}, {"selective_cps": True}, {"trampoline": True}):
+        entry = compile_to_callable(parse_program(source), manager, manager.schedule(level=manager.max_level), options)
+        assert entry(10) == 55
+
+
+def test_backends_agree():
+    # Both backends at every level, nested and trampolined, on every example that parses.
+    for path in sorted(EXAMPLES.glob("*.l3")):
+        if path.stem == "sum":
+            continue
+        program = parse_program(path.read_text())
+        arguments = [3] * len(program.parameters)
+        expected = compile_to_callable(program)(*arguments)
+
+        for backend in ("l1-nested", "l0-flat"):
+            manager = build_pass_manager(backend)
+            for level in range(manager.max_level + 1):
+                for trampoline in (False, True):
+                    options = {"backend": backend, "trampoline": trampoline}
+                    entry = compile_to_callable(program, manager, manager.schedule(level=level), options)
+                    assert entry(*arguments) == expected
+
+    assert compile_to_callable(program, options={"backend": "l0-flat"}).__name__ == "l0"
+
+    with pytest.raises(click.UsageError, match="only applies to the l1-nested backend"):
+        compile_to_callable(program, options={"backend": "l0-flat", "selective_cps": True})
+
+
+def test_reserved_names():
+    # Uniqify renames the binder to _Record0, the name of the record class a zero-sized allocation instantiates.
+    # Program and lambda parameters named like the runtime's classes are escaped in the definitions as in the uses.
+    sources = [
+        "(l3 (n) (let ((_Record (+ n 1))) (let ((c (allocate 0))) _Record)))",
+        "(l3 (_Record) (+ _Record 1))",
+        "(l3 (n) ((\\ (_Record) (+ _Record 1)) n))",
+        "(l3 (n) (let ((f (\\ (_Vector) (+ _Vector 1)))) (+ (f n) (- (f 0) 1))))",
+    ]
+
+    for source in sources:
+        program = parse_program(source)
+        assert compile_to_callable(program, options={"selective_cps": True})(4) == 5
+        for backend in ("l1-nested", "l0-flat"):
+            manager = build_pass_manager(backend)
+            for level in range(manager.max_level + 1):
+                for trampoline in (False, True):
+                    options = {"backend": backend, "trampoline": trampoline}
+                    entry = compile_to_callable(program, manager, manager.schedule(level=level), options)
+                    assert entry(4) == 5
+
+
+def test_main_backend(tmp_path: Path):
+    output = tmp_path / "fib.py"
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["--backend", "l0-flat", "-o", str(output), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 0
+    assert "def l0(" in output.read_text()
+
+    result = runner.invoke(main, ["run", "--backend", "l0-flat", "--trampoline", str(EXAMPLES / "fib.l3"), "20"])
+    assert result.exit_code == 0
+    assert result.output == "6765\n"
+
+    result = runner.invoke(main, ["--backend", "l0-flat", "--list-passes"])
+    assert result.exit_code == 0
+    assert "coalesce" in result.output
+
+    result = runner.invoke(main, ["--backend", "l0-flat", "--selective-cps", str(EXAMPLES / "fib.l3")])
+    assert result.exit_code != 0
+    assert "only applies to the l1-nested backend" in result.output
+
+
+def test_main_instrument(tmp_path: Path):
+    # The instrumented module prints its result as usual and the counters on stderr when it exits.
+    runner = CliRunner()
+    for backend in ("l1-nested", "l0-flat"):
+        output = tmp_path / f"{backend}.py"
+        arguments = ["--instrument", "--backend", backend, "-o", str(output), str(EXAMPLES / "fib.l3")]
+        result = runner.invoke(main, arguments)
+        assert result.exit_code == 0
+
+        process = subprocess.run([sys.executable, str(output), "10"], capture_output=True, text=True, check=True)
+        assert process.stdout == "55\n"
+        report = process.stderr.splitlines()
+        assert report[0] == "calls:"
+        assert {"allocations:", "loads:", "stores:"} <= set(report)
+        assert report[-1].split()[0] == "1"
+
+
+def test_run_instrument():
+    # In memory, the counters belong to the returned entry point and nothing is left to print at exit.
+    source = (EXAMPLES / "fib.l3").read_text()
+    script = (
+        "from L3.parse import parse_program\n"
+        "from L3.pipeline import compile_to_callable\n"
+        f"program = parse_program({source!r})\n"
+        "for backend in ('l1-nested', 'l0-flat'):\n"
+        "    for _ in range(3):\n"
+        "        compile_to_callable(program, options={'backend': backend, 'instrument': True})(10)\n"
+    )
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert process.stderr == ""
+
+    runner = CliRunner()
+    for backend in ("l1-nested", "l0-flat"):
+        result = runner.invoke(main, ["run", "--instrument", "--backend", backend, str(EXAMPLES / "fib.l3"), "10"])
+        assert result.exit_code == 0
+        assert result.stdout == "55\n"
+        assert result.stderr.count("calls:") == 1
+
+
+def test_main_source_map(tmp_path: Path):
+    # Every generated line maps into the source, and the function generated for fib's lambda to its line.
+    runner = CliRunner()
+    source = (EXAMPLES / "fib.l3").read_text().splitlines()
+    for backend in ("l1-nested", "l0-flat"):
+        for trampoline in ([], ["--trampoline"]):
+            output = tmp_path / f"{backend}.py"
+            arguments = ["--source-map", "--backend", backend, *trampoline, "-o", str(output), str(EXAMPLES / "fib.l3")]
+            result = runner.invoke(main, arguments)
+            assert result.exit_code == 0
+
+            generated = output.read_text().splitlines()
+            source_map = json.loads((tmp_path / f"{backend}.py.map").read_text())
+            assert source_map["source"] == str(EXAMPLES / "fib.l3")
+            for line, source_line, column in source_map["mappings"]:
+                assert 1 <= line <= len(generated)
+                assert 1 <= source_line <= len(source) and 1 <= column <= len(source[source_line - 1])
+            assert [4, 7] in [
+                position
+                for line, *position in source_map["mappings"]
+                if generated[line - 1].lstrip().startswith("def ")
+            ]
+
+    result = runner.invoke(main, ["-o", str(tmp_path / "plain.py"), str(EXAMPLES / "fib.l3")])
+    assert result.exit_code == 0
+    assert not (tmp_path / "plain.py.map").exists()
+
+
+def test_compile_to_callable_positions():
+    # Compiled in memory under the source file name, the generated functions start on the lines of the terms they
+    # came from, which is what tracebacks and profilers report.
+    path = str(EXAMPLES / "fib.l3")
+    entry = compile_to_callable(parse_program(Path(path).read_text(), positions=True), options={"source": path})
+    assert entry(10) == 55
+    assert entry.__code__.co_filename == path
+
+    lines: set[int] = set()
+    codes = [entry.__code__]
+    while codes:
+        code = codes.pop()
+        lines.add(code.co_firstlineno)
+        codes.extend(constant for constant in code.co_consts if isinstance(constant, CodeType))
+    assert 4 in lines
+
+
+def test_main_run():
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["run", "-O2", str(EXAMPLES / "fib.l3"), "10"])
+    assert result.exit_code == 0
+    assert result.output == "55\n"
+
+    result = runner.invoke(main, ["run", "--trampoline", str(EXAMPLES / "fib.l3"), "20"])
+    assert result.exit_code == 0
+    assert result.output == "6765\n"
+
+    result = runner.invoke(main, ["run", "--evaluate", str(EXAMPLES / "fib.l3"), "10"])
+    assert result.exit_code == 0
+    assert result.output == "55\n"
+
+    result = runner.invoke(main, ["run", "--evaluate", "--no-check", str(EXAMPLES / "fib.l3"), "10"])
+    assert result.exit_code == 0
+    assert result.output == "55\n"
+
+    for flags in ([], ["--evaluate"]):
+        result = runner.invoke(main, ["run", *flags, str(EXAMPLES / "add_simple.l3"), "-5", "3"])
+        assert result.exit_code == 0
+        assert result.output == "-2\n"
+
+    result = runner.invoke(main, ["run", "--evaluate", "--instrument", str(EXAMPLES / "fib.l3"), "10"])
+    assert result.exit_code != 0
+    assert "cannot be combined with --evaluate" in result.output
+
+    result = runner.invoke(main, ["run", str(EXAMPLES / "fib.l3")])
+    assert result.exit_code != 0
+    assert "fib.l3 takes 1 arguments but 0 were given" in result.output
+
+    result = runner.invoke(main, ["--help"])
+    assert result.exit_code == 0
+    assert "run" in result.output
+
+
+def test_main_run_vm(tmp_path: Path):
+    runner = CliRunner()
+
+    for level in ("-O0", "-O2"):
+        result = runner.invoke(main, ["run", "--backend", "l0-vm", level, str(EXAMPLES / "fib.l3"), "20"])
+        assert result.exit_code == 0
+        assert result.output == "6765\n"
+
+    # The machine replaces the register file on every call, so a deep tail loop needs no trampoline.
+    source = tmp_path / "loop.l3"
+    source.write_text("(l3 (n) (letrec ((go (\\ (i acc) (if (< i n) (go (+ i 1) (+ acc i)) acc)))) (go 0 0)))")
+    result = runner.invoke(main, ["run", "--backend", "l0-vm", str(source), "100000"])
+    assert result.exit_code == 0
+    assert result.output == "4999950000\n"
+
+    for option in ("--trampoline", "--instrument"):
+        result = runner.invoke(main, ["run", "--backend", "l0-vm", option, str(EXAMPLES / "fib.l3"), "10"])
+        assert result.exit_code != 0
+        assert f"{option} applies to generated Python" in result.output
+
+    result = runner.invoke(main, ["--backend", "l0-vm", str(EXAMPLES / "fib.l3")])
+    assert result.exit_code != 0
+    assert "'l0-vm' is not one of" in result.output
+
+    manager = build_pass_manager("l0-vm")
+    with pytest.raises(click.UsageError, match="runs programs in memory"):
+        run_passes(manager, parse_program(source.read_text()), manager.schedule(level=1), {"backend": "l0-vm"})
@@ -234,6 +234,27 @@ def test_letrec():
     assert actual == expected
 
 
+def test_letrec_forward_reference():
+    term = LetRec(
+        bindings=[
+            ("f", Abstract(parameters=[], body=Apply(target=Reference(name="g"), arguments=[]))),
+            ("g", Abstract(parameters=[], body=Apply(target=Reference(name="f"), arguments=[]))),
+        ],
+        body=Reference(name="f"),
+    )
+
+    actual = uniqify_term(term, {}, SequentialNameGenerator())
+
+    expected = LetRec(
+        bindings=[
+            ("f0", Abstract(parameters=[], body=Apply(target=Reference(name="g0"), arguments=[]))),
+            ("g0", Abstract(parameters=[], body=Apply(target=Reference(name="f0"), arguments=[]))),
+        ],
+        body=Reference(name="f0"),
+    )
+    assert actual == expected
+
+
 def test_program():
     body = Reference(name="x")
     parameters = ["x"]
@@ -1,6 +1,7 @@
 from collections import Counter, defaultdict
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Iterator, Mapping
 from functools import partial
+from typing import NamedTuple
 
 from L3 import syntax as L3
 
@@ -20,6 +21,11 @@ class SequentialNameGenerator:
         return f"{candidate}{current}"
 
 
+INT = L4.Int()
+BOOL = L4.Bool()
+VOID = L4.Void()
+
+
 def resolve_symbol(sym: L4.Symbol, symbols: Symbols) -> L4.Type:
     visited: set[L4.VName] = set()
     res = sym
@@ -34,23 +40,101 @@ def resolve_symbol(sym: L4.Symbol, symbols: Symbols) -> L4.Type:
     return res
 
 
-def resolve_type(type: L4.Type, symbols: Symbols) -> L4.Type:
-    if isinstance(type, L4.Symbol):
-        return resolve_symbol(type, symbols=symbols)
-    return type
+class Layout(NamedTuple):
+    # How Get and Set reach the value of a variable: through `loads` mutable cells, then at the index when the value
+    # is a list or pair.
+    loads: int
+    indexed: bool
+
+
+class TypeTable:
+    # Interns every type the checker and converter see, so structurally equal types are the same object and type
+    # equality is an identity check. A type is interned once per object: its key holds the interned identities of
+    # its parts. Resolving a symbol is remembered per scope, which is the `symbols` mapping it was looked up in; both
+    # the scope and the symbol are kept alive, so their identities are never reused while the table exists.
+    #
+    # The checker also leaves the layout of every Get and Set it checks here, for the converter to lower them with.
+    def __init__(self) -> None:
+        self._types: dict[tuple[object, ...], L4.Type] = {}
+        self._interned: dict[int, tuple[L4.Type, L4.Type]] = {}
+        self._resolved: dict[tuple[int, int], tuple[Symbols, L4.Symbol, L4.Type]] = {}
+        self._layouts: dict[int, tuple[L4.Get | L4.Set, Layout | None]] = {}
+
+    def intern(self, type: L4.Type) -> L4.Type:
+        entry = self._interned.get(id(type))
+        if entry is not None:
+            return entry[1]
+        match type:
+            case L4.Mutable(oftype=oftype):
+                key: tuple[object, ...] = ("mutable", id(self.intern(oftype)))
+            case L4.FuncType(parameters=parameters, result=result):
+                key = ("functype", id(self.intern(result)), *(id(self.intern(ty)) for ty in parameters))
+            case L4.List(typeof=typeof):
+                key = ("list", id(self.intern(typeof)))
+            case L4.Pair(type1=type1, type2=type2):
+                key = ("pair", id(self.intern(type1)), id(self.intern(type2)))
+            case L4.Symbol(name=name, payload=payload):
+                key = ("symbol", name, id(self.intern(payload)))
+            case _:
+                key = (type.tag,)
+        interned = self._types.setdefault(key, type)
+        self._interned[id(type)] = (type, interned)
+        return interned
+
+    def resolve(self, type: L4.Type, symbols: Symbols) -> L4.Type:
+        if not isinstance(type, L4.Symbol):
+            return self.intern(type)
+        entry = self._resolved.get((id(symbols), id(type)))
+        if entry is None:
+            entry = self._resolved[id(symbols), id(type)] = (
+                symbols,
+                type,
+                self.intern(resolve_symbol(type, symbols=symbols)),
+            )
+        return entry[2]
+
+    def annotate(self, node: L4.Get | L4.Set, layout: Layout) -> None:
+        # A node shared between scopes that give it different layouts has none; it is derived again where it is used.
+        entry = self._layouts.get(id(node))
+        self._layouts[id(node)] = (node, layout if entry is None or entry[1] == layout else None)
+
+    def layout(self, node: L4.Get | L4.Set) -> Layout | None:
+        entry = self._layouts.get(id(node))
+        return None if entry is None else entry[1]
+
+
+def access_layout(type: L4.Type, symbols: Symbols, types: TypeTable) -> tuple[Layout, L4.Type]:
+    # The layout of a variable of this type, and the type of the value it holds.
+    loads = 0
+    type = types.resolve(type, symbols=symbols)
+    while isinstance(type, L4.Mutable):
+        loads += 1
+        type = types.resolve(type.oftype, symbols=symbols)
+    return Layout(loads=loads, indexed=isinstance(type, L4.List | L4.Pair)), type
 
 
-def assert_type_equality(type1: L4.Type, type2: L4.Type, symbols: Symbols) -> None:
-    t1 = resolve_type(type1, symbols=symbols)
-    t2 = resolve_type(type2, symbols=symbols)
-    if t1 != t2:
+def assert_type_equality(type1: L4.Type, type2: L4.Type, symbols: Symbols, types: TypeTable) -> None:
+    t1 = types.resolve(type1, symbols=symbols)
+    t2 = types.resolve(type2, symbols=symbols)
+    if t1 is not t2:
         raise ValueError(f"Type mismatch between {t1} and {t2}")
 
 
+def extend_symbols(symbols: Symbols, local: Symbols) -> Symbols:
+    # A scope that binds no symbols shares its parent's mapping, and with it the resolutions made there.
+    return {**symbols, **local} if local else symbols
+
+
 def process_types(
-    id: str, type: L4.Type, expression: L4.Expression, context: Context, symbols: Symbols, fresh: Callable[[str], str]
+    id: str,
+    type: L4.Type,
+    expression: L4.Expression,
+    context: Context,
+    symbols: Symbols,
+    fresh: Callable[[str], str],
+    types: TypeTable,
 ) -> tuple[str, L3.Term]:
-    _process_ex = partial(process_expression, context=context, symbols=symbols, fresh=fresh)
+    _process_ex = partial(process_expression, context=context, symbols=symbols, fresh=fresh, types=types)
     match type:
         case L4.Mutable():
             if isinstance(expression, L4.HeapAllocate):
@@ -71,63 +155,83 @@ def process_types(
                     ),
                 )
         case L4.Symbol(name=name, payload=_):
-            resolved = resolve_symbol(type, symbols=symbols)
+            resolved = types.resolve(type, symbols=symbols)
             local = {name: resolved}
             return process_types(
-                id=id, type=resolved, expression=expression, context=context, symbols={**symbols, **local}, fresh=fresh
+                id=id,
+                type=resolved,
+                expression=expression,
+                context=context,
+                symbols=extend_symbols(symbols, local),
+                fresh=fresh,
+                types=types,
             )
         case _:
             return (id, _process_ex(expression=expression))
 
 
 def process_expression(
-    expression: L4.Expression, context: Context, symbols: Symbols, fresh: Callable[[str], str]
+    expression: L4.Expression,
+    context: Context,
+    symbols: Symbols,
+    fresh: Callable[[str], str],
+    types: TypeTable | None = None,
 ) -> L3.Term:
-    _process = partial(process_expression, context=context, symbols=symbols, fresh=fresh)
+    if types is None:
+        types = TypeTable()
+    _process = partial(process_expression, context=context, symbols=symbols, fresh=fresh, types=types)
+
+    def _layout(node: L4.Get | L4.Set) -> Layout:
+        # Recorded by the checker; derived here for nodes it did not see, such as the counters of desugared loops.
+        layout = types.layout(node)
+        if layout is None:
+            layout, _ = access_layout(context[node.target.name], symbols=symbols, types=types)
+        return layout
+
     match expression:
         case L4.LetRec(bindings=bindings, body=body):
             local = {name: ty for name, ty, _ in bindings}
             local_sym = {
-                ty.name: resolve_symbol(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
+                ty.name: types.resolve(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
             }
+            scope = extend_symbols(symbols, local_sym)
             l3_bindings = [
                 process_types(
                     id=ide,
                     type=ty,
                     expression=ex,
                     context={**context, **local},
-                    symbols={**symbols, **local_sym},
+                    symbols=scope,
                     fresh=fresh,
+                    types=types,
                 )
                 for ide, ty, ex in bindings
             ]
             return L3.LetRec(
                 bindings=l3_bindings,
-                body=process_expression(
-                    expression=body, context={**context, **local}, symbols={**symbols, **local_sym}, fresh=fresh
-                ),
+                body=_process(expression=body, context={**context, **local}, symbols=scope),
             )
         case L4.Let(bindings=bindings, body=body):
             local = {name: ty for name, ty, _ in bindings}
             local_sym = {
-                ty.name: resolve_symbol(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
+                ty.name: types.resolve(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
             }
+            scope = extend_symbols(symbols, local_sym)
             l3_bindings = [
                 process_types(
                     id=ide,
                     type=ty,
                     expression=ex,
                     context=context,
-                    symbols={**symbols, **local_sym},
+                    symbols=scope,
                     fresh=fresh,
+                    types=types,
                 )
                 for ide, ty, ex in bindings
             ]
             return L3.Let(
                 bindings=l3_bindings,
-                body=process_expression(
-                    expression=body, context={**context, **local}, symbols={**symbols, **local_sym}, fresh=fresh
-                ),
+                body=_process(expression=body, context={**context, **local}, symbols=scope),
             )
         case L4.Operation(operator=operator, left=left, right=right):
             if operator in ("==", "<"):
@@ -160,7 +264,7 @@ def process_expression(
             l3_params = [ide for ide, _ in params]
             return L3.Abstract(
                 parameters=l3_params,
-                body=process_expression(expression=body, context={**context, **local}, symbols=symbols, fresh=fresh),
+                body=_process(expression=body, context={**context, **local}),
             )
         case L4.Reference(name=name):
             return L3.Reference(name=name)
@@ -177,51 +281,28 @@ def process_expression(
                 ),
             )
         case L4.Get(target=target, index=index):
+            layout = _layout(expression)
             ret = _process(target)
-            type_ = context[target.name]
-            while isinstance(type_, (L4.Mutable, L4.Symbol)):
-                if isinstance(type_, L4.Symbol):
-                    type_ = resolve_symbol(type_, symbols=symbols)
-                else:
-                    ret = L3.Load(base=ret, index=0)
-                    type_ = type_.oftype
-            if isinstance(type_, L4.List) or isinstance(type_, L4.Pair):
+            for _ in range(layout.loads):
+                ret = L3.Load(base=ret, index=0)
+            if layout.indexed:
                 return L3.Load(base=ret, index=index)
             return ret
         case L4.Set(target=target, index=index, value=value):
+            layout = _layout(expression)
+            if layout.loads == 0:
+                raise ValueError("Trying to mutate an immutable in set")
             ret = _process(target)
-            type_ = context[target.name]
-            value_ = _process(value)
-            while isinstance(type_, (L4.Mutable, L4.Symbol)):
-                if isinstance(type_, L4.Symbol):
-                    type_ = resolve_symbol(type_, symbols=symbols)
-                else:
-                    t = type_.oftype
-                    if isinstance(t, L4.Symbol):
-                        t = resolve_symbol(t, symbols=symbols)
-                    if isinstance(t, L4.Mutable):
-                        type_ = t
-                        ret = L3.Load(base=ret, index=0)
-                    elif isinstance(t, L4.List) or isinstance(t, L4.Pair):
-                        return L3.Store(base=L3.Load(base=ret, index=0), index=index, value=value_)
-                    else:
-                        return L3.Store(base=ret, index=0, value=value_)
-            raise ValueError("Trying to mutate an immutable in set")
-        case L4.NewList(typeof=typeof, size=size):
-            id = fresh("list")
-            type_default_initial = L3.Immediate(value=0)
-            return L3.Let(
-                bindings=[(id, L3.Allocate(count=size))],
-                body=L3.Begin(
-                    effects=[
-                        L3.Store(base=L3.Reference(name=id), index=i, value=type_default_initial) for i in range(size)
-                    ],
-                    value=L3.Reference(name=id),
-                ),
-            )
+            # The last cell holds a scalar in place; a list or pair is indexed once it is reached.
+            for _ in range(layout.loads if layout.indexed else layout.loads - 1):
+                ret = L3.Load(base=ret, index=0)
+            return L3.Store(base=ret, index=index if layout.indexed else 0, value=_process(value))
+        case L4.NewList(size=size):
+            # Every element starts out as 0; one filled allocation instead of a store per element.
+            return L3.Allocate(count=size, fill=0)
         case L4.NewPair(val1=val1, val2=val2, typeof=typeof):
             id = fresh("pair")
-            type_ = resolve_type(typeof, symbols=symbols)
+            type_ = types.resolve(typeof, symbols=symbols)
             if not isinstance(type_, L4.Pair):
                 raise ValueError("NewPair type must be of type Pair")
             return L3.Let(
@@ -281,40 +362,79 @@ def process_expression(
             return
 
 
+def _references(term: L3.Term) -> Iterator[L3.Identifier]:
+    # Every name a term refers to, whether it binds the name itself or not.
+    match term:
+        case L3.Reference(name=name):
+            yield name
+        case L3.Let(bindings=bindings, body=body) | L3.LetRec(bindings=bindings, body=body):
+            for _, value in bindings:
+                yield from _references(value)
+            yield from _references(body)
+        case L3.Abstract(body=body):
+            yield from _references(body)
+        case L3.Apply(target=target, arguments=arguments):
+            yield from _references(target)
+            for argument in arguments:
+                yield from _references(argument)
+        case L3.Primitive(left=left, right=right):
+            yield from _references(left)
+            yield from _references(right)
+        case L3.Branch(left=left, right=right, consequent=consequent, otherwise=otherwise):
+            for child in (left, right, consequent, otherwise):
+                yield from _references(child)
+        case L3.Load(base=base):
+            yield from _references(base)
+        case L3.Store(base=base, value=value):
+            yield from _references(base)
+            yield from _references(value)
+        case L3.Begin(effects=effects, value=value):
+            for effect in effects:
+                yield from _references(effect)
+            yield from _references(value)
+        case _:
+            pass
+
+
 def convert_to_l3(
     program: L4.Program,
+    check: bool = True,
 ) -> L3.Program:
-    check_program(program=program)
+    types = TypeTable()
+    if check:
+        check_program(program=program, types=types)
     fresh = SequentialNameGenerator()
     match program:
         case L4.Program(definitions=definitions, body=body):  # pragma: no branch
             context = {name: ty for name, ty, _ in definitions}
             lazy_sym = {ty.name: ty.payload for _, ty, _ in definitions if isinstance(ty, L4.Symbol)}
-            symbols = {ty.name: resolve_symbol(ty, lazy_sym) for _, ty, _ in definitions if isinstance(ty, L4.Symbol)}
+            symbols = {ty.name: types.resolve(ty, lazy_sym) for _, ty, _ in definitions if isinstance(ty, L4.Symbol)}
             l3_bindings = [
-                process_types(id=ide, type=ty, expression=ex, context=context, symbols=symbols, fresh=fresh)
+                process_types(
+                    id=ide, type=ty, expression=ex, context=context, symbols=symbols, fresh=fresh, types=types
+                )
                 for ide, ty, ex in definitions
             ]
-            return L3.Program(
-                parameters=[],
-                body=L3.Let(
-                    bindings=l3_bindings,
-                    body=process_expression(expression=body, context=context, symbols=symbols, fresh=fresh),
-                ),
-            )
-
-
-def dummy_parse(code: str) -> L4.Program:
-    return L4.Program(definitions=[(code, L4.Void(), L4.Empty)], body=L4.Empty())
+            l3_body = process_expression(expression=body, context=context, symbols=symbols, fresh=fresh, types=types)
+            # Function bodies see every definition, as they do when checked; only programs whose definitions refer to
+            # one another need the cells of a letrec.
+            if any(name in context for _, value in l3_bindings for name in _references(value)):
+                return L3.Program(parameters=[], body=L3.LetRec(bindings=l3_bindings, body=l3_body))
+            return L3.Program(parameters=[], body=L3.Let(bindings=l3_bindings, body=l3_body))
 
 
 def check_expression(
     expression: L4.Expression,
     context: Context,
     symbols: Symbols,
+    types: TypeTable | None = None,
+    deferred: Context | None = None,
 ) -> L4.Type:
-    recur = partial(check_expression, context=context, symbols=symbols)
-    type_equal = partial(assert_type_equality, symbols=symbols)
+    # `deferred` holds names that are in scope only inside function bodies, where `context` still shadows them.
+    if types is None:
+        types = TypeTable()
+    recur = partial(check_expression, context=context, symbols=symbols, types=types, deferred=deferred)
+    type_equal = partial(assert_type_equality, symbols=symbols, types=types)
 
     match expression:
         case L4.Let(bindings=bindings, body=body):
@@ -326,9 +446,9 @@ def check_expression(
                 type_equal(ty, recur(ex))
             local = {name: ty for name, ty, _ in bindings}
             local_sym = {
-                ty.name: resolve_symbol(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
+                ty.name: types.resolve(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
             }
-            return recur(body, context={**context, **local}, symbols={**symbols, **local_sym})
+            return recur(body, context={**context, **local}, symbols=extend_symbols(symbols, local_sym))
 
         case L4.LetRec(bindings=bindings, body=body):
             counts = Counter(name for name, _, _ in bindings)
@@ -337,15 +457,14 @@ def check_expression(
                 raise ValueError(f"duplicate binders: {duplicates}")
             local = {name: ty for name, ty, _ in bindings}
             local_sym = {
-                ty.name: resolve_symbol(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
+                ty.name: types.resolve(ty, symbols=symbols) for _, ty, _ in bindings if isinstance(ty, L4.Symbol)
             }
+            scope = extend_symbols(symbols, local_sym)
             for _, ty, ex in bindings:
                 assert_type_equality(
-                    ty,
-                    recur(ex, context={**context, **local}, symbols={**symbols, **local_sym}),
-                    symbols={**symbols, **local_sym},
+                    ty, recur(ex, context={**context, **local}, symbols=scope), symbols=scope, types=types
                 )
-            return recur(body, context={**context, **local}, symbols={**symbols, **local_sym})
+            return recur(body, context={**context, **local}, symbols=scope)
 
         case L4.Reference(name=name):
             if name not in context:
@@ -354,32 +473,35 @@ def check_expression(
 
         case L4.Immediate(value=value):
             if isinstance(value, bool):
-                return L4.Bool()
+                return BOOL
             elif value is None:
-                return L4.Void()
-            return L4.Int()
+                return VOID
+            return INT
         case L4.Operation(operator=operator, left=left, right=right):
             type_ = recur(left)
             type_equal(type_, recur(right))
             if operator in ("==", "<"):
-                return L4.Bool()
+                return BOOL
             return type_
         case L4.If(condition=condition, consequent=consequent, otherwise=otherwise):
-            type_equal(L4.Bool(), recur(condition))
+            type_equal(BOOL, recur(condition))
             type_ = recur(consequent)
             type_equal(type_, recur(otherwise))
             return type_
         case L4.Empty():
-            return L4.Void()
+            return VOID
         case L4.Function(params=params, body=body):
             counts = Counter(name for name, _ in params)
             duplicates = {name: count for name, count in counts.items() if count > 1}
             if duplicates:
                 raise ValueError(f"duplicate binders: {duplicates}")
             local = {ide: ty for ide, ty in params}
-            return L4.FuncType(parameters=[ty for _, ty in params], result=recur(body, context={**context, **local}))
+            return L4.FuncType(
+                parameters=[ty for _, ty in params],
+                result=recur(body, context={**(deferred or {}), **context, **local}, deferred=None),
+            )
         case L4.Call(target=target, arguments=arguments):
-            type_ = resolve_type(recur(target), symbols=symbols)
+            type_ = types.resolve(recur(target), symbols=symbols)
             if isinstance(type_, L4.FuncType):
                 if len(arguments) != len(type_.parameters):
                     raise ValueError("Call argument and parameter length mismatch")
@@ -392,12 +514,8 @@ def check_expression(
         case L4.Get(target=target, index=index):
             if target.name not in context:
                 raise ValueError(f"unknown variable: {target.name} in get")
-            type_ = context[target.name]
-            while isinstance(type_, (L4.Mutable, L4.Symbol)):
-                if isinstance(type_, L4.Mutable):
-                    type_ = type_.oftype
-                else:
-                    type_ = resolve_symbol(type_, symbols=symbols)
+            layout, type_ = access_layout(context[target.name], symbols=symbols, types=types)
+            types.annotate(expression, layout)
             if isinstance(type_, L4.List):
                 return type_.typeof
             if isinstance(type_, L4.Pair):
@@ -410,33 +528,26 @@ def check_expression(
         case L4.Set(target=target, index=index, value=value):
             if target.name not in context:
                 raise ValueError(f"unknown variable: {target.name} in set")
-            type_ = context[target.name]
-            while isinstance(type_, (L4.Mutable, L4.Symbol)):
-                if isinstance(type_, L4.Symbol):
-                    type_ = resolve_symbol(type_, symbols=symbols)
-                    continue
-                t = type_.oftype
-                if isinstance(t, L4.Symbol):
-                    t = resolve_symbol(t, symbols=symbols)
-                if not isinstance(t, L4.Mutable):
-                    v = recur(value)
-                    if isinstance(t, L4.List):
-                        type_equal(v, t.typeof)
-                    elif isinstance(t, L4.Pair):
-                        if index > 1:
-                            raise ValueError("Pair value index must be 0 or 1 in set")
-                        type_equal(v, (t.type1 if index == 0 else t.type2))
-                    else:
-                        type_equal(v, t)
-                        if index != 0:
-                            raise ValueError("Scalar value index must be 0 in set")
-                    return L4.Void()
-                type_ = t
-            raise ValueError(f"Set trying to mutate an immutable {target}")
+            layout, type_ = access_layout(context[target.name], symbols=symbols, types=types)
+            if layout.loads == 0:
+                raise ValueError(f"Set trying to mutate an immutable {target}")
+            types.annotate(expression, layout)
+            v = recur(value)
+            if isinstance(type_, L4.List):
+                type_equal(v, type_.typeof)
+            elif isinstance(type_, L4.Pair):
+                if index > 1:
+                    raise ValueError("Pair value index must be 0 or 1 in set")
+                type_equal(v, (type_.type1 if index == 0 else type_.type2))
+            else:
+                type_equal(v, type_)
+                if index != 0:
+                    raise ValueError("Scalar value index must be 0 in set")
+            return VOID
         case L4.NewList(typeof=typeof, size=_):
             return L4.List(typeof=typeof)
         case L4.NewPair(val1=val1, val2=val2, typeof=typeof):
-            type_ = resolve_type(typeof, symbols=symbols)
+            type_ = types.resolve(typeof, symbols=symbols)
             if not isinstance(type_, L4.Pair):
                 raise ValueError("NewPair type must be of type Pair")
             type_equal(recur(val1), type_.type1)
@@ -446,18 +557,18 @@ def check_expression(
             type_equal(recur(capsule_expression), typeof)
             return typeof
         case L4.While(condition=condition, run=run):
-            type_equal(recur(condition), L4.Bool())
-            type_equal(recur(run), L4.Void())
-            return L4.Void()
+            type_equal(recur(condition), BOOL)
+            type_equal(recur(run), VOID)
+            return VOID
         case L4.For(times=times, run=run):
             if isinstance(times, int):
                 times = L4.Immediate(value=times)
-            type_equal(recur(times), L4.Int())
-            type_equal(recur(run), L4.Void())
-            return L4.Void()
+            type_equal(recur(times), INT)
+            type_equal(recur(run), VOID)
+            return VOID
         case L4.Bunch(expressions=expressions):
             if not expressions:
-                return L4.Void()
+                return VOID
             for ex in expressions[:-1]:
                 recur(ex)
             return recur(expressions[-1])
@@ -465,7 +576,9 @@ def check_expression(
             return
 
 
-def check_program(program: L4.Program) -> None:
+def check_program(program: L4.Program, types: TypeTable | None = None) -> None:
+    if types is None:
+        types = TypeTable()
     match program:
         case L4.Program(definitions=definitions, body=body):  # pragma: no branch
             counts = Counter(name for name, _, _ in definitions)
@@ -475,10 +588,20 @@ def check_program(program: L4.Program) -> None:
             local = {name: ty for name, ty, _ in definitions}
             lazy_sym = {ty.name: ty.payload for _, ty, _ in definitions if isinstance(ty, L4.Symbol)}
             local_symbols = {
-                ty.name: resolve_symbol(ty, lazy_sym) for _, ty, _ in definitions if isinstance(ty, L4.Symbol)
+                ty.name: types.resolve(ty, lazy_sym) for _, ty, _ in definitions if isinstance(ty, L4.Symbol)
             }
-            for _, ty, ex in definitions:
+            # A definition is evaluated before the ones after it are stored, so it sees only the earlier ones, except
+            # inside a function body, which runs once every definition is in place. That lets definitions recurse
+            # through functions, as the letrec they are lowered to allows, without reading a cell before it is set.
+            earlier: dict[str, L4.Type] = {}
+            for name, ty, ex in definitions:
                 assert_type_equality(
-                    ty, check_expression(expression=ex, context=local, symbols=local_symbols), symbols=local_symbols
+                    ty,
+                    check_expression(
+                        expression=ex, context=earlier, symbols=local_symbols, types=types, deferred=local
+                    ),
+                    symbols=local_symbols,
+                    types=types,
                 )
-            check_expression(body, context=local, symbols=local_symbols)
+                earlier[name] = ty
+            check_expression(body, context=local, symbols=local_symbols, types=types)
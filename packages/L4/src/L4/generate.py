@@ -0,0 +1,325 @@
+import random
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+
+from L3.generate import FUEL, Shape
+
+from . import syntax as L4
+
+# Seeded random well-typed programs, the L4 counterpart of L3.generate and tuned by the same Shape. Values are
+# integers, booleans, mutable cells, lists and pairs of integers, and functions of integers; heap operations also
+# cover loops, which count a private cell down from a small constant. Recursion and the bound on the calls one run
+# makes work as in L3.generate. Top-level definitions are closed, since they are bound by one non-recursive let.
+
+INT = L4.Int()
+
+
+@dataclass(frozen=True)
+class _Variable:
+    type: L4.Type
+    # Slots of a list; arity, fuel and cost of a function, as in L3.generate.
+    size: int = 1
+    arity: int = 0
+    fuel: bool = False
+    cost: int = 0
+
+
+type _Scope = Mapping[L4.Identifier, _Variable]
+
+
+def _containers(scope: _Scope, mutable: bool) -> list[tuple[L4.Identifier, int]]:
+    # Variables Get can read (or Set can write) an integer from, with their number of slots.
+    found: list[tuple[L4.Identifier, int]] = []
+    for name, variable in scope.items():
+        type_ = variable.type
+        if isinstance(type_, L4.Mutable):
+            type_ = type_.oftype
+        elif mutable:
+            continue
+        match type_:
+            case L4.Int() if isinstance(variable.type, L4.Mutable):
+                found.append((name, 1))
+            case L4.List():
+                found.append((name, variable.size))
+            case L4.Pair():
+                found.append((name, 2))
+            case _:
+                pass
+    return found
+
+
+class _Generator:
+    def __init__(self, shape: Shape, seed: int) -> None:
+        self.shape = shape
+        self.rng = random.Random(seed)
+        self.counter = 0
+        # Calls the function body being generated may still make.
+        self.work = shape.work
+
+    def fresh(self, prefix: str) -> L4.Identifier:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def split(self, budget: int, parts: int) -> list[int]:
+        if budget <= parts:
+            return [1] * parts
+        cuts = sorted(self.rng.sample(range(1, budget), parts - 1))
+        return [end - start for start, end in zip([0, *cuts], [*cuts, budget], strict=True)]
+
+    def width(self, budget: int, depth: int) -> int:
+        return self.rng.randint(1, max(1, min(budget // 2, 2 * round(budget ** (1 / depth)))))
+
+    def leaf(self, scope: _Scope) -> L4.Expression:
+        containers = _containers(scope, mutable=False)
+        if containers and self.rng.random() < self.shape.heap / (4 + self.shape.heap):
+            name, size = self.rng.choice(containers)
+            return L4.Get(target=L4.Reference(name=name), index=self.rng.randrange(size))
+        integers = [name for name, variable in scope.items() if variable.type == INT]
+        if integers and self.rng.random() < 0.7:
+            return L4.Reference(name=self.rng.choice(integers))
+        return L4.Immediate(value=self.rng.randint(0, 9))
+
+    def integer(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        # An Int-typed expression of about `budget` nodes.
+        if budget <= 1 or depth <= 0:
+            return self.leaf(scope)
+
+        functions = [
+            name
+            for name, variable in scope.items()
+            if isinstance(variable.type, L4.FuncType) and variable.cost <= self.work
+        ]
+        choices: list[tuple[float, Callable[[int, int, _Scope], L4.Expression]]] = [
+            (3.0, self.operation),
+            (1.5, self.if_),
+            (2.0, self.let),
+            (self.shape.letrec, self.letrec),
+            (2.0 * bool(functions), self.call),
+            (1.0 + self.shape.heap, self.bunch),
+            (0.2, self.capsule),
+        ]
+        _, choice = self.rng.choices(choices, weights=[weight for weight, _ in choices])[0]
+        return choice(budget, depth, scope)
+
+    def boolean(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        if budget <= 2 or depth <= 0:
+            return L4.Immediate(value=self.rng.random() < 0.5)
+        left, right = self.split(budget - 1, 2)
+        return L4.Operation(
+            operator=self.rng.choice(["<", "=="]),
+            left=self.integer(left, depth - 1, scope),
+            right=self.integer(right, depth - 1, scope),
+        )
+
+    def operation(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        operator = self.rng.choice(["+", "-", "*"])
+        if operator == "*":
+            # Keep products small so values stay machine-sized.
+            return L4.Operation(
+                operator="*",
+                left=self.integer(budget - 2, depth - 1, scope),
+                right=L4.Immediate(value=self.rng.randint(0, 3)),
+            )
+        left, right = self.split(budget - 1, 2)
+        return L4.Operation(
+            operator=operator, left=self.integer(left, depth - 1, scope), right=self.integer(right, depth - 1, scope)
+        )
+
+    def if_(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        condition, consequent, otherwise = self.split(budget - 1, 3)
+        return L4.If(
+            condition=self.boolean(min(condition, 5), depth - 1, scope),
+            consequent=self.integer(consequent + max(condition - 5, 0), depth - 1, scope),
+            otherwise=self.integer(otherwise, depth - 1, scope),
+        )
+
+    def capsule(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        return L4.Capsule(typeof=INT, expression=self.integer(budget - 1, depth - 1, scope))
+
+    def value(self, budget: int, depth: int, scope: _Scope) -> tuple[L4.Type, L4.Expression, _Variable]:
+        # A value to bind with its declared type: an integer, a closure, a cell, a list or a pair.
+        choices = [1.0, self.shape.closures, self.shape.heap, self.shape.heap, self.shape.heap]
+        mutable = self.rng.random() < 0.5
+        match self.rng.choices(["int", "closure", "cell", "list", "pair"], weights=choices)[0]:
+            case "closure":
+                return self.function(budget, depth, scope, self.rng.randint(1, 3), None)
+
+            case "cell":
+                type_ = L4.Mutable(oftype=INT)
+                value = L4.HeapAllocate(val=self.integer(budget - 1, depth - 1, scope))
+                return type_, value, _Variable(type=type_)
+
+            case "list":
+                size = self.rng.randint(1, 4)
+                type_, value = L4.List(typeof=INT), L4.NewList(size=size, typeof=INT)
+                if mutable:
+                    type_, value = L4.Mutable(oftype=type_), L4.HeapAllocate(val=value)
+                return type_, value, _Variable(type=type_, size=size)
+
+            case "pair":
+                first, second = self.split(budget - 1, 2)
+                type_ = L4.Pair(type1=INT, type2=INT)
+                value = L4.NewPair(
+                    val1=self.integer(first, depth - 1, scope),
+                    val2=self.integer(second, depth - 1, scope),
+                    typeof=type_,
+                )
+                if mutable:
+                    type_, value = L4.Mutable(oftype=type_), L4.HeapAllocate(val=value)
+                return type_, value, _Variable(type=type_)
+
+            case _:
+                return INT, self.integer(budget, depth, scope), _Variable(type=INT)
+
+    def function(
+        self, budget: int, depth: int, scope: _Scope, arity: int, name: L4.Identifier | None
+    ) -> tuple[L4.Type, L4.Expression, _Variable]:
+        # As in L3.generate: given a name, the function is recursive on its first parameter.
+        parameters = [self.fresh("n" if name is not None and i == 0 else "a") for i in range(arity)]
+        inner = {**scope, **{parameter: _Variable(type=INT) for parameter in parameters}}
+
+        outer = self.work
+        limit = self.work = self.shape.work // (4 * (FUEL + 1) if name is not None else 4)
+        if name is None:
+            body = self.integer(budget - 1, depth - 1, inner)
+        else:
+            result = self.fresh("v")
+            base, rest, *arguments = self.split(max(budget - 6, arity + 1), arity + 1)
+            countdown = L4.Operation(operator="-", left=L4.Reference(name=parameters[0]), right=L4.Immediate(value=1))
+            body = L4.If(
+                condition=L4.Operation(
+                    operator="<", left=L4.Reference(name=parameters[0]), right=L4.Immediate(value=1)
+                ),
+                consequent=self.integer(base, depth - 1, inner),
+                otherwise=L4.Let(
+                    bindings=[
+                        (
+                            result,
+                            INT,
+                            L4.Call(
+                                target=L4.Reference(name=name),
+                                arguments=[countdown, *[self.integer(size, depth - 2, inner) for size in arguments]],
+                            ),
+                        )
+                    ],
+                    body=self.integer(rest, depth - 2, {**inner, result: _Variable(type=INT)}),
+                ),
+            )
+        spent, self.work = limit - self.work, outer
+
+        cost = (FUEL + 1) * (spent + 1) if name is not None else spent + 1
+        type_ = L4.FuncType(parameters=[INT] * arity, result=INT)
+        function = L4.Function(params=[(parameter, INT) for parameter in parameters], body=body)
+        return type_, function, _Variable(type=type_, arity=arity, fuel=name is not None, cost=cost)
+
+    def let(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        count = self.width(budget, depth)
+        *values, body = self.split(budget - 1, count + 1)
+        bindings: list[tuple[L4.Identifier, L4.Type, L4.Expression]] = []
+        local: dict[L4.Identifier, _Variable] = {}
+        for size in values:
+            type_, value, variable = self.value(size, depth - 1, scope)
+            name = self.fresh("f" if isinstance(type_, L4.FuncType) else "x")
+            bindings.append((name, type_, value))
+            local[name] = variable
+        return L4.Let(bindings=bindings, body=self.integer(body, depth - 1, {**scope, **local}))
+
+    def letrec(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        count = self.width(budget, depth)
+        *values, body = self.split(budget - 1, count + 1)
+        bindings: list[tuple[L4.Identifier, L4.Type, L4.Expression]] = []
+        local: dict[L4.Identifier, _Variable] = {}
+        for size in values:
+            name = self.fresh("f")
+            recursive = self.rng.random() < 0.5
+            arity = self.rng.randint(1, 3)
+            type_, value, variable = self.function(
+                size, depth - 1, {**scope, **local}, arity, name if recursive else None
+            )
+            bindings.append((name, type_, value))
+            local[name] = variable
+        return L4.LetRec(bindings=bindings, body=self.integer(body, depth - 1, {**scope, **local}))
+
+    def call(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        name, variable = self.rng.choice(
+            [
+                (name, variable)
+                for name, variable in scope.items()
+                if isinstance(variable.type, L4.FuncType) and variable.cost <= self.work
+            ]
+        )
+        self.work -= variable.cost
+        sizes = self.split(budget - 1, variable.arity)
+        arguments = [self.integer(size, depth - 1, scope) for size in sizes]
+        if variable.fuel:
+            arguments[0] = L4.Immediate(value=self.rng.randint(0, FUEL))
+        return L4.Call(target=L4.Reference(name=name), arguments=arguments)
+
+    def bunch(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        count = self.width(budget, depth)
+        *sizes, value = self.split(budget - 1, count + 1)
+        effects = [self.effect(size, depth - 1, scope) for size in sizes]
+        return L4.Bunch(expressions=[*effects, self.integer(value, depth - 1, scope)])
+
+    def effect(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        # A Void-typed expression: a Set, a loop, or an integer computed for nothing.
+        containers = _containers(scope, mutable=True)
+        loops = budget > 4 and depth > 2 and self.work > FUEL
+        choices = [1.0, self.shape.heap * bool(containers), self.shape.heap * loops]
+        match self.rng.choices(["discard", "set", "loop"], weights=choices)[0]:
+            case "set":
+                name, size = self.rng.choice(containers)
+                return L4.Set(
+                    target=L4.Reference(name=name),
+                    index=self.rng.randrange(size),
+                    value=self.integer(budget - 1, depth - 1, scope),
+                )
+
+            case "loop":
+                return self.loop(budget, depth, scope)
+
+            case _:
+                return L4.Bunch(expressions=[self.integer(budget - 1, depth - 1, scope), L4.Empty()])
+
+    def loop(self, budget: int, depth: int, scope: _Scope) -> L4.Expression:
+        # At most FUEL iterations, each a call of the function the loop becomes.
+        outer = self.work
+        limit = self.work = outer // (FUEL + 1) - 1
+        run = self.effect(budget - 4, depth - 2, scope)
+        self.work = outer - (FUEL + 1) * (limit - self.work + 1)
+
+        times = self.rng.randint(1, FUEL)
+        if self.rng.random() < 0.5:
+            return L4.For(times=times, run=run)
+
+        counter = self.fresh("c")
+        current = L4.Get(target=L4.Reference(name=counter), index=0)
+        return L4.Let(
+            bindings=[(counter, L4.Mutable(oftype=INT), L4.HeapAllocate(val=L4.Immediate(value=times)))],
+            body=L4.While(
+                condition=L4.Operation(operator="<", left=L4.Immediate(value=0), right=current),
+                run=L4.Bunch(
+                    expressions=[
+                        L4.Set(
+                            target=L4.Reference(name=counter),
+                            index=0,
+                            value=L4.Operation(operator="-", left=current, right=L4.Immediate(value=1)),
+                        ),
+                        run,
+                    ]
+                ),
+            ),
+        )
+
+
+def generate_program(seed: int, shape: Shape = Shape()) -> L4.Program:
+    generator = _Generator(shape, seed)
+    definitions: list[tuple[L4.Identifier, L4.Type, L4.Expression]] = []
+    scope: dict[L4.Identifier, _Variable] = {}
+    for size in generator.split(max(shape.size // 4, 1), generator.rng.randint(1, 3)):
+        type_, value, variable = generator.value(size, shape.depth - 1, {})
+        name = generator.fresh("d")
+        definitions.append((name, type_, value))
+        scope[name] = variable
+    body = generator.integer(shape.size - shape.size // 4, shape.depth, scope)
+    return L4.Program(definitions=definitions, body=body)
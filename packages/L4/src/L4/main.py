@@ -1,14 +1,27 @@
+from collections.abc import Sequence
 from pathlib import Path
 
 import click
-from L1.to_python import to_ast_program
-from L2.cps_convert import cps_convert_program
-from L2.optimize import optimize_program
-from L3.check import check_program
-from L3.eliminate_letrec import eliminate_letrec_program
-from L3.uniqify import uniqify_program
+from L3.pipeline import DEFAULT_BACKEND, pipeline_options, register_passes, run_passes, select_passes
+from util.pass_manager import Pass, PassManager
 
-from L4.convert import convert_to_l3, dummy_parse
+from L4.convert import convert_to_l3
+from L4.parse import parse_program
+
+
+def build_pass_manager(backend: str = DEFAULT_BACKEND) -> PassManager:
+    manager = PassManager(source="l4", target="python")
+    manager.register(
+        Pass(
+            name="convert",
+            source="l4",
+            target="l3",
+            run=lambda program, session: convert_to_l3(program, check=session.options.get("check", True)),
+            description="type check and lower to L3",
+        )
+    )
+    register_passes(manager, backend)
+    return manager
 
 
 @click.command(
@@ -17,18 +30,7 @@ from L4.convert import convert_to_l3, dummy_parse
         max_content_width=120,
     ),
 )
-@click.option(
-    "--check/--no-check",
-    default=True,
-    show_default=True,
-    help="Enable or disable semantic analysis",
-)
-@click.option(
-    "--optimize/--no-optimize",
-    default=True,
-    show_default=True,
-    help="Enable or disable optimization",
-)
+@pipeline_options(build_pass_manager)
 @click.option(
     "-o",
     "--output",
@@ -43,24 +45,29 @@ from L4.convert import convert_to_l3, dummy_parse
 def main(
     output: Path | None,
     check: bool,
-    optimize: bool,
+    level: int,
+    enable_pass: Sequence[str],
+    disable_pass: Sequence[str],
+    pass_order: str | None,
+    selective_cps: bool,
+    trampoline: bool,
+    instrument: bool,
+    backend: str,
     input: Path,
 ) -> None:
-    l4 = dummy_parse(input.read_text())
-    l3 = convert_to_l3(l4)
-
-    if check:
-        check_program(l3)
-
-    fresh, l3 = uniqify_program(l3)
-
-    l2 = eliminate_letrec_program(l3)
-
-    if optimize:
-        l2 = optimize_program(l2)
+    manager = build_pass_manager(backend)
+    # --no-check skips both the L4 checker in the convert pass and the L3 check of its output.
+    passes = select_passes(manager, check, level, enable_pass, disable_pass, pass_order)
+    options = {
+        "check": check,
+        "selective_cps": selective_cps,
+        "trampoline": trampoline,
+        "instrument": instrument,
+        "backend": backend,
+    }
 
-    l1 = cps_convert_program(l2, fresh)
+    l4 = parse_program(input.read_text())
 
-    module = to_ast_program(l1)
+    module = run_passes(manager, l4, passes, options)
 
     (output or input.with_suffix(".py")).write_text(module)
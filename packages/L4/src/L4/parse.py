@@ -0,0 +1,295 @@
+from collections.abc import Callable, Sequence
+from functools import cache
+from pathlib import Path
+
+from lark import Lark, Token, Transformer
+from lark.exceptions import UnexpectedInput
+from lark.visitors import v_args  # pyright: ignore[reportUnknownVariableType]
+from pydantic import ValidationError
+
+from .syntax import (
+    Bool,
+    Bunch,
+    Call,
+    Capsule,
+    Empty,
+    Expression,
+    For,
+    Function,
+    FuncType,
+    Get,
+    HeapAllocate,
+    Identifier,
+    If,
+    Immediate,
+    Int,
+    Let,
+    LetRec,
+    List,
+    Mutable,
+    NewList,
+    NewPair,
+    Operation,
+    Pair,
+    Program,
+    Reference,
+    Set,
+    Symbol,
+    Type,
+    Void,
+    While,
+)
+
+type Binding = tuple[Identifier, Type, Expression]
+
+
+class ParseError(UnexpectedInput):
+    """A form that parses but holds a value its model rejects, such as a list of size 0."""
+
+    def __init__(self, token: Token, message: str) -> None:
+        self.token = token
+        self.line, self.column, self.pos_in_stream = token.line, token.column, token.start_pos
+        super().__init__(f"{message}: {token!s} at line {token.line}, column {token.column}")
+
+
+def _at[T](token: Token, build: Callable[[], T]) -> T:
+    # The syntax models hold the constraints; their first complaint is reported at the token the value came from.
+    try:
+        return build()
+    except ValidationError as error:
+        raise ParseError(token, error.errors()[0]["msg"]) from error
+
+
+@v_args(inline=True)
+class AstTransformer(Transformer[Token, Program | Type | Expression]):
+    # Applied by the LALR parser as it reduces each rule, so no parse tree is built. Keywords other than `for` are
+    # filtered out; every method receives the remaining tokens and the values of its subforms.
+
+    def program(self, definitions: Sequence[Binding], body: Expression) -> Program:
+        return Program(definitions=definitions, body=body)
+
+    def binding(self, name: Token, type_: Type, value: Expression) -> Binding:
+        return str(name), type_, value
+
+    def bindings(self, *bindings: Binding) -> Sequence[Binding]:
+        return list(bindings)
+
+    def parameter(self, name: Token, type_: Type) -> tuple[Identifier, Type]:
+        return str(name), type_
+
+    def int_(self) -> Type:
+        return Int()
+
+    def bool_(self) -> Type:
+        return Bool()
+
+    def void(self) -> Type:
+        return Void()
+
+    def mutable(self, oftype: Type) -> Type:
+        return Mutable(oftype=oftype)
+
+    def functype(self, *types: Type) -> Type:
+        return FuncType(parameters=list(types[:-1]), result=types[-1])
+
+    def list_(self, typeof: Type) -> Type:
+        return List(typeof=typeof)
+
+    def pair(self, type1: Type, type2: Type) -> Type:
+        return Pair(type1=type1, type2=type2)
+
+    def symbol(self, name: Token, payload: Type) -> Type:
+        return _at(name, lambda: Symbol(name=str(name), payload=payload))
+
+    def reference(self, name: Token) -> Expression:
+        return Reference(name=str(name))
+
+    def integer(self, value: Token) -> Expression:
+        return Immediate(value=int(value))
+
+    def true(self) -> Expression:
+        return Immediate(value=True)
+
+    def false(self) -> Expression:
+        return Immediate(value=False)
+
+    def none(self) -> Expression:
+        return Immediate(value=None)
+
+    def function(self, *children: tuple[Identifier, Type] | Expression) -> Expression:
+        *params, body = children
+        return Function(params=params, body=body)  # pyright: ignore[reportArgumentType]
+
+    def if_(self, condition: Expression, consequent: Expression, otherwise: Expression) -> Expression:
+        return If(condition=condition, consequent=consequent, otherwise=otherwise)
+
+    def let(self, bindings: Sequence[Binding], body: Expression) -> Expression:
+        return Let(bindings=bindings, body=body)
+
+    def letrec(self, bindings: Sequence[Binding], body: Expression) -> Expression:
+        return LetRec(bindings=bindings, body=body)
+
+    def operation(self, operator: Token, left: Expression, right: Expression) -> Expression:
+        return Operation(operator=operator.value, left=left, right=right)  # pyright: ignore[reportArgumentType]
+
+    def call(self, target: Expression, *arguments: Expression) -> Expression:
+        return Call(target=target, arguments=list(arguments))
+
+    def empty(self) -> Expression:
+        return Empty()
+
+    def newlist(self, size: Token, typeof: Type) -> Expression:
+        return _at(size, lambda: NewList(size=int(size), typeof=typeof))
+
+    def newpair(self, val1: Expression, val2: Expression, typeof: Type) -> Expression:
+        return NewPair(val1=val1, val2=val2, typeof=typeof)
+
+    def heapallocate(self, val: Expression) -> Expression:
+        return HeapAllocate(val=val)
+
+    def get(self, target: Token, index: Token) -> Expression:
+        return _at(index, lambda: Get(target=Reference(name=str(target)), index=int(index)))
+
+    def set_(self, target: Token, index: Token, value: Expression) -> Expression:
+        return _at(index, lambda: Set(target=Reference(name=str(target)), index=int(index), value=value))
+
+    def capsule(self, typeof: Type, expression: Expression) -> Expression:
+        return Capsule(typeof=typeof, expression=expression)
+
+    def while_(self, condition: Expression, run: Expression) -> Expression:
+        return While(condition=condition, run=run)
+
+    def for_(self, keyword: Token, times: Expression, run: Expression) -> Expression:
+        # A literal count is the constant form of `times`; both convert the same way. Its token is gone by now, so a
+        # count that is not positive is reported at the keyword.
+        match times:
+            case Immediate(value=int(value)) if not isinstance(value, bool):
+                return _at(keyword, lambda: For(times=value, run=run))
+            case _:
+                return For(times=times, run=run)
+
+    def bunch(self, *expressions: Expression) -> Expression:
+        return Bunch(expressions=list(expressions))
+
+
+@cache
+def _parser() -> Lark:
+    # Building the LALR tables dominates parsing small inputs, so the parser is built once per process.
+    grammar = Path(__file__).with_name("L4.lark").read_text()
+    return Lark(grammar, start="program", parser="lalr", transformer=AstTransformer())
+
+
+def parse_program(source: str) -> Program:
+    return _parser().parse(source)  # pyright: ignore[reportReturnType, reportUnknownMemberType]
+
+
+def unparse_type(type_: Type) -> str:
+    match type_:
+        case Int():
+            return "int"
+
+        case Bool():
+            return "bool"
+
+        case Void():
+            return "void"
+
+        case Mutable(oftype=oftype):
+            return f"(mutable {unparse_type(oftype)})"
+
+        case FuncType(parameters=parameters, result=result):
+            return (
+                f"(functype ({' '.join(unparse_type(parameter) for parameter in parameters)}) {unparse_type(result)})"
+            )
+
+        case List(typeof=typeof):
+            return f"(list {unparse_type(typeof)})"
+
+        case Pair(type1=type1, type2=type2):
+            return f"(pair {unparse_type(type1)} {unparse_type(type2)})"
+
+        case Symbol(name=name, payload=payload):  # pragma: no branch
+            return f"(symbol {name} {unparse_type(payload)})"
+
+
+def _unparse_bindings(bindings: Sequence[Binding]) -> str:
+    return f"({' '.join(f'({name} {unparse_type(type_)} {unparse_expression(value)})' for name, type_, value in bindings)})"
+
+
+def unparse_expression(expression: Expression) -> str:
+    # The concrete syntax parse_program reads back.
+    match expression:
+        case Reference(name=name):
+            return name
+
+        case Immediate(value=True):
+            return "true"
+
+        case Immediate(value=False):
+            return "false"
+
+        case Immediate(value=None):
+            return "none"
+
+        case Immediate(value=value):
+            return str(value)
+
+        case Function(params=params, body=body):
+            parameters = " ".join(f"({name} {unparse_type(type_)})" for name, type_ in params)
+            return f"(function ({parameters}) {unparse_expression(body)})"
+
+        case If(condition=condition, consequent=consequent, otherwise=otherwise):
+            return (
+                f"(if {unparse_expression(condition)} {unparse_expression(consequent)} {unparse_expression(otherwise)})"
+            )
+
+        case Let(bindings=bindings, body=body):
+            return f"(let {_unparse_bindings(bindings)} {unparse_expression(body)})"
+
+        case LetRec(bindings=bindings, body=body):
+            return f"(letrec {_unparse_bindings(bindings)} {unparse_expression(body)})"
+
+        case Operation(operator=operator, left=left, right=right):
+            return f"({operator} {unparse_expression(left)} {unparse_expression(right)})"
+
+        case Call(target=target, arguments=list(arguments)):
+            return f"({' '.join(unparse_expression(child) for child in [target, *arguments])})"
+
+        case Empty():
+            return "(empty)"
+
+        case NewList(size=size, typeof=typeof):
+            return f"(newlist {size} {unparse_type(typeof)})"
+
+        case NewPair(val1=val1, val2=val2, typeof=typeof):
+            return f"(newpair {unparse_expression(val1)} {unparse_expression(val2)} {unparse_type(typeof)})"
+
+        case HeapAllocate(val=val):
+            return f"(heapallocate {unparse_expression(val)})"
+
+        case Get(target=Reference(name=name), index=index):
+            return f"(get {name} {index})"
+
+        case Set(target=Reference(name=name), index=index, value=value):
+            return f"(set {name} {index} {unparse_expression(value)})"
+
+        case Capsule(typeof=typeof, expression=expression):
+            return f"(capsule {unparse_type(typeof)} {unparse_expression(expression)})"
+
+        case While(condition=condition, run=run):
+            return f"(while {unparse_expression(condition)} {unparse_expression(run)})"
+
+        case For(times=int(times), run=run):
+            return f"(for {times} {unparse_expression(run)})"
+
+        case For(times=times, run=run):
+            return f"(for {unparse_expression(times)} {unparse_expression(run)})"  # pyright: ignore[reportArgumentType]
+
+        case Bunch(expressions=expressions):  # pragma: no branch
+            return f"(bunch {' '.join(unparse_expression(child) for child in expressions)})"
+
+
+def unparse_program(program: Program) -> str:
+    match program:
+        case Program(definitions=definitions, body=body):  # pragma: no branch
+            return f"(l4 {_unparse_bindings(definitions)} {unparse_expression(body)})"
@@ -1,4 +1,6 @@
 import pytest
+from L3.evaluate import compile_program
+from L3.generate import Shape
 from L3.syntax import (
     Abstract,
     Allocate,
@@ -15,7 +17,17 @@ from L3.syntax import (
     Store,
 )
 from L4 import syntax as L4
-from L4.convert import SequentialNameGenerator, check_expression, convert_to_l3, process_expression
+from L4.generate import generate_program
+from L4.convert import (
+    SequentialNameGenerator,
+    Layout,
+    TypeTable,
+    assert_type_equality,
+    check_expression,
+    check_program,
+    convert_to_l3,
+    process_expression,
+)
 
 
 def test_fibonacci():
@@ -62,7 +74,7 @@ def test_fibonacci():
     actual = convert_to_l3(program=program)
     expected = Program(
         parameters=[],
-        body=Let(
+        body=LetRec(
             bindings=[
                 (
                     "fibo",
@@ -445,39 +457,7 @@ def test_symbol_lookup_and_lists_and_pairs():
                         bindings=[
                             (
                                 "heapallocateval0",
-                                Let(
-                                    bindings=[("list0", Allocate(count=5))],
-                                    body=Begin(
-                                        effects=[
-                                            Store(
-                                                base=Reference(name="list0"),
-                                                index=0,
-                                                value=Immediate(value=0),
-                                            ),
-                                            Store(
-                                                base=Reference(name="list0"),
-                                                index=1,
-                                                value=Immediate(value=0),
-                                            ),
-                                            Store(
-                                                base=Reference(name="list0"),
-                                                index=2,
-                                                value=Immediate(value=0),
-                                            ),
-                                            Store(
-                                                base=Reference(name="list0"),
-                                                index=3,
-                                                value=Immediate(value=0),
-                                            ),
-                                            Store(
-                                                base=Reference(name="list0"),
-                                                index=4,
-                                                value=Immediate(value=0),
-                                            ),
-                                        ],
-                                        value=Reference(name="list0"),
-                                    ),
-                                ),
+                                Allocate(count=5, fill=0),
                             ),
                             ("heapallocate0", Allocate(count=1)),
                         ],
@@ -809,28 +789,7 @@ def test_symbol_lookup_and_lists_and_pairs():
                 ("a", Immediate(tag="immediate", value=0)),
                 (
                     "b",
-                    Let(
-                        tag="let",
-                        bindings=[("list0", Allocate(tag="allocate", count=2))],
-                        body=Begin(
-                            tag="begin",
-                            effects=[
-                                Store(
-                                    tag="store",
-                                    base=Reference(tag="reference", name="list0"),
-                                    index=0,
-                                    value=Immediate(tag="immediate", value=0),
-                                ),
-                                Store(
-                                    tag="store",
-                                    base=Reference(tag="reference", name="list0"),
-                                    index=1,
-                                    value=Immediate(tag="immediate", value=0),
-                                ),
-                            ],
-                            value=Reference(tag="reference", name="list0"),
-                        ),
-                    ),
+                    Allocate(tag="allocate", count=2, fill=0),
                 ),
             ],
             body=LetRec(
@@ -1164,3 +1123,100 @@ def test_edge_cases():
             context={},
             symbols={},
         )
+
+
+def test_type_table():
+    types = TypeTable()
+    pair = L4.Pair(type1=L4.Int(), type2=L4.FuncType(parameters=[L4.Bool()], result=L4.Void()))
+    same = L4.Pair(type1=L4.Int(), type2=L4.FuncType(parameters=(L4.Bool(),), result=L4.Void()))
+    other = L4.Pair(type1=L4.Int(), type2=L4.FuncType(parameters=[], result=L4.Void()))
+
+    assert types.intern(pair) is pair
+    assert types.intern(same) is pair
+    assert types.intern(other) is other
+
+    symbols = {"point": pair}
+    symbol = L4.Symbol(name="point", payload=L4.Int())
+    assert types.resolve(symbol, symbols) is pair
+    assert types.resolve(symbol, {}) is types.intern(L4.Int())
+    assert_type_equality(symbol, same, symbols=symbols, types=types)
+    with pytest.raises(ValueError):
+        assert_type_equality(symbol, other, symbols=symbols, types=types)
+
+    with pytest.raises(ValueError):
+        types.resolve(L4.Symbol(name="a", payload=L4.Int()), {"a": L4.Symbol(name="a", payload=L4.Int())})
+
+
+def test_layouts():
+    # Lowering with the layouts the checker recorded gives what deriving them again does.
+    for seed in range(10):
+        program = generate_program(seed, Shape(size=100))
+        assert convert_to_l3(program) == convert_to_l3(program, check=False)
+
+    cell = L4.Get(target=L4.Reference(name="x"), index=0)
+    program = L4.Program(
+        definitions=[
+            ("x", L4.Mutable(oftype=L4.List(typeof=L4.Int())), L4.HeapAllocate(val=L4.NewList(size=2, typeof=L4.Int())))
+        ],
+        body=cell,
+    )
+    types = TypeTable()
+    check_program(program, types=types)
+    assert types.layout(cell) == Layout(loads=1, indexed=True)
+
+    types.annotate(cell, Layout(loads=0, indexed=True))
+    assert types.layout(cell) is None
+
+
+def test_recursive_definitions():
+    # Definitions that refer to each other are bound by a letrec, and the others by a let.
+    program = L4.Program(
+        definitions=[
+            (
+                "f",
+                L4.FuncType(parameters=[], result=L4.Int()),
+                L4.Function(params=[], body=L4.Call(target=L4.Reference(name="g"), arguments=[])),
+            ),
+            ("g", L4.FuncType(parameters=[], result=L4.Int()), L4.Function(params=[], body=L4.Immediate(value=1))),
+        ],
+        body=L4.Call(target=L4.Reference(name="f"), arguments=[]),
+    )
+    assert isinstance(convert_to_l3(program).body, LetRec)
+    assert compile_program(convert_to_l3(program))() == 1
+
+    program = L4.Program(definitions=[("x", L4.Int(), L4.Immediate(value=1))], body=L4.Reference(name="x"))
+    assert isinstance(convert_to_l3(program).body, Let)
+
+
+def test_definition_order():
+    # A definition sees the ones before it, and the ones after it only inside a function body.
+    later = L4.Program(
+        definitions=[
+            ("x", L4.Int(), L4.Operation(operator="+", left=L4.Reference(name="y"), right=L4.Immediate(value=1))),
+            ("y", L4.Int(), L4.Immediate(value=2)),
+        ],
+        body=L4.Reference(name="x"),
+    )
+    with pytest.raises(ValueError, match="unknown variable: y"):
+        check_program(later)
+
+    earlier = L4.Program(definitions=[*reversed(later.definitions)], body=L4.Reference(name="x"))
+    check_program(earlier)
+    assert compile_program(convert_to_l3(earlier))() == 3
+
+    # A binding of the body shadows a later definition inside a function.
+    shadowed = L4.Program(
+        definitions=[
+            (
+                "f",
+                L4.FuncType(parameters=[], result=L4.Bool()),
+                L4.Let(
+                    bindings=[("y", L4.Bool(), L4.Immediate(value=True))],
+                    body=L4.Function(params=[], body=L4.Reference(name="y")),
+                ),
+            ),
+            ("y", L4.Int(), L4.Immediate(value=2)),
+        ],
+        body=L4.Call(target=L4.Reference(name="f"), arguments=[]),
+    )
+    check_program(shadowed)
@@ -0,0 +1,29 @@
+from L3.evaluate import compile_program
+from L3.generate import Shape
+from L3.pipeline import build_pass_manager, compile_to_callable
+from L4.convert import check_program, convert_to_l3
+from L4.generate import generate_program
+from L4.syntax import Program
+
+
+def test_generate_seeded():
+    assert generate_program(7) == generate_program(7)
+    assert generate_program(7) != generate_program(8)
+
+    program = generate_program(0, Shape(size=500))
+    assert Program.model_validate_json(program.model_dump_json()) == program
+
+
+def test_generate_runs():
+    # Generated programs type check and compute the same result on the evaluator and on both backends.
+    for seed in range(10):
+        program = generate_program(seed, Shape(size=60))
+        check_program(program)
+
+        l3 = convert_to_l3(program)
+        expected = compile_program(l3)()
+        for backend in ("l1-nested", "l0-flat"):
+            manager = build_pass_manager(backend)
+            for level in (0, manager.max_level):
+                entry = compile_to_callable(l3, manager, manager.schedule(level=level), {"backend": backend})
+                assert entry() == expected
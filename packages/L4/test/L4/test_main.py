@@ -0,0 +1,95 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from click.testing import CliRunner
+from L3.evaluate import compile_program
+from L3.pipeline import build_pass_manager as build_l3_pass_manager
+from L3.pipeline import compile_to_callable
+from L3.syntax import Apply, Immediate, Let, Program, Reference
+from L4 import syntax as L4
+from L4.convert import convert_to_l3
+from L4.main import build_pass_manager, main
+from L4.parse import parse_program
+
+
+def test_build_pass_manager():
+    manager = build_pass_manager()
+
+    actual = [pass_.name for pass_ in manager.schedule(level=1)]
+
+    assert actual == ["convert", "check", "uniqify", "eliminate_letrec", "optimize", "cps_convert", "to_python"]
+
+    manager = build_pass_manager("l0-flat")
+
+    actual = [pass_.name for pass_ in manager.schedule(level=1)]
+
+    assert actual[-4:] == ["cps_convert", "close", "coalesce", "to_python"]
+
+
+def test_convert_pass():
+    manager = build_pass_manager()
+    program = L4.Program(
+        definitions=[
+            (
+                "f",
+                L4.FuncType(parameters=[], result=L4.Int()),
+                L4.Function(params=[], body=L4.Immediate(value=1)),
+            )
+        ],
+        body=L4.Call(target=L4.Reference(name="f"), arguments=[]),
+    )
+
+    actual = manager.run(program, [manager.lookup("convert")])
+
+    assert isinstance(actual, Program)
+    assert isinstance(actual.body, Let)
+    assert actual.body.body == Apply(target=Reference(name="f"), arguments=[])
+    assert actual.body.bindings[0][1].body == Immediate(value=1)
+
+    module = manager.run(program, manager.schedule(level=1))
+    assert "def l1(" in module
+
+
+def test_main_check(tmp_path: Path):
+    # Definitions refer to later ones only inside function bodies; a value that reads one before it is stored is
+    # rejected when compiling rather than failing when run.
+    source = tmp_path / "program.l4"
+    output = tmp_path / "program.py"
+    source.write_text("(l4 ((f (functype () int) (function () (g))) (g (functype () int) (function () 7))) (f))")
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["-o", str(output), str(source)])
+    assert result.exit_code == 0
+    completed = subprocess.run([sys.executable, str(output)], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "7"
+
+    source.write_text("(l4 ((x int (+ y 1)) (y int 2)) x)")
+    result = runner.invoke(main, ["-o", str(output), str(source)])
+    assert isinstance(result.exception, ValueError)
+    assert str(result.exception) == "unknown variable: y"
+
+    source.write_text("(l4 () (+ 1 true))")
+    result = runner.invoke(main, ["-o", str(output), str(source)])
+    assert isinstance(result.exception, ValueError)
+
+    result = runner.invoke(main, ["--no-check", "-o", str(output), str(source)])
+    assert result.exit_code == 0
+
+
+def test_newlist_filled():
+    # A list is one filled allocation however long it is, on the evaluator and on both backends.
+    program = parse_program(
+        "(l4 ((l (mutable (list int)) (heapallocate (newlist 100000 int)))) "
+        "(bunch (set l 99999 5) (+ (get l 0) (get l 99999))))"
+    )
+
+    l3 = convert_to_l3(program)
+    assert '{"tag":"allocate","count":100000,"fill":0' in l3.model_dump_json()
+    assert len(l3.model_dump_json()) < 2000
+
+    assert compile_program(l3)() == 5
+    for backend in ("l1-nested", "l0-flat"):
+        manager = build_l3_pass_manager(backend)
+        entry = compile_to_callable(l3, manager, manager.schedule(level=1), {"backend": backend})
+        assert entry() == 5
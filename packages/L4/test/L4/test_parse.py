@@ -0,0 +1,170 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from L3.generate import Shape
+from L4 import syntax as L4
+from L4.generate import generate_program
+from L4.main import main
+from L4.parse import ParseError, parse_program, unparse_program
+from lark.exceptions import UnexpectedInput
+
+EXAMPLES = Path(__file__).parents[2] / "examples"
+
+
+def test_parse_types():
+    source = "(l4 ((x (functype (int (mutable bool) (list void) (pair int (symbol point (pair int int)))) int) f)) x)"
+
+    expected = L4.Program(
+        definitions=[
+            (
+                "x",
+                L4.FuncType(
+                    parameters=[
+                        L4.Int(),
+                        L4.Mutable(oftype=L4.Bool()),
+                        L4.List(typeof=L4.Void()),
+                        L4.Pair(
+                            type1=L4.Int(),
+                            type2=L4.Symbol(name="point", payload=L4.Pair(type1=L4.Int(), type2=L4.Int())),
+                        ),
+                    ],
+                    result=L4.Int(),
+                ),
+                L4.Reference(name="f"),
+            )
+        ],
+        body=L4.Reference(name="x"),
+    )
+
+    actual = parse_program(source)
+
+    assert actual == expected
+
+
+def test_parse_expressions():
+    source = """
+        (l4 ()
+          (bunch
+            (let ((p (pair int int) (newpair -1 true (pair int int)))
+                  (l (list int) (newlist 3 int)))
+              (capsule int (get p 0)))
+            (letrec ((f (functype () void) (function () (empty))))
+              (f))
+            (set l 2 (heapallocate none))
+            (if false 1 (* 2 3))
+            (while (< 0 x) (empty))
+            (for 3 (empty))
+            (for (- n 1) (empty))
+            (g 1 (+ 2 x))))
+    """
+
+    expected = L4.Program(
+        definitions=[],
+        body=L4.Bunch(
+            expressions=[
+                L4.Let(
+                    bindings=[
+                        (
+                            "p",
+                            L4.Pair(type1=L4.Int(), type2=L4.Int()),
+                            L4.NewPair(
+                                val1=L4.Immediate(value=-1),
+                                val2=L4.Immediate(value=True),
+                                typeof=L4.Pair(type1=L4.Int(), type2=L4.Int()),
+                            ),
+                        ),
+                        ("l", L4.List(typeof=L4.Int()), L4.NewList(size=3, typeof=L4.Int())),
+                    ],
+                    body=L4.Capsule(typeof=L4.Int(), expression=L4.Get(target=L4.Reference(name="p"), index=0)),
+                ),
+                L4.LetRec(
+                    bindings=[
+                        (
+                            "f",
+                            L4.FuncType(parameters=[], result=L4.Void()),
+                            L4.Function(params=[], body=L4.Empty()),
+                        )
+                    ],
+                    body=L4.Call(target=L4.Reference(name="f"), arguments=[]),
+                ),
+                L4.Set(
+                    target=L4.Reference(name="l"),
+                    index=2,
+                    value=L4.HeapAllocate(val=L4.Immediate(value=None)),
+                ),
+                L4.If(
+                    condition=L4.Immediate(value=False),
+                    consequent=L4.Immediate(value=1),
+                    otherwise=L4.Operation(operator="*", left=L4.Immediate(value=2), right=L4.Immediate(value=3)),
+                ),
+                L4.While(
+                    condition=L4.Operation(operator="<", left=L4.Immediate(value=0), right=L4.Reference(name="x")),
+                    run=L4.Empty(),
+                ),
+                L4.For(times=3, run=L4.Empty()),
+                L4.For(
+                    times=L4.Operation(operator="-", left=L4.Reference(name="n"), right=L4.Immediate(value=1)),
+                    run=L4.Empty(),
+                ),
+                L4.Call(
+                    target=L4.Reference(name="g"),
+                    arguments=[
+                        L4.Immediate(value=1),
+                        L4.Operation(operator="+", left=L4.Immediate(value=2), right=L4.Reference(name="x")),
+                    ],
+                ),
+            ]
+        ),
+    )
+
+    actual = parse_program(source)
+
+    assert actual == expected
+
+
+def test_parse_invalid():
+    for source in ["(l4 () (let x))", "(l4 () (get (f) 0))", "(l4 () (if 1 2))"]:
+        with pytest.raises(UnexpectedInput):
+            parse_program(source)
+
+
+def test_parse_out_of_range():
+    long = "s" * 33
+    for source, position in [
+        ("(l4 () (newlist 0 int))", (1, 17)),
+        ("(l4 ()\n  (capsule (symbol " + long + " int) 1))", (2, 20)),
+        ("(l4 () (get l -1))", (1, 15)),
+        ("(l4 () (set l -1 0))", (1, 15)),
+        ("(l4 () (for -3 (empty)))", (1, 9)),
+        ("(l4 () (for 0 (empty)))", (1, 9)),
+    ]:
+        with pytest.raises(ParseError) as raised:
+            parse_program(source)
+
+        assert (raised.value.line, raised.value.column) == position
+        assert isinstance(raised.value, UnexpectedInput)
+
+    assert parse_program("(l4 () (for (- 0 3) (empty)))").body == L4.For(
+        times=L4.Operation(operator="-", left=L4.Immediate(value=0), right=L4.Immediate(value=3)), run=L4.Empty()
+    )
+
+
+def test_unparse_round_trip():
+    for seed in range(20):
+        program = generate_program(seed, Shape(size=200))
+
+        assert parse_program(unparse_program(program)) == program
+
+
+def test_main(tmp_path: Path):
+    output = tmp_path / "fib.py"
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["-o", str(output), str(EXAMPLES / "fib.l4")])
+    assert result.exit_code == 0
+
+    completed = subprocess.run([sys.executable, str(output)], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "55"
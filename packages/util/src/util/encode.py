@@ -1,5 +1,7 @@
 import keyword
 
+from .runtime import RESERVED
+
 
 def encode(name: str) -> str:
     def escape(c: str) -> str:
@@ -16,6 +18,10 @@ def encode(name: str) -> str:
     if keyword.iskeyword(encoded):
         encoded = "_" + encoded
 
+    # Names the generated code defines for itself; escaping the leading underscore keeps them apart.
+    if encoded.startswith(RESERVED):
+        encoded = f"_x{ord('_'):02X}_" + encoded[1:]
+
     if not encoded.isidentifier():
         raise ValueError(f"Encoding failed: {encoded!r} is not a valid identifier")
 
@@ -0,0 +1,87 @@
+import ast
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+# Execution counters shared by the L1 and L0 code generators.
+#
+# Every instrumented site gets an index into `_counters`, a list of integers allocated once per module, and bumps
+# its entry with a single `_counters[i] += 1`. Sites are function entries (counted per call, and per iteration of a
+# function compiled to a loop), allocations, loads and stores. `_sites` names the kind and source of every index,
+# and `_report` prints the counters that moved, most frequent first, to stderr. The module stays self-contained:
+# the report is generated code like the rest of it. A module written out registers the report to run when the
+# interpreter exits; a module compiled in memory does not, since every compilation would add another handler, and
+# its caller prints the report with `report` when it is done.
+
+COUNTERS = "_counters"
+REPORT = "_report"
+
+KINDS = ("calls", "allocations", "loads", "stores")
+
+# Sites are numbered in the report because several can share a label, such as loads of the same slot.
+_REPORT = f"""
+def _report():
+    import sys
+    for kind in {KINDS!r}:
+        rows = [
+            (count, site, label)
+            for site, ((of, label), count) in enumerate(zip(_sites, _counters))
+            if of == kind and count
+        ]
+        if rows:
+            print(f'{{kind}}:', file=sys.stderr)
+        for count, site, label in sorted(rows, key=lambda row: -row[0]):
+            print(f'{{count:>12}}  #{{site:<5}} {{label}}', file=sys.stderr)
+"""
+
+_AT_EXIT = """
+import atexit
+atexit.register(_report)
+"""
+
+
+@dataclass
+class Sites:
+    sites: list[tuple[str, str]] = field(default_factory=list[tuple[str, str]])
+
+    def count(self, kind: str, label: str) -> ast.stmt:
+        if kind not in KINDS:
+            raise ValueError(f"unknown counter kind: {kind}")
+        self.sites.append((kind, label))
+        return ast.AugAssign(
+            target=ast.Subscript(
+                value=ast.Name(id=COUNTERS, ctx=ast.Load()),
+                slice=ast.Constant(len(self.sites) - 1),
+                ctx=ast.Store(),
+            ),
+            op=ast.Add(),
+            value=ast.Constant(1),
+        )
+
+
+def counted(sites: Sites | None, kind: str, label: str) -> list[ast.stmt]:
+    return [] if sites is None else [sites.count(kind, label)]
+
+
+def instrumentation(sites: Sites, at_exit: bool = True) -> list[ast.stmt]:
+    return [
+        ast.Assign(
+            targets=[ast.Name(id=COUNTERS, ctx=ast.Store())],
+            value=ast.BinOp(
+                left=ast.List(elts=[ast.Constant(0)], ctx=ast.Load()),
+                op=ast.Mult(),
+                right=ast.Constant(len(sites.sites)),
+            ),
+        ),
+        ast.Assign(
+            targets=[ast.Name(id="_sites", ctx=ast.Store())],
+            value=ast.Constant(tuple(sites.sites)),
+        ),
+        *ast.parse(_REPORT).body,
+        *(ast.parse(_AT_EXIT).body if at_exit else []),
+    ]
+
+
+def report(entry: Callable[..., Any]) -> None:
+    # Prints the counters of the module an instrumented entry point was compiled in.
+    entry.__globals__[REPORT]()
@@ -0,0 +1,127 @@
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from .sequential_name_generator import SequentialNameGenerator
+
+type Cost = Literal["linear", "quadratic"]
+
+
+@dataclass
+class Session:
+    fresh: Callable[[str], str] = field(default_factory=SequentialNameGenerator)
+    # Code generation switches from the command line, read by the passes they concern.
+    options: Mapping[str, Any] = field(default_factory=dict[str, Any])
+    # Human-readable reports produced by passes, keyed by pass name.
+    reports: dict[str, str] = field(default_factory=dict[str, str])
+    # Files to write next to the output, keyed by the suffix added to its name.
+    sidecars: dict[str, str] = field(default_factory=dict[str, str])
+
+
+type Run = Callable[[Any, Session], Any]
+
+
+@dataclass(frozen=True)
+class Pass:
+    name: str
+    source: str
+    target: str
+    run: Run
+    cost: Cost = "linear"
+    # Lowest -O level that enables the pass; None marks a pass every pipeline must run.
+    level: int | None = None
+    requires: Sequence[str] = ()
+    description: str = ""
+
+    @property
+    def required(self) -> bool:
+        return self.level is None
+
+
+class PassManager:
+    def __init__(self, source: str, target: str) -> None:
+        self.source = source
+        self.target = target
+        self._passes: dict[str, Pass] = {}
+
+    @property
+    def passes(self) -> Sequence[Pass]:
+        return list(self._passes.values())
+
+    def register(self, pass_: Pass) -> None:
+        if pass_.name in self._passes:
+            raise ValueError(f"duplicate pass: {pass_.name}")
+        self._passes[pass_.name] = pass_
+
+    @property
+    def max_level(self) -> int:
+        # The highest -O level that enables a pass; a level above it would schedule nothing more.
+        return max((pass_.level for pass_ in self._passes.values() if pass_.level is not None), default=0)
+
+    def lookup(self, name: str) -> Pass:
+        if name not in self._passes:
+            raise ValueError(f"unknown pass: {name}")
+        return self._passes[name]
+
+    def schedule(
+        self,
+        level: int,
+        enable: Iterable[str] = (),
+        disable: Iterable[str] = (),
+        order: Sequence[str] | None = None,
+    ) -> list[Pass]:
+        if not 0 <= level <= self.max_level:
+            raise ValueError(f"optimization level must be between 0 and {self.max_level}: {level}")
+
+        enabled = {self.lookup(name).name for name in enable}
+        disabled = {self.lookup(name).name for name in disable}
+
+        conflicts = enabled & disabled
+        if conflicts:
+            raise ValueError(f"passes both enabled and disabled: {sorted(conflicts)}")
+
+        for name in disabled:
+            if self._passes[name].required:
+                raise ValueError(f"required pass cannot be disabled: {name}")
+
+        if order is None:
+            selected = [
+                pass_
+                for pass_ in self._passes.values()
+                if pass_.required or pass_.name in enabled or (pass_.level is not None and pass_.level <= level)
+            ]
+        else:
+            selected = [self.lookup(name) for name in order]
+            for pass_ in self._passes.values():
+                if pass_.required and pass_ not in selected:
+                    raise ValueError(f"pass order is missing required pass: {pass_.name}")
+
+        schedule = [pass_ for pass_ in selected if pass_.name not in disabled]
+        self.validate(schedule)
+        return schedule
+
+    def validate(self, schedule: Sequence[Pass]) -> None:
+        seen: set[str] = set()
+        current = self.source
+        for pass_ in schedule:
+            if pass_.name in seen:
+                raise ValueError(f"pass scheduled more than once: {pass_.name}")
+
+            missing = [name for name in pass_.requires if name not in seen]
+            if missing:
+                raise ValueError(f"pass {pass_.name} requires {missing} to run first")
+
+            if pass_.source != current:
+                raise ValueError(f"pass {pass_.name} expects {pass_.source} but the pipeline is at {current}")
+
+            seen.add(pass_.name)
+            current = pass_.target
+
+        if current != self.target:
+            raise ValueError(f"pipeline ends at {current} instead of {self.target}")
+
+    def run(self, program: Any, schedule: Sequence[Pass], session: Session | None = None) -> Any:
+        session = session if session is not None else Session()
+        for pass_ in schedule:
+            program = pass_.run(program, session)
+        return program
@@ -0,0 +1,145 @@
+import ast
+import re
+
+# Heap objects of generated code.
+#
+# Every allocation has a size known at compile time and every load and store uses a constant index, so a heap
+# object does not need to be a list. It is an instance of a slotted class with one attribute per index instead:
+# no instance dict, no weakref slot and no room for growth, which makes it 32 + 8n bytes against 56 + 8n for the
+# equivalent list. Slot reads and writes compile to the same specialized attribute instructions as any other slotted
+# class. Each module defines the record classes for the sizes it allocates.
+#
+# Slots start out unset, so reading one before it is written raises AttributeError. An allocation with a fill value
+# instantiates a subclass whose constructor sets every slot to it in a single chained assignment.
+#
+# Records stop paying off for large objects such as long L4 lists: a class with thousands of slots is costly to
+# define, and setting them one by one is far slower than `[fill] * n`. An object of more than LARGEST_RECORD
+# elements is a `_Vector` instead, a list repeated in place from its fill value just as `[fill] * n` would be (None
+# when there is no fill value, as in the evaluator). An index of LARGEST_RECORD or more can only belong to a vector
+# and is a plain subscript. A smaller index may belong to either, so it stays an attribute, which a vector maps back
+# onto its elements.
+#
+# The classes live in the namespace of the program's own variables. `encode` escapes the reserved prefixes, so no
+# encoded identifier can shadow a class, and the sizes to define are read off the allocation calls alone.
+
+RECORD = "_Record"
+FILLED = "_Filled"
+VECTOR = "_Vector"
+RESERVED = (RECORD, FILLED, VECTOR)
+LARGEST_RECORD = 64
+_ALLOCATION = re.compile(rf"({RECORD}|{FILLED})(\d+)")
+
+# Element access of the vectors below LARGEST_RECORD, through the attribute names of the records.
+_VECTOR_CLASS = f"""
+class {VECTOR}(list):
+    __slots__ = ()
+
+    @classmethod
+    def filled(cls, fill, count):
+        vector = cls((fill,))
+        vector *= count
+        return vector
+
+    def __getattr__(self, name):
+        if name[0] != "f" or not name[1:].isdigit():
+            raise AttributeError(name)
+        return self[int(name[1:])]
+
+    def __setattr__(self, name, value):
+        self[int(name[1:])] = value
+"""
+
+
+def record_name(count: int) -> str:
+    return f"{RECORD}{count}"
+
+
+def filled_name(count: int) -> str:
+    return f"{FILLED}{count}"
+
+
+def slot(index: int) -> str:
+    return f"f{index}"
+
+
+def allocation(count: int, fill: int | None = None) -> ast.expr:
+    if count > LARGEST_RECORD:
+        # _Vector.filled(fill, count)
+        filled = ast.Attribute(value=ast.Name(id=VECTOR, ctx=ast.Load()), attr="filled", ctx=ast.Load())
+        return ast.Call(func=filled, args=[ast.Constant(fill), ast.Constant(count)])
+    if fill is None or count == 0:
+        return ast.Call(func=ast.Name(id=record_name(count), ctx=ast.Load()), args=[])
+    return ast.Call(func=ast.Name(id=filled_name(count), ctx=ast.Load()), args=[ast.Constant(fill)])
+
+
+def slot_load(base: ast.expr, index: int) -> ast.expr:
+    if index >= LARGEST_RECORD:
+        return ast.Subscript(value=base, slice=ast.Constant(index), ctx=ast.Load())
+    return ast.Attribute(value=base, attr=slot(index), ctx=ast.Load())
+
+
+def slot_store(base: ast.expr, index: int) -> ast.expr:
+    if index >= LARGEST_RECORD:
+        return ast.Subscript(value=base, slice=ast.Constant(index), ctx=ast.Store())
+    return ast.Attribute(value=base, attr=slot(index), ctx=ast.Store())
+
+
+def slot_assignment(base: ast.expr, index: int, value: ast.expr) -> ast.expr:
+    # The store as an expression, for the code generators that emit one expression per term.
+    if index >= LARGEST_RECORD:
+        return ast.Call(
+            func=ast.Attribute(value=base, attr="__setitem__", ctx=ast.Load()), args=[ast.Constant(index), value]
+        )
+    return ast.Call(func=ast.Name(id="setattr", ctx=ast.Load()), args=[base, ast.Constant(slot(index)), value])
+
+
+def _filled_class(count: int) -> ast.stmt:
+    # class _FilledN(_RecordN): __slots__ = (); def __init__(self, fill): self.f0 = ... = self.fN-1 = fill
+    self_ = ast.Name(id="self", ctx=ast.Load())
+    initializer = ast.FunctionDef(
+        name="__init__",
+        args=ast.arguments(args=[ast.arg(arg="self"), ast.arg(arg="fill")]),
+        body=[
+            ast.Assign(targets=[slot_store(self_, i) for i in range(count)], value=ast.Name(id="fill", ctx=ast.Load()))
+        ],
+    )
+    return ast.ClassDef(
+        name=filled_name(count),
+        bases=[ast.Name(id=record_name(count), ctx=ast.Load())],
+        body=[
+            ast.Assign(targets=[ast.Name(id="__slots__", ctx=ast.Store())], value=ast.Tuple(elts=[], ctx=ast.Load())),
+            initializer,
+        ],
+    )
+
+
+def record_classes(module: ast.Module) -> list[ast.stmt]:
+    matches = [
+        match
+        for node in ast.walk(module)
+        if isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and (match := _ALLOCATION.fullmatch(node.func.id)) is not None
+    ]
+    counts = sorted({int(match[2]) for match in matches})
+    filled = sorted({int(match[2]) for match in matches if match[1] == FILLED})
+    records: list[ast.stmt] = [
+        ast.ClassDef(
+            name=record_name(count),
+            body=[
+                ast.Assign(
+                    targets=[ast.Name(id="__slots__", ctx=ast.Store())],
+                    value=ast.Tuple(elts=[ast.Constant(slot(i)) for i in range(count)], ctx=ast.Load()),
+                )
+            ],
+        )
+        for count in counts
+    ]
+    vectors = any(
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == VECTOR
+        for node in ast.walk(module)
+    )
+    return [*(ast.parse(_VECTOR_CLASS).body if vectors else []), *records, *(_filled_class(count) for count in filled)]
@@ -0,0 +1,53 @@
+import ast
+import json
+from collections.abc import Iterator
+from typing import NamedTuple
+
+# Source positions shared by the intermediate languages and their code generators.
+#
+# Parsing can record where each L3 term starts; every pass copies the span of the node it rewrites onto the nodes it
+# produces, so the generated Python can carry L3 positions. Compiled in memory under the L3 file name, the code is
+# then attributed to L3 lines by tracebacks and profilers. Unparsed to a file, it loses its positions, so the
+# compiler can write a sidecar mapping each generated line back to the L3 position it came from.
+
+
+class Span(NamedTuple):
+    # One-based, as Lark reports them.
+    line: int
+    column: int
+
+
+def locate(statements: list[ast.stmt], span: Span | None) -> list[ast.stmt]:
+    # Positions the leading statements that have no position yet: those generated for the node itself. The ones
+    # after them were generated, and positioned, for the nodes that follow it.
+    if span is not None:
+        for statement in statements:
+            if hasattr(statement, "lineno"):
+                break
+            statement.lineno = statement.end_lineno = span.line
+            statement.col_offset = statement.end_col_offset = span.column - 1
+    return statements
+
+
+def _statements(node: ast.AST) -> Iterator[ast.stmt]:
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.stmt):
+            yield child
+        if isinstance(child, ast.stmt | ast.excepthandler | ast.match_case):
+            yield from _statements(child)
+
+
+def source_map(module: ast.Module, text: str, source: str | None) -> str:
+    # `text` is the unparsed module. Parsing it back gives the same statements in the same order, with the positions
+    # of the generated file; expressions may come back in another form, such as a negative constant as a negation.
+    # Each generated line maps to the first statement that starts on it.
+    mappings: dict[int, tuple[int, int]] = {}
+    for original, generated in zip(_statements(module), _statements(ast.parse(text)), strict=True):
+        mappings.setdefault(generated.lineno, (original.lineno, original.col_offset + 1))
+    return json.dumps(
+        {
+            "version": 1,
+            "source": source,
+            "mappings": [[line, *position] for line, position in sorted(mappings.items())],
+        }
+    )
@@ -0,0 +1,100 @@
+import ast
+from collections.abc import Sequence
+
+# Trampolined calling convention shared by the L1 and L0 code generators.
+#
+# A tail call does not call its target. It writes the target and the arguments into `_frame`, a list allocated
+# once per module, and returns the frame itself. Functions take no Python parameters and read their arguments
+# from the frame on entry, before they can make a call of their own. The entry point runs a driver loop that keeps
+# calling `_frame[0]` until something other than the frame comes back, so the Python stack never grows.
+
+FRAME = "_frame"
+START = "_start"
+
+
+def _frame(ctx: ast.expr_context) -> ast.Name:
+    return ast.Name(id=FRAME, ctx=ctx)
+
+
+def frame_allocation(size: int) -> ast.stmt:
+    return ast.Assign(
+        targets=[_frame(ast.Store())],
+        value=ast.BinOp(
+            left=ast.List(elts=[ast.Constant(None)], ctx=ast.Load()),
+            op=ast.Mult(),
+            right=ast.Constant(size),
+        ),
+    )
+
+
+def frame_call(target: ast.expr, arguments: Sequence[ast.expr]) -> list[ast.stmt]:
+    return [
+        *[
+            ast.Assign(
+                targets=[ast.Subscript(value=_frame(ast.Load()), slice=ast.Constant(i), ctx=ast.Store())],
+                value=value,
+            )
+            for i, value in enumerate([target, *arguments])
+        ],
+        ast.Return(_frame(ast.Load())),
+    ]
+
+
+def frame_parameters(parameters: Sequence[ast.Name]) -> list[ast.stmt]:
+    return [
+        ast.Assign(
+            targets=[parameter],
+            value=ast.Subscript(value=_frame(ast.Load()), slice=ast.Constant(i + 1), ctx=ast.Load()),
+        )
+        for i, parameter in enumerate(parameters)
+    ]
+
+
+def frame_function(name: str, parameters: Sequence[ast.Name], body: list[ast.stmt]) -> ast.FunctionDef:
+    return ast.FunctionDef(
+        name=name,
+        args=ast.arguments(args=[]),
+        body=[*frame_parameters(parameters), *body],
+    )
+
+
+def drive(body: list[ast.stmt]) -> list[ast.stmt]:
+    # Run `body` as the first bounce; its parameters are still ordinary arguments of the enclosing function.
+    result = ast.Name(id="_result", ctx=ast.Store())
+    return [
+        ast.FunctionDef(name=START, args=ast.arguments(args=[]), body=body),
+        ast.Assign(targets=[result], value=ast.Call(func=ast.Name(id=START, ctx=ast.Load()), args=[])),
+        ast.While(
+            test=ast.Compare(
+                left=ast.Name(id="_result", ctx=ast.Load()),
+                ops=[ast.Is()],
+                comparators=[_frame(ast.Load())],
+            ),
+            body=[
+                ast.Assign(
+                    targets=[result],
+                    value=ast.Call(
+                        func=ast.Subscript(value=_frame(ast.Load()), slice=ast.Constant(0), ctx=ast.Load()),
+                        args=[],
+                    ),
+                )
+            ],
+        ),
+        ast.Return(ast.Name(id="_result", ctx=ast.Load())),
+    ]
+
+
+def frame_size(module: ast.Module) -> int:
+    # One slot for the target plus one per argument of the widest call in the module.
+    return 1 + max(
+        (
+            node.slice.value
+            for node in ast.walk(module)
+            if isinstance(node, ast.Subscript)
+            and isinstance(node.ctx, ast.Store)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == FRAME
+            and isinstance(node.slice, ast.Constant)
+        ),
+        default=0,
+    )
@@ -0,0 +1,39 @@
+import ast
+import atexit
+
+import pytest
+from util.instrument import Sites, counted, instrumentation, report
+
+
+def test_instrumentation(capsys: pytest.CaptureFixture[str]):
+    sites = Sites()
+    assert counted(None, "calls", "f") == []
+    body = [
+        ast.FunctionDef(
+            name="f",
+            args=ast.arguments(args=[]),
+            body=[*counted(sites, "calls", "f"), *counted(sites, "loads", "c[0]"), ast.Pass()],
+        ),
+        *[ast.Expr(ast.Call(func=ast.Name(id="f", ctx=ast.Load()), args=[])) for _ in range(3)],
+    ]
+    counted(sites, "stores", "c[0]")
+    module = ast.fix_missing_locations(ast.Module(body=[*instrumentation(sites), *body]))
+
+    namespace: dict[str, object] = {}
+    exec(compile(module, "<test>", "exec"), namespace)
+    atexit.unregister(namespace["_report"])  # type: ignore[arg-type]
+
+    assert namespace["_counters"] == [3, 3, 0]
+    namespace["_report"]()  # type: ignore[operator]
+    assert capsys.readouterr().err == "calls:\n           3  #0     f\nloads:\n           3  #1     c[0]\n"
+
+    with pytest.raises(ValueError, match="unknown counter kind"):
+        sites.count("branches", "b")
+
+    # Without at_exit, the report is only printed on request.
+    module = ast.fix_missing_locations(ast.Module(body=[*instrumentation(sites, at_exit=False), *body]))
+    assert "atexit" not in ast.unparse(module)
+    namespace = {}
+    exec(compile(module, "<test>", "exec"), namespace)
+    report(namespace["f"])  # type: ignore[arg-type]
+    assert capsys.readouterr().err == "calls:\n           3  #0     f\nloads:\n           3  #1     c[0]\n"
@@ -0,0 +1,128 @@
+import pytest
+from util.pass_manager import Pass, PassManager, Session
+
+
+def append(name: str):
+    def run(program: list[str], session: Session) -> list[str]:
+        return [*program, name]
+
+    return run
+
+
+def build() -> PassManager:
+    manager = PassManager(source="a", target="c")
+    manager.register(Pass(name="analyze", source="a", target="a", run=append("analyze"), level=0))
+    manager.register(Pass(name="lower_a", source="a", target="b", run=append("lower_a")))
+    manager.register(Pass(name="simplify", source="b", target="b", run=append("simplify"), level=1))
+    manager.register(
+        Pass(
+            name="shrink",
+            source="b",
+            target="b",
+            run=append("shrink"),
+            cost="quadratic",
+            level=3,
+            requires=["simplify"],
+        )
+    )
+    manager.register(Pass(name="lower_b", source="b", target="c", run=append("lower_b")))
+    return manager
+
+
+def names(passes: list[Pass]) -> list[str]:
+    return [pass_.name for pass_ in passes]
+
+
+def test_schedule_levels():
+    manager = build()
+
+    assert names(manager.schedule(level=0)) == ["analyze", "lower_a", "lower_b"]
+    assert names(manager.schedule(level=1)) == ["analyze", "lower_a", "simplify", "lower_b"]
+    assert names(manager.schedule(level=2)) == ["analyze", "lower_a", "simplify", "lower_b"]
+    assert names(manager.schedule(level=3)) == ["analyze", "lower_a", "simplify", "shrink", "lower_b"]
+
+    # The levels stop at the highest one a pass is registered at.
+    assert manager.max_level == 3
+    with pytest.raises(ValueError, match="between 0 and 3"):
+        manager.schedule(level=4)
+    assert PassManager(source="a", target="a").max_level == 0
+
+
+def test_schedule_enable_disable():
+    manager = build()
+
+    assert names(manager.schedule(level=0, enable=["simplify"])) == ["analyze", "lower_a", "simplify", "lower_b"]
+    assert names(manager.schedule(level=1, disable=["analyze"])) == ["lower_a", "simplify", "lower_b"]
+
+    with pytest.raises(ValueError, match="requires"):
+        manager.schedule(level=3, disable=["simplify"])
+
+    with pytest.raises(ValueError, match="required pass cannot be disabled"):
+        manager.schedule(level=1, disable=["lower_a"])
+
+    with pytest.raises(ValueError, match="both enabled and disabled"):
+        manager.schedule(level=1, enable=["simplify"], disable=["simplify"])
+
+    with pytest.raises(ValueError, match="unknown pass"):
+        manager.schedule(level=1, enable=["inline"])
+
+    with pytest.raises(ValueError, match="optimization level"):
+        manager.schedule(level=4)
+
+
+def test_schedule_order():
+    manager = build()
+
+    assert names(manager.schedule(level=0, order=["lower_a", "simplify", "shrink", "lower_b"])) == [
+        "lower_a",
+        "simplify",
+        "shrink",
+        "lower_b",
+    ]
+    assert names(manager.schedule(level=0, order=["lower_a", "simplify", "lower_b"], disable=["simplify"])) == [
+        "lower_a",
+        "lower_b",
+    ]
+
+    with pytest.raises(ValueError, match="expects b but the pipeline is at a"):
+        manager.schedule(level=0, order=["simplify", "lower_a", "lower_b"])
+
+    with pytest.raises(ValueError, match="missing required pass"):
+        manager.schedule(level=0, order=["lower_a"])
+
+    with pytest.raises(ValueError, match="more than once"):
+        manager.schedule(level=0, order=["lower_a", "simplify", "simplify", "lower_b"])
+
+
+def test_validate_target():
+    manager = PassManager(source="a", target="c")
+    manager.register(Pass(name="lower_a", source="a", target="b", run=append("lower_a")))
+
+    with pytest.raises(ValueError, match="ends at b instead of c"):
+        manager.schedule(level=0)
+
+    with pytest.raises(ValueError, match="duplicate pass"):
+        manager.register(Pass(name="lower_a", source="a", target="b", run=append("lower_a")))
+
+
+def test_run():
+    manager = build()
+
+    actual = manager.run([], manager.schedule(level=3))
+
+    assert actual == ["analyze", "lower_a", "simplify", "shrink", "lower_b"]
+
+
+def test_run_session():
+    def rename(program: str, session: Session) -> str:
+        return session.fresh(program)
+
+    manager = PassManager(source="a", target="b")
+    manager.register(Pass(name="rename", source="a", target="b", run=rename))
+
+    session = Session()
+    schedule = manager.schedule(level=0)
+
+    assert manager.run("x", schedule, session) == "x0"
+    assert manager.run("x", schedule, session) == "x1"
+    assert manager.run("x", schedule) == "x0"
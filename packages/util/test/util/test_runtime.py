@@ -0,0 +1,96 @@
+import ast
+
+from util.encode import encode
+from util.runtime import LARGEST_RECORD, allocation, record_classes, slot_assignment, slot_load, slot_store
+
+
+def test_record_classes():
+    cell = ast.Name(id="c", ctx=ast.Load())
+    module = ast.Module(
+        body=[
+            ast.Assign(targets=[ast.Name(id="c", ctx=ast.Store())], value=allocation(3)),
+            ast.Assign(targets=[slot_store(cell, 2)], value=allocation(1)),
+            ast.Expr(slot_load(cell, 2)),
+        ]
+    )
+    module.body[0:0] = record_classes(module)
+    source = ast.unparse(ast.fix_missing_locations(module))
+
+    assert source == (
+        "class _Record1:\n    __slots__ = ('f0',)\n\n"
+        "class _Record3:\n    __slots__ = ('f0', 'f1', 'f2')\n"
+        "c = _Record3()\nc.f2 = _Record1()\nc.f2"
+    )
+
+    namespace: dict[str, object] = {}
+    exec(source, namespace)
+    record = namespace["c"]
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(record, "f0")
+
+
+def test_filled_record_classes():
+    module = ast.Module(
+        body=[
+            ast.Assign(targets=[ast.Name(id="a", ctx=ast.Store())], value=allocation(2, 0)),
+            ast.Assign(targets=[ast.Name(id="c", ctx=ast.Store())], value=allocation(0, 7)),
+        ]
+    )
+    module.body[0:0] = record_classes(module)
+    source = ast.unparse(ast.fix_missing_locations(module))
+
+    assert source == (
+        "class _Record0:\n    __slots__ = ()\n\n"
+        "class _Record2:\n    __slots__ = ('f0', 'f1')\n\n"
+        "class _Filled2(_Record2):\n    __slots__ = ()\n\n"
+        "    def __init__(self, fill):\n        self.f0 = self.f1 = fill\n"
+        "a = _Filled2(0)\nc = _Record0()"
+    )
+
+    namespace: dict[str, object] = {}
+    exec(source, namespace)
+    record = namespace["a"]
+    assert not hasattr(record, "__dict__")
+    assert (record.f0, record.f1) == (0, 0)  # pyright: ignore[reportAttributeAccessIssue]
+
+
+def test_vectors():
+    # Objects above LARGEST_RECORD are lists; low indices keep the attribute form records use.
+    vector = ast.Name(id="v", ctx=ast.Load())
+    module = ast.Module(
+        body=[
+            ast.Assign(targets=[ast.Name(id="v", ctx=ast.Store())], value=allocation(LARGEST_RECORD + 1, 7)),
+            ast.Assign(targets=[ast.Name(id="w", ctx=ast.Store())], value=allocation(1000)),
+            ast.Assign(targets=[slot_store(vector, 2)], value=ast.Constant(3)),
+            ast.Assign(targets=[slot_store(vector, LARGEST_RECORD)], value=slot_load(vector, 2)),
+            ast.Expr(slot_assignment(ast.Name(id="w", ctx=ast.Load()), 999, slot_load(vector, 0))),
+            ast.Expr(slot_assignment(ast.Name(id="w", ctx=ast.Load()), 1, slot_load(vector, LARGEST_RECORD))),
+        ]
+    )
+    module.body[0:0] = record_classes(module)
+    source = ast.unparse(ast.fix_missing_locations(module))
+
+    assert "v = _Vector.filled(7, 65)" in source
+    assert "v[64] = v.f2" in source
+    assert "w.__setitem__(999, v.f0)" in source
+    assert "_Record" not in source
+
+    namespace: dict[str, object] = {}
+    exec(source, namespace)
+    v, w = namespace["v"], namespace["w"]
+    assert isinstance(v, list) and isinstance(w, list)
+    assert v[:3] == [7, 7, 3] and v[64] == 3 and len(v) == 65
+    assert w[0] is None and w[1] == 3 and w[999] == 7
+    assert not hasattr(v, "__dict__")
+    assert not hasattr(v, "other")
+
+
+def test_record_classes_from_allocations():
+    # Only allocation calls define record classes; a name of the same shape is not one.
+    module = ast.Module(body=[ast.Expr(ast.Name(id="_Record7", ctx=ast.Load())), ast.Expr(allocation(2))])
+
+    assert [statement.name for statement in record_classes(module)] == ["_Record2"]  # pyright: ignore[reportAttributeAccessIssue]
+    assert encode("_Record7") == "_x5F_Record7"
+    assert encode("_Filled") == "_x5F_Filled"
+    assert encode("_Recorder") == "_x5F_Recorder"
+    assert encode("Record7") == "Record7"
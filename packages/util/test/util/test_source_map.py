@@ -0,0 +1,33 @@
+import ast
+import json
+
+from util.source_map import Span, locate, source_map
+
+
+def test_locate():
+    # Only the leading statements without a position belong to the node being located.
+    own = [ast.Pass(), ast.Pass()]
+    rest = locate([ast.Pass()], Span(7, 1))
+    statements = locate([*own, *rest, ast.Pass()], Span(3, 5))
+    assert [(statement.lineno, statement.col_offset) for statement in statements[:3]] == [(3, 4), (3, 4), (7, 0)]
+    assert not hasattr(statements[3], "lineno")
+    assert not hasattr(locate([ast.Pass()], None)[0], "lineno")
+
+
+def test_source_map():
+    function = ast.FunctionDef(
+        name="f",
+        args=ast.arguments(args=[]),
+        body=[
+            *locate([ast.Assign(targets=[ast.Name(id="x", ctx=ast.Store())], value=ast.Constant(-1))], Span(2, 3)),
+            *locate([ast.Return(ast.Name(id="x", ctx=ast.Load()))], Span(4, 5)),
+        ],
+    )
+    module = ast.fix_missing_locations(ast.Module(body=locate([function], Span(1, 1))))
+    text = ast.unparse(module)
+
+    assert json.loads(source_map(module, text, "f.l3")) == {
+        "version": 1,
+        "source": "f.l3",
+        "mappings": [[1, 1, 1], [2, 2, 3], [3, 4, 5]],
+    }